@@ -1,12 +1,43 @@
+from startup_timing import RunTimer, first_paint_summary, record_first_paint
+run_timer = RunTimer()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from kmodes.kprototypes import KPrototypes
-from fpdf import FPDF
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import io
+import hashlib
+import html
+import logging
+import tempfile
+import uuid
+from result_cache import BytesCache, dataframe_fingerprint
+from result_bundle import bundle_exists, read_bundle_manifest
+from published_results import find_result_file, load_published_result, result_version
+from model_registry import list_models, load_model
+from cluster_assigner import ClusterAssigner
+from compact_features import normalize_flag_columns, pack_flags
+from cluster_profile import build_cluster_profile, cluster_report_description, cluster_summary_table
+from charts import chart_metrics, cluster_profiles_chart_png, percent_bar_chart_png, profile_bar_chart_png
+from results_grid import ResultsGrid
+from student_index import StudentIndex
+from table_reader import SUPPORTED_EXTENSIONS, excel_engine, read_table
+from student_report import render_student_pdf, report_cache_key, write_reports_zip
+from pipeline import (
+    ALL_FEATURES_FOR_CLUSTERING, CATEGORICAL_COLS, ID_COLS,
+    MINIBATCH_CHUNK_SIZE, MINIBATCH_MIN_ROWS,
+    NUMERIC_COLS, final_results, make_clustering_cache, profile_results,
+    prune_registry, publish_bundle, register_model, write_excel_copy,
+)
+from tenants import DEFAULT_TENANT_ID, list_tenants, normalize_tenant_id, save_input, tenant_display_name, tenant_paths
+from background_jobs import (
+    JobManager, clustering_job, describe_progress, minibatch_clustering_job, preprocess_job, sweep_point_job, warm_start_clustering_job,
+)
+# sklearn, kmodes, matplotlib/seaborn, dan fpdf diimpor di dalam fungsi yang
+# memakainya sehingga layar pemilihan peran tidak menunggu impor tersebut.
+run_timer.mark("impor")
+
+logger = logging.getLogger(__name__)
 
 # --- KONSTANTA GLOBAL ---
 PRIMARY_COLOR = "#2C2F7F"
@@ -19,14 +50,39 @@ ACTIVE_BUTTON_BG_COLOR = "#3F51B5"
 ACTIVE_BUTTON_TEXT_COLOR = "#FFFFFF"
 ACTIVE_BUTTON_BORDER_COLOR = "#FFD700"
 
-ID_COLS = ["No", "Nama", "JK", "Kelas"]
-NUMERIC_COLS = ["Rata Rata Nilai Akademik", "Kehadiran"]
-CATEGORICAL_COLS = ["Ekstrakurikuler Komputer", "Ekstrakurikuler Pertanian",
-                    "Ekstrakurikuler Menjahit", "Ekstrakurikuler Pramuka"]
-ALL_FEATURES_FOR_CLUSTERING = NUMERIC_COLS + CATEGORICAL_COLS
+# Kolom dataset, parameter K-Prototypes, dan lokasi artefak didefinisikan di
+# pipeline.py agar sama persis dengan yang dipakai CLI.
+K_MIN = 2
+K_MAX = 6
+
+PDF_CACHE_MAX_ENTRIES = 100000
+PDF_CACHE_MAX_MEMORY_MB = 64
+PDF_CACHE_MAX_DISK_MB = 256
+BULK_REPORT_PARALLEL_MIN_ROWS = 200
+REPORT_JOB_CHUNK_ROWS = 500
+STUDENT_SEARCH_LIMIT = 100
+UPLOAD_PREVIEW_ROWS = 200
+UPLOAD_PARSE_CACHE_MAX_ENTRIES = 4
+# Waktu muat layar pemilihan peran hanya ditampilkan dengan ?debug=1;
+# selain itu dicatat ke log server.
+DEBUG_QUERY_PARAM = "debug"
+BACKGROUND_POLL_SECONDS = 1
+SPECULATIVE_K_LIMIT = 2
+PUBLISHED_RESULT_CACHE_MAX_ENTRIES = 8
+CLUSTER_MEMBER_PAGE_SIZES = [25, 50, 100]
+CLUSTER_MEMBER_COLS = ["No", "Nama", "JK", "Kelas", "Rata Rata Nilai Akademik", "Kehadiran"]
+RESULTS_GRID_PAGE_SIZES = [50, 100, 250]
+RESULT_COLUMN_CONFIG = {
+    "Rata Rata Nilai Akademik": st.column_config.NumberColumn(format="%.2f"),
+    "Kehadiran": st.column_config.NumberColumn(format="%.2f%%"),
+}
 
 # --- CUSTOM CSS & HEADER ---
-custom_css = f"""
+# Streamlit membangun ulang halaman pada setiap rerun sehingga CSS tetap harus
+# dikirim setiap kali; string-nya cukup dibangun sekali per proses per madrasah.
+@st.cache_resource
+def get_page_chrome_html(madrasah_name):
+    return f"""
 <style>
     .stApp {{
         background-color: {BACKGROUND_COLOR};
@@ -384,149 +440,390 @@ custom_css = f"""
         box-shadow: 0 2px 5px rgba(0,0,0,0.2);
     }}
 </style>
-"""
-
-header_html = f"""
 <div class="custom-header">
     <div><h1>PENGELOMPOKAN SISWA</h1></div>
-    <div class="kanan">MADRASAH ALIYAH AL-HIKMAH</div>
+    <div class="kanan">{html.escape(madrasah_name)}</div>
 </div>
 """
 
 st.set_page_config(page_title="Klasterisasi K-Prototype Siswa", layout="wide", initial_sidebar_state="expanded")
-st.markdown(custom_css, unsafe_allow_html=True)
-st.markdown(header_html, unsafe_allow_html=True)
 
 # --- FUNGSI PEMBANTU ---
 
-def generate_pdf_profil_siswa(nama, data_siswa_dict, klaster, cluster_desc_map):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 16)
-    pdf.set_text_color(44, 47, 127)
-    pdf.cell(0, 10, "PROFIL SISWA - HASIL KLASTERISASI", ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", "", 10)
-    pdf.set_text_color(0, 0, 0)
-    keterangan_umum = (
-        "Laporan ini menyajikan profil detail siswa berdasarkan hasil pengelompokan "
-        "menggunakan Algoritma K-Prototype. Klasterisasi dilakukan berdasarkan "
-        "nilai akademik, kehadiran, dan partisipasi ekstrakurikuler siswa. "
-        "Informasi klaster ini dapat digunakan untuk memahami kebutuhan siswa dan "
-        "merancang strategi pembinaan yang sesuai."
+def initial_tenant_id():
+    # Setiap madrasah dapat diberi tautan sendiri, misalnya ?madrasah=ma-nurul-huda.
+    try:
+        return normalize_tenant_id(st.query_params.get("madrasah", DEFAULT_TENANT_ID))
+    except ValueError:
+        return DEFAULT_TENANT_ID
+
+def current_tenant():
+    # Semua artefak (masukan, model, hasil, cache) dibaca dan ditulis di
+    # direktori madrasah yang dipilih pada sesi ini.
+    return tenant_paths(st.session_state.tenant_id)
+
+@st.cache_resource
+def get_pdf_cache(cache_dir):
+    # Batas utama dalam byte; batas jumlah entri hanya pengaman.
+    return BytesCache(
+        os.path.join(cache_dir, "laporan_pdf"),
+        max_entries=PDF_CACHE_MAX_ENTRIES,
+        max_disk_bytes=PDF_CACHE_MAX_DISK_MB * 1024 * 1024,
+        max_memory_bytes=PDF_CACHE_MAX_MEMORY_MB * 1024 * 1024,
     )
-    pdf.multi_cell(0, 5, keterangan_umum, align='J')
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 8, f"Nama Siswa: {nama}", ln=True)
-    pdf.cell(0, 8, f"Klaster Hasil: {klaster}", ln=True)
-    pdf.ln(3)
-    klaster_desc = cluster_desc_map.get(klaster, "Deskripsi klaster tidak tersedia.")
-    pdf.set_font("Arial", "I", 10)
-    pdf.set_text_color(80, 80, 80)
-    pdf.multi_cell(0, 5, f"Karakteristik Klaster {klaster}: {klaster_desc}", align='J')
-    pdf.ln(5)
-    pdf.set_font("Arial", "", 10)
-    pdf.set_text_color(0, 0, 0)
-    ekskul_diikuti = []
-    ekskul_cols_full_names = ["Ekstrakurikuler Komputer", "Ekstrakurikuler Pertanian", "Ekstrakurikuler Menjahit", "Ekstrakurikuler Pramuka"]
-    for col in ekskul_cols_full_names:
-        val = data_siswa_dict.get(col)
-        if val is not None and (val == 1 or str(val).strip() == '1'):
-            ekskul_diikuti.append(col.replace("Ekstrakurikuler ", ""))
-
-    display_data = {
-        "Nomor Induk": data_siswa_dict.get("No", "-"),
-        "Jenis Kelamin": data_siswa_dict.get("JK", "-"),
-        "Kelas": data_siswa_dict.get("Kelas", "-"),
-        "Rata-rata Nilai Akademik": f"{data_siswa_dict.get('Rata Rata Nilai Akademik', '-'):.2f}",
-        "Persentase Kehadiran": f"{data_siswa_dict.get('Kehadiran', '-'):.2%}",
-        "Ekstrakurikuler yang Diikuti": ", ".join(ekskul_diikuti) if ekskul_diikuti else "Tidak mengikuti ekstrakurikuler",
-    }
-    for key, val in display_data.items():
-        pdf.cell(0, 7, f"{key}: {val}", ln=True)
+
+def generate_pdf_profil_siswa(nama, data_siswa_dict, klaster, cluster_profile):
+    klaster_desc = cluster_report_description(cluster_profile, klaster)
+    cache = get_pdf_cache(current_tenant().cache_dir)
+    cache_key = report_cache_key(nama, data_siswa_dict, klaster, klaster_desc)
+    pdf_bytes = cache.get(cache_key)
+    if pdf_bytes is not None:
+        return pdf_bytes
     try:
-        pdf_output = pdf.output(dest='S').encode('latin-1')
-        return bytes(pdf_output)
+        pdf_bytes = render_student_pdf(nama, data_siswa_dict, klaster, klaster_desc)
     except Exception as e:
         st.error(f"Error saat mengonversi PDF: {e}. Coba pastikan tidak ada karakter aneh pada data.")
         return None
+    cache.put(cache_key, pdf_bytes)
+    return pdf_bytes
 
-def preprocess_data(df):
-    df_processed = df.copy()
-    df_processed.columns = [col.strip() for col in df_processed.columns]
-    missing_cols = [col for col in NUMERIC_COLS + CATEGORICAL_COLS if col not in df_processed.columns]
-    if missing_cols:
-        st.error(f"Kolom-kolom berikut tidak ditemukan dalam data Anda: {', '.join(missing_cols)}. Harap periksa file Excel Anda dan pastikan nama kolom sudah benar.")
-        return None, None
-    df_clean_for_clustering = df_processed.drop(columns=ID_COLS, errors="ignore")
-    for col in CATEGORICAL_COLS:
-        df_clean_for_clustering[col] = df_clean_for_clustering[col].fillna(0).astype(str)
-    for col in NUMERIC_COLS:
-        if df_clean_for_clustering[col].isnull().any():
-            mean_val = df_clean_for_clustering[col].mean()
-            df_clean_for_clustering[col] = df_clean_for_clustering[col].fillna(mean_val)
-            st.warning(f"Nilai kosong pada kolom '{col}' diisi dengan rata-rata: {mean_val:.2f}.")
-    scaler = StandardScaler()
-    df_clean_for_clustering[NUMERIC_COLS] = scaler.fit_transform(df_clean_for_clustering[NUMERIC_COLS])
-    return df_clean_for_clustering, scaler
-
-def run_kprototypes_clustering(df_preprocessed, n_clusters):
-    df_for_clustering = df_preprocessed.copy()
-    X_data = df_for_clustering[ALL_FEATURES_FOR_CLUSTERING]
-    X = X_data.to_numpy()
-    categorical_feature_indices = [X_data.columns.get_loc(c) for c in CATEGORICAL_COLS]
+def iter_report_jobs(df_selected, cluster_profile):
+    # Baris diubah ke dict per potongan agar ekspor massal tidak menyalin
+    # seluruh tabel sekaligus.
+    for start in range(0, len(df_selected), REPORT_JOB_CHUNK_ROWS):
+        for record in df_selected.iloc[start:start + REPORT_JOB_CHUNK_ROWS].to_dict("records"):
+            klaster = int(record.pop("Klaster"))
+            yield record.get("Nama", "-"), record, klaster, cluster_report_description(cluster_profile, klaster)
+
+@st.cache_resource
+def get_clustering_cache(cache_dir):
+    return make_clustering_cache(cache_dir)
+
+@st.cache_resource
+def get_job_manager():
+    # Satu executor latar belakang untuk semua sesi di proses server ini.
+    return JobManager()
+
+def original_fingerprint():
+    if st.session_state.df_original_fingerprint is None:
+        st.session_state.df_original_fingerprint = dataframe_fingerprint(st.session_state.df_original)
+    return st.session_state.df_original_fingerprint
+
+def submit_preprocess_job(manager, df_original, fingerprint, speculative_owner=None):
+    return manager.submit(
+        ("praproses", fingerprint), "Praproses", preprocess_job, df_original, speculative_owner=speculative_owner
+    )
+
+def submit_clustering_job(manager, df_original, df_preprocessed, n_clusters, minibatch, cache_dir, speculative_owner=None):
+    # Tidak memanggil st.*: juga dipakai dari callback pekerjaan spekulatif.
+    fingerprint = dataframe_fingerprint(df_preprocessed[ALL_FEATURES_FOR_CLUSTERING])
+    if minibatch:
+        return manager.submit(
+            ("klasterisasi-minibatch", cache_dir, fingerprint, n_clusters), f"Klasterisasi mini-batch K = {n_clusters}",
+            minibatch_clustering_job, df_original, df_preprocessed, n_clusters, cache_dir, speculative_owner=speculative_owner
+        )
+    return manager.submit(
+        ("klasterisasi", cache_dir, fingerprint, n_clusters), f"Klasterisasi K = {n_clusters}",
+        clustering_job, df_preprocessed, n_clusters, cache_dir, speculative_owner=speculative_owner
+    )
+
+def use_minibatch(df):
+    # Ambang yang sama untuk klasterisasi utama, slider visualisasi, dan pencarian K.
+    return len(df) >= MINIBATCH_MIN_ROWS
+
+def submit_warm_start_job(manager, df_original, df_preprocessed, scaler, registry_dir, previous_run_id, n_clusters):
+    # Kunci memakai sidik jari data asli: warm start bergantung pada kolom
+    # 'No' dan hash baris, bukan hanya pada fitur yang dinormalisasi.
+    return manager.submit(
+        ("klasterisasi-warm", registry_dir, previous_run_id, original_fingerprint()), f"Warm start K = {n_clusters}",
+        warm_start_clustering_job, df_original, df_preprocessed, scaler, registry_dir, previous_run_id
+    )
+
+def submit_k_sweep_jobs(manager, df_original, df_preprocessed, k_values, minibatch, cache_dir):
+    # Satu pekerjaan berkunci per K sehingga nilai-nilai K dilatih paralel di
+    # pekerja JobManager; K yang sudah pernah diuji untuk data ini dipakai ulang.
+    fingerprint = dataframe_fingerprint(df_preprocessed[ALL_FEATURES_FOR_CLUSTERING])
+    mode = " mini-batch" if minibatch else ""
+    return [
+        manager.submit(
+            ("pencarian-k", cache_dir, fingerprint, k, minibatch), f"Pencarian K{mode}: K = {k}",
+            sweep_point_job, df_original, df_preprocessed, k, minibatch, cache_dir
+        )
+        for k in k_values
+    ]
+
+def likely_k_values():
+    # K pilihan sesi ini, lalu K model terdaftar terbaru madrasah ini.
+    k_values = [st.session_state.n_clusters]
+    for meta in list_models(current_tenant().registry_dir):
+        if len(k_values) >= SPECULATIVE_K_LIMIT:
+            break
+        if meta["n_clusters"] not in k_values:
+            k_values.append(meta["n_clusters"])
+    return k_values
+
+def start_speculative_jobs(df_original):
+    # Dipanggil sekali per unggahan: praproses lalu fit untuk K yang paling
+    # mungkin dipilih sudah berjalan sebelum tombol mana pun ditekan. Hasil
+    # fit masuk ke cache klasterisasi dan dipakai ulang lewat kunci pekerjaan.
+    # Pekerjaan spekulatif untuk unggahan sebelumnya yang belum mulai dibatalkan.
+    manager = get_job_manager()
+    owner = st.session_state.job_owner_id
+    manager.cancel_speculative(owner)
+    cache_dir = current_tenant().cache_dir
+    k_values = likely_k_values()
+    minibatch = use_minibatch(df_original)
+    preprocess = submit_preprocess_job(manager, df_original, original_fingerprint(), speculative_owner=owner)
+
+    def fit_likely_k(job):
+        result, error = job.outcome()
+        # Pemilik sudah mengunggah file lain: fit untuk data ini tidak diperlukan.
+        if error is None and owner in job.speculative_owners:
+            for k in k_values:
+                submit_clustering_job(manager, df_original, result[0], k, minibatch, cache_dir, speculative_owner=owner)
+
+    preprocess.add_done_callback(fit_likely_k)
+    return k_values
+
+def finish_preprocess(job):
+    result, error = job.outcome() if job is not None else (None, "Pekerjaan praproses tidak ditemukan lagi; silakan jalankan ulang.")
+    if error is not None:
+        st.session_state.preprocess_messages = [("error", f"{error} Harap periksa file Excel Anda dan pastikan nama kolom sudah benar.")]
+        return
+    df_preprocessed, scaler, notes = result
+    st.session_state.df_preprocessed_for_clustering = df_preprocessed
+    st.session_state.scaler = scaler
+    st.session_state.k_sweep_summary = None
+    st.session_state.k_sweep_messages = []
+    st.session_state.preprocess_messages = [("warning", note) for note in notes] + [
+        ("success", "Praproses dan Normalisasi berhasil dilakukan. Data siap untuk klasterisasi!")
+    ]
+
+def finish_clustering(df_clustered, kproto_model, categorical_features_indices, k, simpan_excel, change_report=None, warm_start_skip_reason=None):
+    # Menerapkan hasil ke sesi, mendaftarkan model, dan menerbitkan hasil.
+    # Pesan disimpan di sesi karena hasil dapat selesai saat pengguna berada
+    # di menu lain; halaman klasterisasi menampilkannya.
+    messages = []
+    df_final = final_results(st.session_state.df_original, df_clustered)
+    st.session_state.df_clustered = df_final
+    st.session_state.student_index = StudentIndex.from_frame(df_final)
+    st.session_state.results_grid = ResultsGrid(df_final)
+    st.session_state.kproto_model = kproto_model
+    st.session_state.categorical_features_indices = categorical_features_indices
+    st.session_state.n_clusters = k
+    st.session_state.cluster_profile = profile_results(st.session_state.df_original, df_clustered, k)
     try:
-        kproto = KPrototypes(n_clusters=n_clusters, init='Huang', n_init=10, verbose=0, random_state=42, n_jobs=-1)
-        clusters = kproto.fit_predict(X, categorical=categorical_feature_indices)
+        st.session_state.model_run_id = register_model(
+            st.session_state.df_original, st.session_state.df_preprocessed_for_clustering, df_clustered,
+            kproto_model, st.session_state.scaler, categorical_features_indices, k,
+            st.session_state.cluster_profile, registry_dir=current_tenant().registry_dir
+        )
     except Exception as e:
-        st.error(f"Terjadi kesalahan saat menjalankan K-Prototypes: {e}. Pastikan data Anda cukup bervariasi untuk jumlah klaster yang dipilih.")
-        return None, None, None
-    df_for_clustering["Klaster"] = clusters
-    return df_for_clustering, kproto, categorical_feature_indices
-
-def generate_cluster_descriptions(df_clustered, n_clusters, numeric_cols, categorical_cols):
-    cluster_characteristics_map = {}
-    if 'df_original' not in st.session_state or st.session_state.df_original is None:
-        return {}
-    
-    df_original_numeric = st.session_state.df_original[NUMERIC_COLS]
-    for i in range(n_clusters):
-        cluster_data = df_clustered[df_clustered["Klaster"] == i]
-        avg_scaled_values = cluster_data[numeric_cols].mean()
-        mode_values = cluster_data[categorical_cols].mode().iloc[0]
-        desc = ""
-        if avg_scaled_values["Rata Rata Nilai Akademik"] > 0.75:
-            desc += "Siswa di klaster ini memiliki nilai akademik cenderung sangat tinggi. "
-        elif avg_scaled_values["Rata Rata Nilai Akademik"] > 0.25:
-            desc += "Siswa di klaster ini memiliki nilai akademik cenderung di atas rata-rata. "
-        elif avg_scaled_values["Rata Rata Nilai Akademik"] < -0.75:
-            desc += "Siswa di klaster ini memiliki nilai akademik cenderung sangat rendah. "
-        elif avg_scaled_values["Rata Rata Nilai Akademik"] < -0.25:
-            desc += "Siswa di klaster ini memiliki nilai akademik cenderung di bawah rata-rata. "
-        else:
-            desc += "Siswa di klaster ini memiliki nilai akademik cenderung rata-rata. "
-        if avg_scaled_values["Kehadiran"] > 0.75:
-            desc += "Tingkat kehadiran cenderung sangat tinggi. "
-        elif avg_scaled_values["Kehadiran"] > 0.25:
-            desc += "Tingkat kehadiran cenderung di atas rata-rata. "
-        elif avg_scaled_values["Kehadiran"] < -0.75:
-            desc += "Tingkat kehadiran cenderung sangat rendah. "
-        elif avg_scaled_values["Kehadiran"] < -0.25:
-            desc += "Tingkat kehadiran cenderung di bawah rata-rata. "
-        else:
-            desc += "Tingkat kehadiran cenderung rata-rata. "
-        ekskul_aktif_modes = [col_name for col_name in categorical_cols if mode_values[col_name] == '1']
-        if ekskul_aktif_modes:
-            desc += f"Siswa di klaster ini aktif dalam ekstrakurikuler: {', '.join([c.replace('Ekstrakurikuler ', '') for c in ekskul_aktif_modes])}."
+        st.session_state.model_run_id = None
+        messages.append(("error", f"Gagal menyimpan model ke registri: {e}"))
+    messages.append(("success", f"Klasterisasi selesai dengan {k} klaster! Hasil pengelompokan siswa telah tersedia."))
+    if change_report is not None:
+        messages.append(("info",
+            f"Warm start dari run {change_report['previous_run_id']}: {change_report['inserted']} baris baru, "
+            f"{change_report['changed']} baris berubah, {change_report['deleted']} baris dihapus, "
+            f"{change_report['unchanged']} baris tetap. {change_report['switched']} siswa berpindah klaster. "
+            f"Konvergen dalam {change_report['n_iter']} iterasi."
+        ))
+    elif warm_start_skip_reason is not None:
+        messages.append(("info", f"Warm start tidak dapat digunakan ({warm_start_skip_reason}), sehingga klasterisasi penuh dijalankan."))
+    try:
+        publish_bundle(
+            df_final, st.session_state.scaler, kproto_model, st.session_state.cluster_profile,
+            bundle_dir=current_tenant().bundle_dir, model_run_id=st.session_state.model_run_id
+        )
+        messages.append(("success", f"Hasil klasterisasi berhasil diterbitkan ke '{current_tenant().bundle_dir}' untuk diakses oleh Kepala Sekolah."))
+    except Exception as e:
+        messages.append(("error", f"Gagal menyimpan hasil klasterisasi untuk Kepala Sekolah: {e}"))
+    prune_registry(current_tenant().registry_dir, current_tenant().bundle_dir, protected_run_ids=[st.session_state.model_run_id])
+    if simpan_excel:
+        try:
+            file_name = write_excel_copy(df_final, current_tenant().excel_file)
+            messages.append(("success", f"Salinan Excel hasil klasterisasi juga disimpan ke file '{file_name}'."))
+        except Exception as e:
+            messages.append(("error", f"Gagal menyimpan file Excel untuk Kepala Sekolah: {e}"))
+    st.session_state.clustering_messages = messages
+
+def finish_clustering_job(pending, job):
+    result, error = job.outcome() if job is not None else (None, "pekerjaan tidak ditemukan lagi")
+    if pending.get("warm_start"):
+        warm_start_result, skip_reason = result if error is None else (None, f"pekerjaan warm start gagal: {error}")
+        if warm_start_result is None:
+            # Cold start lewat pekerjaan berkunci biasa, sehingga fit
+            # spekulatif untuk K ini dipakai bila sudah ada.
+            job = submit_clustering_job(
+                get_job_manager(), st.session_state.df_original, st.session_state.df_preprocessed_for_clustering,
+                pending["n_clusters"], False, current_tenant().cache_dir
+            )
+            st.session_state.pending_clustering = {
+                **pending, "key": job.key, "warm_start": False, "warm_start_skip_reason": skip_reason,
+            }
+            return
+        df_clustered, kproto_model, categorical_features_indices, change_report = warm_start_result
+        finish_clustering(
+            df_clustered, kproto_model, categorical_features_indices, pending["n_clusters"], pending["simpan_excel"],
+            change_report=change_report
+        )
+        return
+    if error is not None:
+        mode = " mini-batch" if pending["minibatch"] else ""
+        st.session_state.clustering_messages = [(
+            "error",
+            f"Terjadi kesalahan saat menjalankan K-Prototypes{mode}: {error}. Pastikan data Anda cukup bervariasi untuk jumlah klaster yang dipilih."
+        )]
+        return
+    if pending["minibatch"]:
+        df_clustered, kproto_model, categorical_features_indices, st.session_state.scaler = result
+    else:
+        df_clustered, kproto_model, categorical_features_indices = result
+    finish_clustering(
+        df_clustered, kproto_model, categorical_features_indices, pending["n_clusters"], pending["simpan_excel"],
+        warm_start_skip_reason=pending["warm_start_skip_reason"]
+    )
+
+def finish_k_sweep(pending, jobs):
+    sweep_results, messages = [], []
+    for k, job in zip(pending["k_values"], jobs):
+        result, error = job.outcome() if job is not None else (None, "pekerjaan tidak ditemukan lagi")
+        if error is not None:
+            messages.append(("error", f"Gagal melatih model untuk K = {k}: {error}"))
         else:
-            desc += "Siswa di klaster ini kurang aktif dalam kegiatan ekstrakurikuler."
-        cluster_characteristics_map[i] = desc
-    return cluster_characteristics_map
+            sweep_results.append(result)
+    st.session_state.k_sweep_messages = messages
+    st.session_state.k_sweep_summary = pd.DataFrame({
+        "K": [r["n_clusters"] for r in sweep_results],
+        "Cost": [r["cost"] for r in sweep_results],
+        "Iterasi": [r["n_iter"] for r in sweep_results],
+        "Silhouette": [r["silhouette"] for r in sweep_results],
+    })
+
+def collect_finished_jobs():
+    # Dipanggil di awal setiap rerun halaman Operator TU sehingga hasil
+    # pekerjaan latar belakang diterapkan di menu mana pun pengguna berada.
+    manager = get_job_manager()
+    pending = st.session_state.pending_preprocess
+    if pending is not None:
+        job = manager.get(pending["key"])
+        if job is None or job.done():
+            st.session_state.pending_preprocess = None
+            finish_preprocess(job)
+    pending = st.session_state.pending_clustering
+    if pending is not None:
+        job = manager.get(pending["key"])
+        if job is None or job.done():
+            st.session_state.pending_clustering = None
+            finish_clustering_job(pending, job)
+            # Warm start yang gagal berlanjut sebagai pekerjaan cold start baru.
+            if st.session_state.pending_clustering is None and st.session_state.current_menu != "Klasterisasi Data K-Prototypes":
+                st.toast(f"Klasterisasi dengan {pending['n_clusters']} klaster selesai.")
+    pending = st.session_state.pending_sweep
+    if pending is not None:
+        jobs = [manager.get(key) for key in pending["keys"]]
+        if all(job is None or job.done() for job in jobs):
+            st.session_state.pending_sweep = None
+            finish_k_sweep(pending, jobs)
+
+@st.experimental_fragment(run_every=BACKGROUND_POLL_SECONDS)
+def show_job_progress(pending_key, compact=False):
+    # Fragmen ini saja yang diperbarui setiap detik; setelah pekerjaan selesai
+    # seluruh halaman dijalankan ulang agar hasilnya diterapkan.
+    # pending berisi "key" untuk satu pekerjaan, atau "keys" dan "label"
+    # untuk sekelompok pekerjaan (misalnya satu per K pada pencarian K).
+    pending = st.session_state.get(pending_key)
+    if pending is None:
+        return
+    manager = get_job_manager()
+    jobs = [manager.get(key) for key in pending.get("keys", [pending.get("key")])]
+    if all(job is None or job.done() for job in jobs):
+        st.rerun()
+    if len(jobs) == 1:
+        fraction, text = describe_progress(jobs[0].progress)
+        text = f"{jobs[0].label}: {text} ({jobs[0].elapsed():.0f} detik)"
+    else:
+        n_done = sum(job is None or job.done() for job in jobs)
+        elapsed = max(job.elapsed() for job in jobs if job is not None)
+        fraction, text = n_done / len(jobs), f"{pending['label']}: {n_done}/{len(jobs)} selesai ({elapsed:.0f} detik)"
+    if compact:
+        st.caption(f"⏳ {text}")
+    else:
+        st.progress(fraction, text=text)
+
+def show_job_messages(messages):
+    for level, text in messages:
+        getattr(st, level)(text)
+
+def find_previous_run_id(n_clusters):
+    for meta in list_models(current_tenant().registry_dir):
+        if meta["n_clusters"] == n_clusters and meta.get("has_row_index"):
+            return meta["run_id"]
+    return None
+
+@st.cache_data(show_spinner=False, max_entries=UPLOAD_PARSE_CACHE_MAX_ENTRIES)
+def parse_uploaded_table(content_hash, file_name, columns, _uploaded_file):
+    # Kunci cache: hash isi file, nama (menentukan format), dan kolom yang
+    # dibaca; file yang sama diunggah ulang tidak diparse lagi.
+    return read_table(_uploaded_file.getvalue(), file_name, columns=list(columns))
+
+def read_uploaded_table(uploaded_file, columns=ID_COLS + ALL_FEATURES_FOR_CLUSTERING):
+    # Hash isi dihitung sekali per file_id unggahan dalam sesi ini; rerun
+    # berikutnya langsung memakai kunci yang sama.
+    content_hashes = st.session_state.setdefault("uploaded_file_hashes", {})
+    content_hash = content_hashes.get(uploaded_file.file_id)
+    if content_hash is None:
+        content_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+        content_hashes[uploaded_file.file_id] = content_hash
+    return parse_uploaded_table(content_hash, uploaded_file.name, tuple(columns), uploaded_file)
+
+def prepare_prediction_features(df_input):
+    df_features = df_input.rename(columns=lambda col: str(col).strip())
+    missing_cols = [col for col in NUMERIC_COLS + CATEGORICAL_COLS if col not in df_features.columns]
+    if missing_cols:
+        return None, None, missing_cols
+    df_features = df_features[NUMERIC_COLS + CATEGORICAL_COLS].copy()
+    kehadiran = df_features["Kehadiran"]
+    if kehadiran.dtype == 'object':
+        kehadiran_str = kehadiran.astype(str).str.strip()
+        is_percent = kehadiran_str.str.endswith('%')
+        kehadiran = pd.to_numeric(kehadiran_str.str.rstrip('%'), errors='coerce')
+        kehadiran = kehadiran.where(~is_percent, kehadiran / 100)
+    df_features["Kehadiran"] = kehadiran
+    df_features["Rata Rata Nilai Akademik"] = pd.to_numeric(df_features["Rata Rata Nilai Akademik"], errors='coerce')
+    df_features[CATEGORICAL_COLS] = normalize_flag_columns(df_features, CATEGORICAL_COLS)
+    invalid_mask = (
+        df_features[NUMERIC_COLS].isnull().any(axis=1)
+        | ~df_features["Rata Rata Nilai Akademik"].between(0, 100)
+        | ~df_features["Kehadiran"].between(0, 1)
+    )
+    return df_features, invalid_mask.to_numpy(), []
+
+def predict_clusters(model_entry, df_features):
+    # Flag ekstrakurikuler dibandingkan sebagai bitmask (XOR/popcount) bila
+    # semua kategori centroid biner; selain itu sebagai string '0'/'1'.
+    normalized_numeric = model_entry.scaler.transform(df_features[NUMERIC_COLS])
+    assigner = get_cluster_assigner(current_tenant().registry_dir, model_entry.run_id)
+    flag_matrix = df_features[CATEGORICAL_COLS].to_numpy(dtype=np.uint8)
+    if assigner.centroids_flags is not None:
+        predicted_clusters = assigner.predict_packed(normalized_numeric, pack_flags(flag_matrix))
+    else:
+        predicted_clusters = assigner.predict(normalized_numeric, flag_matrix)
+    return predicted_clusters, normalized_numeric
+
+@st.cache_resource(show_spinner=False, max_entries=PUBLISHED_RESULT_CACHE_MAX_ENTRIES)
+def get_published_result(file_path, version):
+    # cache_resource, bukan cache_data: semua sesi Kepala Sekolah memakai satu
+    # objek yang sama per versi hasil alih-alih salinan per sesi per rerun.
+    # version hanya menjadi bagian kunci cache (lihat result_version).
+    return load_published_result(file_path)
 
 # --- INISIALISASI SESSION STATE ---
 if 'role' not in st.session_state:
     st.session_state.role = None
+if 'tenant_id' not in st.session_state:
+    st.session_state.tenant_id = initial_tenant_id()
 if 'df_original' not in st.session_state:
     st.session_state.df_original = None
 if 'df_preprocessed_for_clustering' not in st.session_state:
@@ -539,20 +836,409 @@ if 'kproto_model' not in st.session_state:
     st.session_state.kproto_model = None
 if 'categorical_features_indices' not in st.session_state:
     st.session_state.categorical_features_indices = None
+if 'model_run_id' not in st.session_state:
+    st.session_state.model_run_id = None
+if 'k_sweep_summary' not in st.session_state:
+    st.session_state.k_sweep_summary = None
 if 'n_clusters' not in st.session_state:
     st.session_state.n_clusters = 3
-if 'cluster_characteristics_map' not in st.session_state:
-    st.session_state.cluster_characteristics_map = {}
+if 'cluster_profile' not in st.session_state:
+    st.session_state.cluster_profile = None
+if 'student_index' not in st.session_state:
+    st.session_state.student_index = None
+if 'results_grid' not in st.session_state:
+    st.session_state.results_grid = None
 if 'current_menu' not in st.session_state:
     st.session_state.current_menu = None
 if 'kepsek_current_menu' not in st.session_state:
     st.session_state.kepsek_current_menu = "Lihat Hasil Klasterisasi"
+if 'first_paint_report' not in st.session_state:
+    st.session_state.first_paint_report = None
+if 'uploaded_file_id' not in st.session_state:
+    st.session_state.uploaded_file_id = None
+if 'df_original_fingerprint' not in st.session_state:
+    st.session_state.df_original_fingerprint = None
+if 'job_owner_id' not in st.session_state:
+    # Penanda sesi ini sebagai pemilik pekerjaan spekulatif di JobManager bersama.
+    st.session_state.job_owner_id = uuid.uuid4().hex
+if 'pending_preprocess' not in st.session_state:
+    st.session_state.pending_preprocess = None
+if 'pending_clustering' not in st.session_state:
+    st.session_state.pending_clustering = None
+if 'preprocess_messages' not in st.session_state:
+    st.session_state.preprocess_messages = []
+if 'clustering_messages' not in st.session_state:
+    st.session_state.clustering_messages = []
+if 'pending_sweep' not in st.session_state:
+    st.session_state.pending_sweep = None
+if 'k_sweep_messages' not in st.session_state:
+    st.session_state.k_sweep_messages = []
+if 'pending_visual' not in st.session_state:
+    st.session_state.pending_visual = None
+run_timer.mark("state")
+
+# Header memakai nama madrasah sesi ini, sehingga dirender setelah session state siap.
+st.markdown(get_page_chrome_html(tenant_display_name(st.session_state.tenant_id)), unsafe_allow_html=True)
+run_timer.mark("css")
 
 
 # --- FUNGSI HALAMAN UTAMA (UNTUK SETIAP PERAN) ---
 
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_registered_model(registry_dir, run_id):
+    return load_model(registry_dir, run_id)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_cluster_assigner(registry_dir, run_id):
+    return ClusterAssigner.from_kprototypes(get_registered_model(registry_dir, run_id).kproto, len(NUMERIC_COLS))
+
+def published_model_run_id():
+    bundle_dir = current_tenant().bundle_dir
+    if not bundle_exists(bundle_dir):
+        return None
+    try:
+        return read_bundle_manifest(bundle_dir).get("model_run_id")
+    except (OSError, ValueError):
+        return None
+
+def select_prediction_model():
+    registry_dir = current_tenant().registry_dir
+    registered_models = list_models(registry_dir)
+    if not registered_models:
+        return None
+    run_ids = [meta["run_id"] for meta in registered_models]
+    preferred_run_id = st.session_state.get("model_run_id") or published_model_run_id()
+    default_index = run_ids.index(preferred_run_id) if preferred_run_id in run_ids else 0
+    meta_by_id = {meta["run_id"]: meta for meta in registered_models}
+    selected_run_id = st.selectbox(
+        "Model yang digunakan",
+        run_ids,
+        index=default_index,
+        format_func=lambda run_id: f"{run_id} (K = {meta_by_id[run_id]['n_clusters']})",
+        key="pilih_model_prediksi",
+        help="Model tersimpan di registri sehingga prediksi tetap dapat dilakukan setelah keluar atau server dimulai ulang."
+    )
+    try:
+        return get_registered_model(registry_dir, selected_run_id)
+    except Exception as e:
+        st.error(f"Gagal memuat model '{selected_run_id}' dari registri: {e}")
+        return None
+
+
+def show_prediksi_batch(model_entry):
+    st.markdown("### Prediksi Klaster Banyak Siswa Sekaligus")
+    st.write(
+        "Unggah file Excel (.xlsx), CSV, atau Parquet berisi data siswa baru dengan kolom "
+        f"{', '.join(NUMERIC_COLS + CATEGORICAL_COLS)}. Kolom identitas (No, Nama, JK, Kelas) bersifat opsional "
+        "dan akan ikut disertakan pada file hasil."
+    )
+    uploaded_batch = st.file_uploader(
+        "Pilih File Data Siswa Baru", type=SUPPORTED_EXTENSIONS, key="upload_prediksi_batch",
+        help="Seluruh baris diproses dalam satu kali normalisasi dan satu kali prediksi."
+    )
+    if not uploaded_batch:
+        return
+    try:
+        df_batch = read_uploaded_table(uploaded_batch)
+    except Exception as e:
+        st.error(f"Terjadi kesalahan saat membaca file: {e}. Pastikan format file benar dan tidak rusak.")
+        return
+    df_features, invalid_mask, missing_cols = prepare_prediction_features(df_batch)
+    if missing_cols:
+        st.error(f"Kolom-kolom berikut tidak ditemukan dalam data Anda: {', '.join(missing_cols)}.")
+        return
+    if invalid_mask.any():
+        st.warning(
+            f"{int(invalid_mask.sum())} baris dilewati karena nilai numerik kosong atau di luar rentang "
+            "(nilai 0 - 100, kehadiran 0.0 - 1.0)."
+        )
+        st.dataframe(df_batch[invalid_mask], use_container_width=True, height=200)
+    df_valid = df_features[~invalid_mask]
+    if df_valid.empty:
+        st.error("Tidak ada baris valid yang dapat diprediksi.")
+        return
+
+    predicted_clusters, _ = predict_clusters(model_entry, df_valid)
+    df_result = df_batch[~invalid_mask].copy()
+    df_result["Klaster"] = predicted_clusters
+    st.success(f"Prediksi selesai untuk {len(df_result)} siswa.")
+
+    st.subheader("Ringkasan: Jumlah Siswa Baru per Klaster")
+    jumlah_per_klaster = df_result["Klaster"].value_counts().sort_index().reset_index()
+    jumlah_per_klaster.columns = ["Klaster", "Jumlah Siswa"]
+    jumlah_per_klaster["Karakteristik"] = jumlah_per_klaster["Klaster"].map(
+        lambda k: model_entry.cluster_desc_map.get(k, "Deskripsi klaster tidak tersedia.")
+    )
+    st.table(jumlah_per_klaster)
+
+    st.subheader("Data Siswa Baru Beserta Klaster")
+    st.dataframe(df_result, use_container_width=True, height=300)
+    nama_dasar = os.path.splitext(uploaded_batch.name)[0]
+    col_xlsx, col_csv = st.columns(2)
+    with col_xlsx:
+        excel_buffer = io.BytesIO()
+        df_result.to_excel(excel_buffer, index=False)
+        st.download_button(
+            label="Unduh Hasil (Excel)",
+            data=excel_buffer.getvalue(),
+            file_name=f"Prediksi_Klaster_{nama_dasar}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="download_prediksi_batch_xlsx"
+        )
+    with col_csv:
+        st.download_button(
+            label="Unduh Hasil (CSV)",
+            data=df_result.to_csv(index=False).encode("utf-8"),
+            file_name=f"Prediksi_Klaster_{nama_dasar}.csv",
+            mime="text/csv",
+            key="download_prediksi_batch_csv"
+        )
+
+def show_prediksi_siswa_baru_page():
+    st.header("Prediksi Klaster untuk Siswa Baru")
+    model_entry = select_prediction_model()
+    if model_entry is None:
+        st.warning("Belum ada model yang tersimpan. Operator TU perlu menjalankan klasterisasi terlebih dahulu di menu 'Klasterisasi Data K-Prototypes' untuk melatih model dan scaler.")
+        return
+    st.markdown("""
+    <div style='background-color:#f1f9ff; padding:15px; border-radius:10px; border-left: 5px solid #2C2F7F;'>
+    Halaman ini memungkinkan Anda untuk memprediksi klaster bagi siswa baru. Masukkan data nilai akademik,
+    kehadiran, dan keterlibatan ekstrakurikuler siswa. Sistem akan otomatis memproses data
+    dan memetakan siswa ke klaster yang paling sesuai berdasarkan model yang telah dilatih.
+    <br><br>
+    Pemanfaatan klaster membantu guru dalam merancang strategi pembinaan dan pendekatan pembelajaran
+    yang lebih personal dan efektif.
+    </div>
+    """, unsafe_allow_html=True)
+    st.markdown("---")
+    tab_satu, tab_banyak = st.tabs(["Satu Siswa", "Banyak Siswa (Unggah File)"])
+    with tab_banyak:
+        show_prediksi_batch(model_entry)
+    with tab_satu:
+        with st.form("form_input_siswa_baru", clear_on_submit=False):
+            st.markdown("### Input Data Siswa Baru")
+            st.markdown("<div style='margin-bottom: 15px;'></div>", unsafe_allow_html=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### Data Akademik & Kehadiran")
+                input_rata_nilai = st.number_input("Rata-rata Nilai Akademik (0 - 100)", min_value=0.0, max_value=100.0, value=None, placeholder="Contoh: 85.5", format="%.2f", key="input_nilai_prediksi")
+                input_kehadiran = st.number_input("Persentase Kehadiran (0.0 - 1.0)", min_value=0.0, max_value=1.0, value=None, placeholder="Contoh: 0.95 (untuk 95%)", format="%.2f", key="input_kehadiran_prediksi")
+            with col2:
+                st.markdown("#### Keikutsertaan Ekstrakurikuler")
+                st.write("Centang ekstrakurikuler yang diikuti siswa:")
+                input_cat_ekskul_values = []
+                for idx, col in enumerate(CATEGORICAL_COLS):
+                    val = st.checkbox(col.replace("Ekstrakurikuler ", ""), key=f"ekskul_prediksi_{idx}")
+                    input_cat_ekskul_values.append(1 if val else 0)
+            st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
+            submitted = st.form_submit_button("Prediksi Klaster Siswa")
+        if submitted:
+            if input_rata_nilai is None or input_kehadiran is None:
+                st.error("Harap isi semua nilai numerik (Rata-rata Nilai Akademik dan Persentase Kehadiran) terlebih dahulu.")
+            else:
+                df_new_student = pd.DataFrame(
+                    [[input_rata_nilai, input_kehadiran] + input_cat_ekskul_values],
+                    columns=NUMERIC_COLS + CATEGORICAL_COLS
+                )
+                predicted_cluster, normalized_numeric_rows = predict_clusters(model_entry, df_new_student)
+                normalized_numeric_data = normalized_numeric_rows[0]
+                st.success(f"Prediksi Klaster: Siswa Baru Ini Masuk ke Klaster {predicted_cluster[0]}!")
+                st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
+                klaster_desc_for_new_student = model_entry.cluster_desc_map.get(predicted_cluster[0], "Deskripsi klaster tidak tersedia.")
+                st.markdown(f"""
+                <div style='background-color:#e8f5e9; padding:15px; border-radius:10px; border-left: 5px solid #4CAF50;'>
+                <b>Karakteristik Klaster {predicted_cluster[0]}:</b><br>
+                {klaster_desc_for_new_student}
+                <br><br>
+                Informasi ini sangat membantu guru dalam memberikan bimbingan dan dukungan yang tepat sasaran
+                sesuai dengan profil klaster siswa.
+                </div>
+                """, unsafe_allow_html=True)
+                st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+                st.subheader("Visualisasi Karakteristik Siswa Baru (Dinormalisasi)")
+                st.write("Grafik ini menampilkan nilai fitur siswa setelah dinormalisasi (nilai akademik & kehadiran) atau dalam format biner (ekstrakurikuler).")
+                values_for_plot = list(normalized_numeric_data) + input_cat_ekskul_values
+                labels_for_plot = ["Nilai Akademik (Norm)", "Kehadiran (Norm)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
+                st.image(profile_bar_chart_png("Profil Siswa Baru", labels_for_plot, values_for_plot, palette="viridis"), use_column_width=True)
+
+def select_student(student_index, state_key, widget_key):
+    # Pencarian awalan lewat indeks; selectbox hanya memuat hasil yang cocok
+    # (paling banyak STUDENT_SEARCH_LIMIT), bukan seluruh daftar siswa.
+    kata_kunci = st.text_input(
+        "Cari Nama Siswa",
+        key=f"{widget_key}_cari",
+        placeholder="Ketik awal nama siswa...",
+        help="Daftar di bawah hanya menampilkan siswa yang namanya diawali teks ini."
+    )
+    options = student_index.search_prefix(kata_kunci, STUDENT_SEARCH_LIMIT)
+    selected_label = st.session_state.get(state_key)
+    if not kata_kunci and selected_label in student_index.position_by_label and selected_label not in options:
+        options = [selected_label] + options
+    if not options:
+        st.info(f"Tidak ada siswa yang namanya diawali '{kata_kunci}'.")
+        return None
+    if len(options) >= STUDENT_SEARCH_LIMIT:
+        st.caption(f"Menampilkan {len(options)} dari {len(student_index)} siswa. Ketik nama untuk mempersempit daftar.")
+    selected_label = st.selectbox(
+        "Pilih Nama Siswa",
+        options,
+        index=options.index(selected_label) if selected_label in options else 0,
+        key=widget_key,
+        help="Pilih siswa yang profilnya ingin Anda lihat."
+    )
+    st.session_state[state_key] = selected_label
+    return student_index.position_for_label(selected_label)
+
+def show_cluster_members(df_clustered, student_index, cluster_id, exclude_position, key_prefix):
+    # Anggota klaster diambil dari indeks posisi, diurutkan hanya di dalam
+    # klaster tersebut, lalu hanya satu halaman yang dikirim ke browser.
+    positions = student_index.positions_for_cluster(cluster_id, exclude=exclude_position)
+    if len(positions) == 0:
+        st.info("Tidak ada siswa lain dalam klaster ini.")
+        return
+    st.write(f"Berikut adalah daftar {len(positions)} siswa lain yang juga tergolong dalam klaster ini:")
+    col_sort, col_order, col_size = st.columns([2, 1, 1])
+    with col_sort:
+        sort_col = st.selectbox("Urutkan Berdasarkan", CLUSTER_MEMBER_COLS, key=f"{key_prefix}_urutan_siswa_klaster")
+    with col_order:
+        descending = st.radio("Arah", ["Naik", "Turun"], horizontal=True, key=f"{key_prefix}_arah_siswa_klaster") == "Turun"
+    with col_size:
+        page_size = st.selectbox("Baris per Halaman", CLUSTER_MEMBER_PAGE_SIZES, key=f"{key_prefix}_ukuran_halaman_siswa_klaster")
+    if sort_col in df_clustered.columns:
+        sort_values = df_clustered[sort_col].iloc[positions].reset_index(drop=True)
+        order = sort_values.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+        positions = positions[order]
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input(
+        f"Halaman (dari {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+        key=f"{key_prefix}_halaman_siswa_klaster_{cluster_id}_{page_size}"
+    )
+    start = (min(int(page), n_pages) - 1) * page_size
+    page_df = df_clustered.iloc[positions[start:start + page_size]]
+    page_df = page_df[[col for col in CLUSTER_MEMBER_COLS if col in page_df.columns]]
+    if "Kehadiran" in page_df.columns:
+        page_df = page_df.assign(Kehadiran=pd.to_numeric(page_df["Kehadiran"], errors="coerce") * 100)
+    st.dataframe(page_df, use_container_width=True, hide_index=True, column_config=RESULT_COLUMN_CONFIG)
+    st.caption(f"Menampilkan baris {start + 1}-{start + len(page_df)} dari {len(positions)} siswa.")
+
+def show_results_grid(results_grid, key_prefix):
+    # Filter, urutan, dan halaman dievaluasi di server; hanya satu halaman yang
+    # dikirim ke st.dataframe.
+    with st.expander("Filter & Urutan Data", expanded=False):
+        selected = {}
+        filter_cols = st.columns(len(results_grid.category_cols) or 1)
+        for col, container in zip(results_grid.category_cols, filter_cols):
+            with container:
+                selected[col] = st.multiselect(col, results_grid.categories[col], key=f"{key_prefix}_filter_{col}", placeholder="Semua")
+        ranges = {}
+        for col in results_grid.numeric_cols:
+            low, high = results_grid.numeric_bounds(col)
+            if low == high:
+                continue
+            if col == "Kehadiran":
+                # Kehadiran disimpan sebagai pecahan, ditampilkan dalam persen.
+                low_pct, high_pct = st.slider(f"{col} (%)", low * 100, high * 100, (low * 100, high * 100), key=f"{key_prefix}_rentang_{col}")
+                ranges[col] = (low, high) if (low_pct, high_pct) == (low * 100, high * 100) else (low_pct / 100, high_pct / 100)
+            else:
+                ranges[col] = st.slider(col, low, high, (low, high), key=f"{key_prefix}_rentang_{col}")
+        col_sort, col_order, col_size = st.columns([2, 1, 1])
+        with col_sort:
+            sort_col = st.selectbox("Urutkan Berdasarkan", ["(Urutan asli)"] + list(results_grid.df.columns), key=f"{key_prefix}_urutan_hasil")
+        with col_order:
+            descending = st.radio("Arah", ["Naik", "Turun"], horizontal=True, key=f"{key_prefix}_arah_hasil") == "Turun"
+        with col_size:
+            page_size = st.selectbox("Baris per Halaman", RESULTS_GRID_PAGE_SIZES, key=f"{key_prefix}_ukuran_halaman_hasil")
+    positions = results_grid.filter_positions(selected, ranges)
+    positions = results_grid.sort_positions(positions, None if sort_col == "(Urutan asli)" else sort_col, descending)
+    if len(positions) == 0:
+        st.info("Tidak ada siswa yang cocok dengan filter.")
+        return
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input(f"Halaman (dari {n_pages})", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key_prefix}_halaman_hasil_{n_pages}")
+    page_df, start, _ = results_grid.page(positions, page, page_size)
+    if "Kehadiran" in page_df.columns:
+        page_df = page_df.assign(Kehadiran=pd.to_numeric(page_df["Kehadiran"], errors="coerce") * 100)
+    st.dataframe(page_df, use_container_width=True, hide_index=True, column_config=RESULT_COLUMN_CONFIG)
+    filtered_note = f" (difilter dari {len(results_grid)} siswa)" if len(positions) < len(results_grid) else ""
+    st.caption(f"Menampilkan baris {start + 1}-{start + len(page_df)} dari {len(positions)} siswa{filtered_note}.")
+
+def show_cluster_profile_sections(cluster_profile):
+    labels_for_plot = ["Nilai\n(Norm)", "Kehadiran\n(Norm)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
+    cluster_ids = range(cluster_profile.n_clusters)
+    st.markdown("---")
+    st.markdown("#### Grafik Profil Seluruh Klaster")
+    st.write("📈 Setiap panel menunjukkan rata-rata (numerik, dinormalisasi) atau modus (ekstrakurikuler 0/1) dari fitur-fitur di satu klaster. Sumbu-y sama untuk semua panel.")
+    values_by_cluster = [
+        cluster_profile.scaled_means.loc[i].tolist() + cluster_profile.flag_modes.loc[i].astype(int).tolist()
+        for i in cluster_ids
+    ]
+    st.image(
+        cluster_profiles_chart_png([f"Klaster {i}" for i in cluster_ids], labels_for_plot, values_by_cluster),
+        use_column_width=True
+    )
+    st.markdown("#### Statistik Klaster")
+    st.write("Jumlah siswa, rata-rata nilai & kehadiran (dinormalisasi dan asli), serta persentase siswa yang mengikuti tiap ekstrakurikuler:")
+    st.dataframe(cluster_summary_table(cluster_profile), use_container_width=True)
+    st.markdown("#### Ringkasan Karakteristik Klaster")
+    for i in cluster_ids:
+        st.info(f"Klaster {i} ({cluster_profile.counts[i]} siswa):\n{cluster_profile.descriptions.get(i, 'Deskripsi tidak tersedia.')}")
+
+def show_bulk_pdf_export(df_clustered, cluster_profile, key_prefix):
+    st.subheader("Unduh Laporan Massal (ZIP)")
+    st.write("Buat laporan PDF untuk banyak siswa sekaligus. Setiap siswa mendapat satu file PDF di dalam arsip ZIP.")
+    cakupan_options = ["Semua Siswa", "Per Klaster"]
+    if "Kelas" in df_clustered.columns:
+        cakupan_options.insert(1, "Per Kelas")
+    cakupan = st.radio("Cakupan Laporan", cakupan_options, horizontal=True, key=f"{key_prefix}_cakupan_laporan_massal")
+    df_selected = df_clustered
+    zip_label = "Semua_Siswa"
+    if cakupan == "Per Kelas":
+        kelas_terpilih = st.selectbox("Pilih Kelas", sorted(df_clustered["Kelas"].dropna().unique().tolist(), key=str), key=f"{key_prefix}_kelas_laporan_massal")
+        df_selected = df_clustered[df_clustered["Kelas"] == kelas_terpilih]
+        zip_label = f"Kelas_{kelas_terpilih}"
+    elif cakupan == "Per Klaster":
+        klaster_terpilih = st.selectbox("Pilih Klaster", list(range(cluster_profile.n_clusters)), key=f"{key_prefix}_klaster_laporan_massal")
+        df_selected = df_clustered[df_clustered["Klaster"] == klaster_terpilih]
+        zip_label = f"Klaster_{klaster_terpilih}"
+    st.caption(f"{len(df_selected)} laporan akan dibuat.")
+    if st.button("Buat Arsip ZIP Laporan", key=f"{key_prefix}_buat_zip_laporan", disabled=df_selected.empty):
+        progress_bar = st.progress(0.0, text="Menyiapkan laporan PDF...")
+        def update_report_progress(n_done, n_total):
+            progress_bar.progress(n_done / n_total, text=f"Membuat laporan {n_done}/{n_total}...")
+        # Arsip ditulis ke file sementara di disk, bukan ke memori. File
+        # dihapus di finally, juga bila pembuatan arsip gagal di tengah jalan.
+        zip_file = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+        zip_path = zip_file.name
+        try:
+            with zip_file:
+                n_written, report_errors = write_reports_zip(
+                    zip_file, iter_report_jobs(df_selected, cluster_profile), len(df_selected),
+                    max_workers=1 if len(df_selected) < BULK_REPORT_PARALLEL_MIN_ROWS else None,
+                    on_progress=update_report_progress, cache=get_pdf_cache(current_tenant().cache_dir)
+                )
+            progress_bar.progress(1.0, text=f"{n_written} laporan PDF selesai dibuat.")
+            pdf_cache_stats = get_pdf_cache(current_tenant().cache_dir).stats()
+            st.caption(
+                f"Cache laporan PDF: {pdf_cache_stats['hit_rate']:.0%} hit rate, "
+                f"{pdf_cache_stats['disk_entries']} file, {pdf_cache_stats['disk_bytes'] / (1024 * 1024):.1f} MB di disk."
+            )
+            if report_errors:
+                st.warning(f"{len(report_errors)} laporan gagal dibuat, misalnya {report_errors[0][0]}: {report_errors[0][1]}")
+            if n_written:
+                with open(zip_path, "rb") as zip_reader:
+                    st.download_button(
+                        label="Klik di Sini untuk Mengunduh ZIP",
+                        data=zip_reader,
+                        file_name=f"Laporan_Profil_{zip_label}.zip".replace(" ", "_"),
+                        mime="application/zip",
+                        key=f"{key_prefix}_unduh_zip_laporan",
+                    )
+        finally:
+            os.remove(zip_path)
+
 def show_operator_tu_page():
     st.sidebar.title("MENU NAVIGASI")
+    st.sidebar.caption(f"Madrasah: {st.session_state.tenant_id}")
     st.sidebar.markdown("---")
     
     menu_options = [
@@ -582,6 +1268,16 @@ def show_operator_tu_page():
             st.session_state.current_menu = option
             st.rerun()
 
+    # Praproses/klasterisasi berjalan di latar belakang; menu tetap dapat
+    # dipakai dan kemajuannya terlihat di sidebar dari menu mana pun.
+    collect_finished_jobs()
+    for pending_key, page in [("pending_preprocess", "Praproses & Normalisasi Data"),
+                              ("pending_clustering", "Klasterisasi Data K-Prototypes"),
+                              ("pending_sweep", "Klasterisasi Data K-Prototypes")]:
+        if st.session_state[pending_key] is not None and st.session_state.current_menu != page:
+            with st.sidebar:
+                show_job_progress(pending_key, compact=True)
+
     # Logika untuk menandai tombol aktif
     js_highlight_active_button = f"""
     <script>
@@ -629,7 +1325,7 @@ def show_operator_tu_page():
         st.header("Unggah Data Siswa")
         st.markdown("""
         <div style='background-color:#e3f2fd; padding:15px; border-radius:10px; border-left: 5px solid #2196F3;'>
-        Silakan unggah file Excel (.xlsx) yang berisi dataset siswa. Pastikan file Anda memiliki
+        Silakan unggah file Excel (.xlsx), CSV, atau Parquet yang berisi dataset siswa. Pastikan file Anda memiliki
         kolom-kolom berikut agar sistem dapat bekerja dengan baik:<br><br>
         <ul>
             <li><b>Kolom Identitas:</b> "No", "Nama", "JK", "Kelas"</li>
@@ -640,18 +1336,47 @@ def show_operator_tu_page():
         </div>
         """, unsafe_allow_html=True)
         st.markdown("---")
-        uploaded_file = st.file_uploader("Pilih File Excel Dataset", type=["xlsx"], help="Unggah file Excel Anda di sini. Hanya format .xlsx yang didukung.")
+        uploaded_file = st.file_uploader(
+            "Pilih File Dataset", type=SUPPORTED_EXTENSIONS,
+            help=f"Unggah file Anda di sini. Format yang didukung: {', '.join('.' + ext for ext in SUPPORTED_EXTENSIONS)}. "
+                 "Hanya kolom yang dibutuhkan yang dibaca."
+        )
         if uploaded_file:
-            try:
-                df = pd.read_excel(uploaded_file, engine='openpyxl')
-                st.session_state.df_original = df
-                st.session_state.df_clustered = None
+            # File yang sama (file_id sama) hanya diproses sekali; rerun saat
+            # menu ini terbuka tidak mem-parse ulang maupun mereset hasil klasterisasi.
+            if st.session_state.uploaded_file_id != uploaded_file.file_id:
+                try:
+                    with st.spinner("Membaca file..."):
+                        df = read_uploaded_table(uploaded_file)
+                        save_input(current_tenant(), uploaded_file.getvalue(), uploaded_file.name)
+                    st.session_state.df_original = df
+                    st.session_state.df_original_fingerprint = None
+                    st.session_state.df_preprocessed_for_clustering = None
+                    st.session_state.df_clustered = None
+                    st.session_state.student_index = None
+                    st.session_state.results_grid = None
+                    st.session_state.pending_preprocess = None
+                    st.session_state.pending_clustering = None
+                    st.session_state.pending_sweep = None
+                    st.session_state.pending_visual = None
+                    st.session_state.preprocess_messages = []
+                    st.session_state.clustering_messages = []
+                    st.session_state.k_sweep_messages = []
+                    st.session_state.uploaded_file_id = uploaded_file.file_id
+                    st.session_state.speculative_k_values = start_speculative_jobs(df)
+                except Exception as e:
+                    st.session_state.uploaded_file_id = None
+                    st.error(f"Terjadi kesalahan saat membaca file: {e}. Pastikan format file benar dan tidak rusak.")
+            if st.session_state.uploaded_file_id == uploaded_file.file_id:
+                df = st.session_state.df_original
                 st.success("Data berhasil diunggah! Anda dapat melanjutkan ke langkah praproses.")
                 st.subheader("Preview Data yang Diunggah:")
-                st.dataframe(df, use_container_width=True, height=300)
+                st.dataframe(df.head(UPLOAD_PREVIEW_ROWS), use_container_width=True, height=300)
+                engine_note = f" dengan engine {excel_engine()}" if uploaded_file.name.lower().endswith(".xlsx") else ""
+                st.caption(f"{len(df):,} baris, {len(df.columns)} kolom dibaca{engine_note}; menampilkan {min(len(df), UPLOAD_PREVIEW_ROWS)} baris pertama.")
+                k_values = ", ".join(str(k) for k in st.session_state.get("speculative_k_values", []))
+                st.caption(f"Praproses dan klasterisasi untuk K = {k_values} sudah mulai disiapkan di latar belakang.")
                 st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-            except Exception as e:
-                st.error(f"Terjadi kesalahan saat membaca file: {e}. Pastikan format file Excel benar dan tidak rusak.")
 
     elif st.session_state.current_menu == "Praproses & Normalisasi Data":
         st.header("Praproses Data & Normalisasi Z-score")
@@ -670,15 +1395,19 @@ def show_operator_tu_page():
             """, unsafe_allow_html=True)
             st.markdown("---")
             if st.button("Jalankan Praproses & Normalisasi"):
-                with st.spinner("Sedang memproses dan menormalisasi data..."):
-                    df_preprocessed, scaler = preprocess_data(st.session_state.df_original)
-                if df_preprocessed is not None and scaler is not None:
-                    st.session_state.df_preprocessed_for_clustering = df_preprocessed
-                    st.session_state.scaler = scaler
-                    st.success("Praproses dan Normalisasi berhasil dilakukan. Data siap untuk klasterisasi!")
-                    st.subheader("Data Setelah Praproses dan Normalisasi:")
-                    st.dataframe(st.session_state.df_preprocessed_for_clustering, use_container_width=True, height=300)
-                    st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
+                # Biasanya sudah selesai secara spekulatif setelah unggah dan
+                # langsung diterapkan; jika belum, kemajuannya ditampilkan.
+                job = submit_preprocess_job(get_job_manager(), st.session_state.df_original, original_fingerprint())
+                st.session_state.pending_preprocess = {"key": job.key}
+                st.session_state.preprocess_messages = []
+                collect_finished_jobs()
+            if st.session_state.pending_preprocess is not None:
+                show_job_progress("pending_preprocess")
+            show_job_messages(st.session_state.preprocess_messages)
+            if st.session_state.df_preprocessed_for_clustering is not None:
+                st.subheader("Data Setelah Praproses dan Normalisasi:")
+                st.dataframe(st.session_state.df_preprocessed_for_clustering, use_container_width=True, height=300)
+                st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
     elif st.session_state.current_menu == "Klasterisasi Data K-Prototypes":
         st.header("Klasterisasi K-Prototypes")
@@ -695,122 +1424,113 @@ def show_operator_tu_page():
             </div>
             """, unsafe_allow_html=True)
             st.markdown("---")
-            k = st.slider("Pilih Jumlah Klaster (K)", 2, 6, value=st.session_state.n_clusters,
+            with st.expander("🔍 Cari K Terbaik (Kurva Elbow & Silhouette)"):
+                st.write(
+                    "Model untuk setiap nilai K dilatih secara paralel di latar belakang. Kurva elbow menampilkan total biaya (cost) "
+                    "K-Prototypes, sedangkan skor silhouette (semakin tinggi semakin baik) dihitung dengan ukuran "
+                    "jarak campuran numerik-kategorikal. Setelah pencarian selesai, memilih K mana pun di bawah "
+                    "tidak memerlukan pelatihan ulang."
+                )
+                k_sweep_max = st.slider("Uji K dari 2 hingga", K_MIN + 1, K_MAX, value=K_MAX, key="k_sweep_max")
+                sweep_minibatch = use_minibatch(st.session_state.df_preprocessed_for_clustering)
+                if sweep_minibatch:
+                    st.caption(f"Data berisi {MINIBATCH_MIN_ROWS:,} baris atau lebih: setiap K dilatih dengan mode mini-batch.")
+                if st.button("Jalankan Pencarian K"):
+                    k_values = list(range(K_MIN, k_sweep_max + 1))
+                    jobs = submit_k_sweep_jobs(
+                        get_job_manager(), st.session_state.df_original, st.session_state.df_preprocessed_for_clustering,
+                        k_values, sweep_minibatch, current_tenant().cache_dir
+                    )
+                    st.session_state.pending_sweep = {
+                        "keys": [job.key for job in jobs], "k_values": k_values, "label": "Pencarian K",
+                    }
+                    st.session_state.k_sweep_messages = []
+                    collect_finished_jobs()
+                if st.session_state.pending_sweep is not None:
+                    show_job_progress("pending_sweep")
+                show_job_messages(st.session_state.k_sweep_messages)
+                k_sweep_summary = st.session_state.k_sweep_summary
+                if k_sweep_summary is not None and not k_sweep_summary.empty:
+                    col_elbow, col_silhouette = st.columns(2)
+                    with col_elbow:
+                        st.markdown("#### Kurva Elbow (Cost)")
+                        st.line_chart(k_sweep_summary.set_index("K")[["Cost"]])
+                    with col_silhouette:
+                        st.markdown("#### Skor Silhouette")
+                        st.line_chart(k_sweep_summary.set_index("K")[["Silhouette"]])
+                    st.dataframe(k_sweep_summary.round(4), use_container_width=True, hide_index=True)
+                    if k_sweep_summary["Silhouette"].notna().any():
+                        k_terbaik = int(k_sweep_summary.loc[k_sweep_summary["Silhouette"].idxmax(), "K"])
+                        st.success(f"Skor silhouette tertinggi diperoleh pada K = {k_terbaik}.")
+            k = st.slider("Pilih Jumlah Klaster (K)", K_MIN, K_MAX, value=st.session_state.n_clusters,
                             help="Pilih berapa banyak kelompok siswa yang ingin Anda bentuk.")
+            simpan_excel = st.checkbox(
+                f"Simpan juga salinan Excel ('{current_tenant().excel_file}')", value=False,
+                help="Hasil utama selalu diterbitkan sebagai bundel biner yang ringkas. Salinan Excel bersifat opsional."
+            )
+            gunakan_minibatch = st.checkbox(
+                "Gunakan mode mini-batch (untuk data berukuran sangat besar)",
+                value=use_minibatch(st.session_state.df_preprocessed_for_clustering),
+                help=f"Data diproses per potongan {MINIBATCH_CHUNK_SIZE:,} baris dengan normalisasi online sehingga memori tetap terbatas. "
+                     f"Aktif otomatis untuk data dengan {MINIBATCH_MIN_ROWS:,} baris atau lebih."
+            )
+            previous_run_id = None if gunakan_minibatch else find_previous_run_id(k)
+            gunakan_warm_start = False
+            if previous_run_id is not None:
+                gunakan_warm_start = st.checkbox(
+                    f"Lanjutkan dari model sebelumnya ({previous_run_id})",
+                    value=True,
+                    help="Warm start: hanya baris yang berubah (berdasarkan kolom 'No') yang dideteksi, lalu model dilatih ulang "
+                         "mulai dari centroid run sebelumnya dengan satu inisialisasi. Jika lebih dari separuh data berubah, "
+                         "klasterisasi penuh dijalankan."
+                )
             if st.button("Jalankan Klasterisasi"):
-                with st.spinner(f"Melakukan klasterisasi dengan {k} klaster..."):
-                    df_clustered, kproto_model, categorical_features_indices = run_kprototypes_clustering(
-                        st.session_state.df_preprocessed_for_clustering, k
+                st.session_state.clustering_messages = []
+                # Warm start maupun klasterisasi penuh berjalan di latar
+                # belakang. Bila warm start tidak dapat dipakai, klasterisasi
+                # penuh dijalankan otomatis; bila fit spekulatif untuk K ini
+                # sudah selesai, hasilnya langsung dipakai.
+                if gunakan_warm_start:
+                    job = submit_warm_start_job(
+                        get_job_manager(), st.session_state.df_original, st.session_state.df_preprocessed_for_clustering,
+                        st.session_state.scaler, current_tenant().registry_dir, previous_run_id, k
                     )
-                if df_clustered is not None:
-                    df_final = st.session_state.df_original.copy()
-                    df_final['Klaster'] = df_clustered['Klaster']
-                    st.session_state.df_clustered = df_final
-                    st.session_state.kproto_model = kproto_model
-                    st.session_state.categorical_features_indices = categorical_features_indices
-                    st.session_state.n_clusters = k
-                    st.session_state.cluster_characteristics_map = generate_cluster_descriptions(
-                        df_clustered, k, NUMERIC_COLS, CATEGORICAL_COLS
+                else:
+                    job = submit_clustering_job(
+                        get_job_manager(), st.session_state.df_original, st.session_state.df_preprocessed_for_clustering,
+                        k, gunakan_minibatch, current_tenant().cache_dir
                     )
-                    st.success(f"Klasterisasi selesai dengan {k} klaster! Hasil pengelompokan siswa telah tersedia.")
-                    st.markdown("---")
-                    st.subheader("Data Hasil Klasterisasi (Disertai Data Asli):")
-                    st.dataframe(df_final, use_container_width=True, height=300)
-                    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
-                    st.subheader("Ringkasan Klaster: Jumlah Siswa per Kelompok")
-                    jumlah_per_klaster = df_final["Klaster"].value_counts().sort_index().reset_index()
-                    jumlah_per_klaster.columns = ["Klaster", "Jumlah Siswa"]
-                    st.table(jumlah_per_klaster)
-                    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
-                    st.subheader(f"Karakteristik Umum Klaster ({st.session_state.n_clusters} Klaster):")
-                    st.write("Berikut adalah deskripsi singkat untuk setiap klaster yang terbentuk:")
-                    for cluster_id, desc in st.session_state.cluster_characteristics_map.items():
-                        with st.expander(f"Klaster {cluster_id}"):
-                            st.markdown(desc)
-                    
-                    try:
-                        df_final_for_kepsek = df_final.copy()
-                        df_final_for_kepsek['Kehadiran'] = df_final_for_kepsek['Kehadiran'].apply(lambda x: f"{x:.2%}")
-                        file_name = "Data MA-ALHIKMAH.xlsx"
-                        df_final_for_kepsek.to_excel(file_name, index=False)
-                        st.success(f"Hasil klasterisasi berhasil disimpan ke file '{file_name}' untuk diakses oleh Kepala Sekolah.")
-                    except Exception as e:
-                        st.error(f"Gagal menyimpan file Excel untuk Kepala Sekolah: {e}")
+                st.session_state.pending_clustering = {
+                    "key": job.key, "n_clusters": k, "minibatch": gunakan_minibatch, "simpan_excel": simpan_excel,
+                    "warm_start": gunakan_warm_start, "warm_start_skip_reason": None,
+                }
+                collect_finished_jobs()
+            if st.session_state.pending_clustering is not None:
+                show_job_progress("pending_clustering")
+                st.caption("Anda dapat membuka menu lain selama klasterisasi berjalan; hasilnya diterapkan otomatis setelah selesai.")
+            show_job_messages(st.session_state.clustering_messages)
+            if st.session_state.df_clustered is not None and st.session_state.cluster_profile is not None:
+                st.markdown("---")
+                st.subheader("Ringkasan Klaster: Jumlah Siswa per Kelompok")
+                jumlah_per_klaster = st.session_state.df_clustered["Klaster"].value_counts().sort_index().reset_index()
+                jumlah_per_klaster.columns = ["Klaster", "Jumlah Siswa"]
+                st.table(jumlah_per_klaster)
+                st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+                st.subheader(f"Karakteristik Umum Klaster ({st.session_state.n_clusters} Klaster):")
+                st.write("Berikut adalah deskripsi singkat untuk setiap klaster yang terbentuk:")
+                for cluster_id, desc in st.session_state.cluster_profile.descriptions.items():
+                    with st.expander(f"Klaster {cluster_id}"):
+                        st.markdown(desc)
+
+            # Di luar blok tombol agar filter dan halaman tabel tetap tampil saat
+            # widget-nya diubah (setiap perubahan memicu rerun).
+            if st.session_state.df_clustered is not None and st.session_state.results_grid is not None:
+                st.markdown("---")
+                st.subheader("Data Hasil Klasterisasi (Disertai Data Asli):")
+                show_results_grid(st.session_state.results_grid, "tu")
 
     elif st.session_state.current_menu == "Prediksi Klaster Siswa Baru":
-        st.header("Prediksi Klaster untuk Siswa Baru")
-        if st.session_state.kproto_model is None or st.session_state.scaler is None:
-            st.warning("Silakan lakukan klasterisasi terlebih dahulu di menu 'Klasterisasi Data K-Prototypes' untuk melatih model dan scaler.")
-        else:
-            st.markdown("""
-            <div style='background-color:#f1f9ff; padding:15px; border-radius:10px; border-left: 5px solid #2C2F7F;'>
-            Halaman ini memungkinkan Anda untuk memprediksi klaster bagi siswa baru. Masukkan data nilai akademik,
-            kehadiran, dan keterlibatan ekstrakurikuler siswa. Sistem akan otomatis memproses data
-            dan memetakan siswa ke klaster yang paling sesuai berdasarkan model yang telah dilatih.
-            <br><br>
-            Pemanfaatan klaster membantu guru dalam merancang strategi pembinaan dan pendekatan pembelajaran
-            yang lebih personal dan efektif.
-            </div>
-            """, unsafe_allow_html=True)
-            st.markdown("---")
-            with st.form("form_input_siswa_baru", clear_on_submit=False):
-                st.markdown("### Input Data Siswa Baru")
-                st.markdown("<div style='margin-bottom: 15px;'></div>", unsafe_allow_html=True)
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("#### Data Akademik & Kehadiran")
-                    input_rata_nilai = st.number_input("Rata-rata Nilai Akademik (0 - 100)", min_value=0.0, max_value=100.0, value=None, placeholder="Contoh: 85.5", format="%.2f", key="input_nilai_prediksi")
-                    input_kehadiran = st.number_input("Persentase Kehadiran (0.0 - 1.0)", min_value=0.0, max_value=1.0, value=None, placeholder="Contoh: 0.95 (untuk 95%)", format="%.2f", key="input_kehadiran_prediksi")
-                with col2:
-                    st.markdown("#### Keikutsertaan Ekstrakurikuler")
-                    st.write("Centang ekstrakurikuler yang diikuti siswa:")
-                    input_cat_ekskul_values = []
-                    for idx, col in enumerate(CATEGORICAL_COLS):
-                        val = st.checkbox(col.replace("Ekstrakurikuler ", ""), key=f"ekskul_prediksi_{idx}")
-                        input_cat_ekskul_values.append(1 if val else 0)
-                st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                submitted = st.form_submit_button("Prediksi Klaster Siswa")
-            if submitted:
-                if input_rata_nilai is None or input_kehadiran is None:
-                    st.error("Harap isi semua nilai numerik (Rata-rata Nilai Akademik dan Persentase Kehadiran) terlebih dahulu.")
-                else:
-                    input_numeric_data = [input_rata_nilai, input_kehadiran]
-                    normalized_numeric_data = st.session_state.scaler.transform([input_numeric_data])[0]
-                    new_student_data_for_prediction = np.array(
-                        list(normalized_numeric_data) + input_cat_ekskul_values, dtype=object
-                    ).reshape(1, -1)
-                    predicted_cluster = st.session_state.kproto_model.predict(
-                        new_student_data_for_prediction, categorical=st.session_state.categorical_features_indices
-                    )
-                    st.success(f"Prediksi Klaster: Siswa Baru Ini Masuk ke Klaster {predicted_cluster[0]}!")
-                    st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                    klaster_desc_for_new_student = st.session_state.cluster_characteristics_map.get(predicted_cluster[0], "Deskripsi klaster tidak tersedia.")
-                    st.markdown(f"""
-                    <div style='background-color:#e8f5e9; padding:15px; border-radius:10px; border-left: 5px solid #4CAF50;'>
-                    <b>Karakteristik Klaster {predicted_cluster[0]}:</b><br>
-                    {klaster_desc_for_new_student}
-                    <br><br>
-                    Informasi ini sangat membantu guru dalam memberikan bimbingan dan dukungan yang tepat sasaran
-                    sesuai dengan profil klaster siswa.
-                    </div>
-                    """, unsafe_allow_html=True)
-                    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
-                    st.subheader("Visualisasi Karakteristik Siswa Baru (Dinormalisasi)")
-                    st.write("Grafik ini menampilkan nilai fitur siswa setelah dinormalisasi (nilai akademik & kehadiran) atau dalam format biner (ekstrakurikuler).")
-                    values_for_plot = list(normalized_numeric_data) + input_cat_ekskul_values
-                    labels_for_plot = ["Nilai Akademik (Norm)", "Kehadiran (Norm)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    bars = sns.barplot(x=labels_for_plot, y=values_for_plot, palette="viridis", ax=ax)
-                    ax.set_ylim(min(values_for_plot) - 0.2 if values_for_plot else -1, max(values_for_plot) + 0.2 if values_for_plot else 1)
-                    for index, value in enumerate(values_for_plot):
-                        ax.text(bars.patches[index].get_x() + bars.patches[index].get_width() / 2,
-                                bars.patches[index].get_height() + (0.05 if value >= 0 else -0.1),
-                                f"{value:.2f}", ha='center', fontsize=9, weight='bold')
-                    ax.set_title("Profil Siswa Baru", fontsize=16, weight='bold')
-                    ax.set_ylabel("Nilai (Dinormalisasi / Biner)")
-                    plt.xticks(rotation=0)
-                    plt.tight_layout()
-                    st.pyplot(fig)
+        show_prediksi_siswa_baru_page()
 
     elif st.session_state.current_menu == "Visualisasi & Profil Klaster":
         st.header("Visualisasi dan Interpretasi Profil Klaster")
@@ -828,51 +1548,49 @@ def show_operator_tu_page():
             </div>
             """, unsafe_allow_html=True)
             st.markdown("---")
-            k_visual = st.slider("Jumlah Klaster (K) untuk visualisasi", 2, 6, value=st.session_state.n_clusters,
+            k_visual = st.slider("Jumlah Klaster (K) untuk visualisasi", K_MIN, K_MAX, value=st.session_state.n_clusters,
                                  help="Geser untuk memilih jumlah klaster yang ingin Anda visualisasikan. Ini akan melatih ulang model sementara untuk tujuan visualisasi.")
-            df_for_visual_clustering, kproto_visual, cat_indices_visual = run_kprototypes_clustering(
-                st.session_state.df_preprocessed_for_clustering, k_visual
+            # Model sementara dilatih di latar belakang seperti klasterisasi
+            # utama; kunci pekerjaan dan cache membuat K yang sudah pernah
+            # dipilih (atau sudah difit secara spekulatif) langsung tersedia.
+            job = submit_clustering_job(
+                get_job_manager(), st.session_state.df_original, st.session_state.df_preprocessed_for_clustering,
+                k_visual, use_minibatch(st.session_state.df_preprocessed_for_clustering), current_tenant().cache_dir
+            )
+            df_for_visual_clustering = None
+            if not job.done():
+                st.session_state.pending_visual = {"key": job.key}
+                show_job_progress("pending_visual")
+            else:
+                st.session_state.pending_visual = None
+                result, error = job.outcome()
+                if error is not None:
+                    st.error(f"Terjadi kesalahan saat menjalankan K-Prototypes: {error}. Pastikan data Anda cukup bervariasi untuk jumlah klaster yang dipilih.")
+                else:
+                    df_for_visual_clustering = result[0]
+            # Fit berjalan di proses pekerja; statistiknya dikumpulkan JobManager.
+            cache_stats = get_job_manager().clustering_cache_stats(current_tenant().cache_dir)
+            if cache_stats is None:
+                cache_stats = get_clustering_cache(current_tenant().cache_dir).stats()
+            st.caption(
+                f"Cache hasil klasterisasi: {cache_stats['memory_hits']} hit memori, "
+                f"{cache_stats['disk_hits']} hit disk, {cache_stats['misses']} miss "
+                f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['disk_entries']} entri, "
+                f"{cache_stats['disk_bytes'] / (1024 * 1024):.1f} MB di disk)."
             )
             if df_for_visual_clustering is not None:
-                cluster_characteristics_map_visual = generate_cluster_descriptions(
-                    df_for_visual_clustering, k_visual, NUMERIC_COLS, CATEGORICAL_COLS
+                cluster_profile_visual = build_cluster_profile(
+                    df_for_visual_clustering, st.session_state.df_original, df_for_visual_clustering["Klaster"],
+                    k_visual, NUMERIC_COLS, CATEGORICAL_COLS
                 )
                 st.markdown(f"### Menampilkan Profil Klaster untuk K = {k_visual}")
                 st.write("Visualisasi ini menggunakan data yang telah dinormalisasi (nilai, kehadiran) atau dikodekan (ekstrakurikuler 0/1).")
-                for i in range(k_visual):
-                    st.markdown(f"---")
-                    st.subheader(f"Klaster {i}")
-                    cluster_data = df_for_visual_clustering[df_for_visual_clustering["Klaster"] == i]
-                    col1, col2 = st.columns([1, 2])
-                    with col1:
-                        st.markdown("#### Statistik Klaster")
-                        st.markdown(f"Jumlah Siswa: {len(cluster_data)}")
-                        st.write("Rata-rata Nilai & Kehadiran (Dinormalisasi):")
-                        st.dataframe(cluster_data[NUMERIC_COLS].mean().round(2).to_frame(name='Rata-rata'), use_container_width=True)
-                        st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                        st.write("Kecenderungan Ekstrakurikuler (Modus):")
-                        mode_ekskul_display = cluster_data[CATEGORICAL_COLS].mode().iloc[0].apply(lambda x: 'Ya' if x == '1' else 'Tidak')
-                        st.dataframe(mode_ekskul_display.to_frame(name='Paling Umum'), use_container_width=True)
-                        st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                        st.info(f"Ringkasan Karakteristik Klaster {i}:\n{cluster_characteristics_map_visual.get(i, 'Deskripsi tidak tersedia.')}")
-                    with col2:
-                        st.markdown("#### Grafik Profil Klaster")
-                        st.write("📈 Visualisasi ini menunjukkan rata-rata (numerik) atau modus (kategorikal) dari fitur-fitur di klaster ini.")
-                        values_for_plot_numeric = cluster_data[NUMERIC_COLS].mean().tolist()
-                        values_for_plot_ekskul = [int(cluster_data[col].mode().iloc[0]) for col in CATEGORICAL_COLS]
-                        values_for_plot = values_for_plot_numeric + values_for_plot_ekskul
-                        labels_for_plot = ["Nilai (Norm)", "Kehadiran (Norm)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        bars = sns.barplot(x=labels_for_plot, y=values_for_plot, palette="cubehelix", ax=ax)
-                        ax.set_ylim(min(values_for_plot) - 0.2 if values_for_plot else -1, max(values_for_plot) + 0.2 if values_for_plot else 1)
-                        for index, value in enumerate(values_for_plot):
-                            offset = 0.05 if value >= 0 else -0.1
-                            ax.text(bars.patches[index].get_x() + bars.patches[index].get_width() / 2, bars.patches[index].get_height() + offset, f"{value:.2f}", ha='center', fontsize=9, weight='bold')
-                        ax.set_title(f"Profil Klaster {i}", fontsize=16, weight='bold')
-                        ax.set_ylabel("Nilai (Dinormalisasi / Biner)")
-                        plt.xticks(rotation=0)
-                        plt.tight_layout()
-                        st.pyplot(fig)
+                show_cluster_profile_sections(cluster_profile_visual)
+                metrik_grafik = chart_metrics()
+                st.caption(
+                    f"Grafik: {metrik_grafik['cache_hits']} dari cache, {metrik_grafik['cache_misses']} dirender, "
+                    f"{metrik_grafik['cached_charts']} PNG tersimpan, {metrik_grafik['live_figures']} figur matplotlib aktif."
+                )
                 st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
     elif st.session_state.current_menu == "Lihat Profil Siswa Individual":
@@ -883,26 +1601,16 @@ def show_operator_tu_page():
             st.info("Pilih nama siswa dari daftar di bawah untuk melihat detail profil mereka, termasuk klaster tempat mereka berada dan karakteristiknya.")
             st.markdown("---")
             df_original_with_cluster = st.session_state.df_clustered
-            default_index = 0
-            if "selected_student_name" in st.session_state and st.session_state.selected_student_name in df_original_with_cluster["Nama"].unique():
-                try:
-                    default_index = list(df_original_with_cluster["Nama"].unique()).index(st.session_state.selected_student_name)
-                except ValueError:
-                    default_index = 0
-            nama_terpilih = st.selectbox(
-                "Pilih Nama Siswa",
-                df_original_with_cluster["Nama"].unique(),
-                index=default_index,
-                key="pilih_nama_siswa_selectbox_tu",
-                help="Pilih siswa yang profilnya ingin Anda lihat."
-            )
-            st.session_state.selected_student_name = nama_terpilih
-            if nama_terpilih:
-                siswa_data = df_original_with_cluster[df_original_with_cluster["Nama"] == nama_terpilih].iloc[0]
+            if st.session_state.student_index is None:
+                st.session_state.student_index = StudentIndex.from_frame(df_original_with_cluster)
+            posisi_siswa = select_student(st.session_state.student_index, "selected_student_name", "pilih_nama_siswa_selectbox_tu")
+            if posisi_siswa is not None:
+                siswa_data = df_original_with_cluster.iloc[posisi_siswa]
+                nama_terpilih = siswa_data["Nama"]
                 klaster_siswa_terpilih = siswa_data['Klaster']
                 st.success(f"Siswa {nama_terpilih} tergolong dalam Klaster {klaster_siswa_terpilih} (hasil dari {st.session_state.n_clusters} klaster).")
                 st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                klaster_desc_for_new_student = st.session_state.cluster_characteristics_map.get(klaster_siswa_terpilih, "Deskripsi klaster tidak tersedia.")
+                klaster_desc_for_new_student = st.session_state.cluster_profile.descriptions.get(klaster_siswa_terpilih, "Deskripsi klaster tidak tersedia.")
                 st.markdown(f"""
                 <div style='background-color:#f0f4f7; padding:15px; border-radius:10px; border-left: 5px solid {PRIMARY_COLOR};'>
                 <b>Karakteristik Klaster Ini:</b><br>
@@ -941,34 +1649,13 @@ def show_operator_tu_page():
                         siswa_data[col] * 100 for col in CATEGORICAL_COLS
                     ]
                     values_siswa_plot = values_siswa_plot_numeric + values_siswa_plot_ekskul
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    bars = sns.barplot(x=labels_siswa_plot, y=values_siswa_plot, palette="magma", ax=ax)
-                    max_plot_val = max(values_siswa_plot) if values_siswa_plot else 100
-                    ax.set_ylim(0, max(100, max_plot_val * 1.1))
-                    for bar, val in zip(bars.patches, values_siswa_plot):
-                        ax.text(bar.get_x() + bar.get_width() / 2, val + (ax.get_ylim()[1] * 0.02), f"{val:.1f}", ha='center', fontsize=9, weight='bold')
-                    ax.set_title(f"Grafik Profil Siswa - {nama_terpilih}", fontsize=16, weight='bold')
-                    ax.set_ylabel("Nilai / Status (%)")
-                    plt.xticks(rotation=0)
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                    st.image(percent_bar_chart_png(f"Grafik Profil Siswa - {nama_terpilih}", labels_siswa_plot, values_siswa_plot), use_column_width=True)
                 st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
                 st.subheader(f"Siswa Lain di Klaster {klaster_siswa_terpilih}:")
-                siswa_lain_di_klaster = df_original_with_cluster[
-                    (df_original_with_cluster['Klaster'] == klaster_siswa_terpilih) &
-                    (df_original_with_cluster['Nama'] != nama_terpilih)
-                ]
-                if not siswa_lain_di_klaster.empty:
-                    st.write("Berikut adalah daftar siswa lain yang juga tergolong dalam klaster ini:")
-                    display_cols_for_others = ["No", "Nama", "JK", "Kelas", "Rata Rata Nilai Akademik", "Kehadiran"]
-                    display_df_others = siswa_lain_di_klaster[display_cols_for_others].copy()
-                    display_df_others["Kehadiran"] = display_df_others["Kehadiran"].apply(lambda x: f"{x:.2%}")
-                    st.dataframe(display_df_others, use_container_width=True)
-                else:
-                    st.info("Tidak ada siswa lain dalam klaster ini.")
+                show_cluster_members(df_original_with_cluster, st.session_state.student_index, klaster_siswa_terpilih, posisi_siswa, "tu")
                 st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
                 st.subheader("Unduh Laporan Profil Siswa (PDF)")
-                if st.session_state.cluster_characteristics_map:
+                if st.session_state.cluster_profile is not None:
                     if st.button("Generate & Unduh Laporan PDF", key="unduh_pdf_tu", help="Klik untuk membuat laporan PDF profil siswa ini."):
                         with st.spinner("Menyiapkan laporan PDF..."):
                             siswa_data_for_pdf = siswa_data.drop(labels=["Klaster"]).to_dict()
@@ -976,7 +1663,7 @@ def show_operator_tu_page():
                                 nama_terpilih,
                                 siswa_data_for_pdf,
                                 siswa_data["Klaster"],
-                                st.session_state.cluster_characteristics_map
+                                st.session_state.cluster_profile
                             )
                         if pdf_data_bytes:
                             st.success("Laporan PDF berhasil disiapkan!")
@@ -990,42 +1677,35 @@ def show_operator_tu_page():
                             )
                 else:
                     st.warning("Mohon lakukan klasterisasi terlebih dahulu (Menu 'Klasterisasi Data K-Prototypes') untuk menghasilkan data profil PDF.")
+                if st.session_state.cluster_profile is not None:
+                    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+                    show_bulk_pdf_export(df_original_with_cluster, st.session_state.cluster_profile, "tu")
 
 
 def show_kepala_sekolah_page():
-    file_path = "Data MA-ALHIKMAH.xlsx"
-    df_kepsek_load = None
-    if os.path.exists(file_path):
+    # Tabel hasil tidak disalin ke session_state: semua sesi merujuk objek
+    # bersama dari get_published_result, sesi hanya menyimpan pilihan UI.
+    file_path = find_result_file(current_tenant())
+    published = None
+    published_version = None
+    if file_path is not None:
         try:
-            df_kepsek_load = pd.read_excel(file_path, engine='openpyxl')
-            st.session_state.df_clustered = df_kepsek_load
-            
-            if 'df_original' not in st.session_state or st.session_state.df_original is None:
-                df_original_from_clustered = df_kepsek_load.copy()
-                if df_original_from_clustered['Kehadiran'].dtype == 'object':
-                    df_original_from_clustered['Kehadiran'] = df_original_from_clustered['Kehadiran'].str.rstrip('%').astype('float') / 100
-                st.session_state.df_original = df_original_from_clustered.drop(columns=['Klaster'], errors='ignore')
-
-                n_clusters_kepsek = len(df_kepsek_load['Klaster'].unique())
-                st.session_state.n_clusters = n_clusters_kepsek
-                
-                df_preprocessed, scaler = preprocess_data(st.session_state.df_original)
-                if df_preprocessed is not None:
-                    df_preprocessed['Klaster'] = df_kepsek_load['Klaster']
-                    st.session_state.cluster_characteristics_map = generate_cluster_descriptions(
-                        df_preprocessed, n_clusters_kepsek, NUMERIC_COLS, CATEGORICAL_COLS
-                    )
+            published_version = result_version(file_path)
+            published = get_published_result(file_path, published_version)
         except Exception as e:
             st.error(f"Terjadi kesalahan saat membaca file '{file_path}': {e}.")
-            st.session_state.df_clustered = None
-            
+
     st.sidebar.title("MENU NAVIGASI")
+    st.sidebar.caption(f"Madrasah: {st.session_state.tenant_id}")
+    if published_version is not None and published_version[0] == "generasi" and published_version[1]:
+        st.sidebar.caption(f"Hasil terbit: generasi {published_version[1]}")
     st.sidebar.markdown("---")
     
     kepsek_menu_options = [
         "Lihat Hasil Klasterisasi",
         "Visualisasi & Profil Klaster",
-        "Lihat Profil Siswa Individual"
+        "Lihat Profil Siswa Individual",
+        "Prediksi Klaster Siswa Baru"
     ]
     if 'kepsek_current_menu' not in st.session_state:
         st.session_state.kepsek_current_menu = kepsek_menu_options[0]
@@ -1034,7 +1714,8 @@ def show_kepala_sekolah_page():
         icon_map = {
             "Lihat Hasil Klasterisasi": "📋",
             "Visualisasi & Profil Klaster": "📈",
-            "Lihat Profil Siswa Individual": "👤"
+            "Lihat Profil Siswa Individual": "👤",
+            "Prediksi Klaster Siswa Baru": "🔮"
         }
         display_name = f"{icon_map.get(option, '')} {option}"
         button_key = f"kepsek_nav_button_{option.replace(' ', '_').replace('&', 'and')}"
@@ -1086,9 +1767,13 @@ def show_kepala_sekolah_page():
         st.rerun()
     
     st.title("👨‍💼 Dasbor Kepala Sekolah")
+
+    if st.session_state.kepsek_current_menu == "Prediksi Klaster Siswa Baru":
+        show_prediksi_siswa_baru_page()
+        return
     
-    if st.session_state.df_clustered is None or st.session_state.df_clustered.empty:
-        st.warning(f"File hasil klasterisasi 'Data MA-ALHIKMAH.xlsx' tidak ditemukan atau tidak valid. Mohon minta Operator TU untuk memproses dan menyimpan hasilnya terlebih dahulu.")
+    if published is None or published.df_clustered.empty:
+        st.warning(f"Hasil klasterisasi ('{current_tenant().bundle_dir}' atau '{current_tenant().excel_file}') tidak ditemukan atau tidak valid. Mohon minta Operator TU untuk memproses dan menyimpan hasilnya terlebih dahulu.")
         return
 
     if st.session_state.kepsek_current_menu == "Lihat Hasil Klasterisasi":
@@ -1097,11 +1782,11 @@ def show_kepala_sekolah_page():
         st.markdown("---")
         
         st.subheader("Data Hasil Klasterisasi")
-        st.dataframe(st.session_state.df_clustered, use_container_width=True, height=300)
+        show_results_grid(published.results_grid, "kepsek")
         
         st.markdown("---")
         st.subheader("Ringkasan Klaster: Jumlah Siswa per Kelompok")
-        jumlah_per_klaster = st.session_state.df_clustered["Klaster"].value_counts().sort_index().reset_index()
+        jumlah_per_klaster = published.df_clustered["Klaster"].value_counts().sort_index().reset_index()
         jumlah_per_klaster.columns = ["Klaster", "Jumlah Siswa"]
         st.table(jumlah_per_klaster)
     
@@ -1110,61 +1795,14 @@ def show_kepala_sekolah_page():
         st.info("Anda dapat melihat visualisasi dan ringkasan karakteristik dari setiap kelompok siswa.")
         st.markdown("---")
         
-        if not st.session_state.cluster_characteristics_map:
+        if published.cluster_profile is None:
             st.warning("Deskripsi klaster tidak tersedia. Mohon Operator TU memproses data terlebih dahulu.")
             return
 
-        st.subheader(f"Karakteristik Umum Klaster ({st.session_state.n_clusters} Klaster):")
+        st.subheader(f"Karakteristik Umum Klaster ({published.n_clusters} Klaster):")
         st.write("Berikut adalah deskripsi singkat untuk setiap klaster yang terbentuk:")
         
-        for i in range(st.session_state.n_clusters):
-            st.markdown(f"---")
-            st.subheader(f"Klaster {i}")
-            cluster_data = st.session_state.df_clustered[st.session_state.df_clustered["Klaster"] == i]
-            
-            col1, col2 = st.columns([1, 2])
-            with col1:
-                st.markdown("#### Statistik Klaster")
-                st.markdown(f"Jumlah Siswa: {len(cluster_data)}")
-                
-                df_preprocessed_temp, scaler_temp = preprocess_data(st.session_state.df_original)
-                if df_preprocessed_temp is not None:
-                    df_preprocessed_temp['Klaster'] = st.session_state.df_clustered['Klaster']
-                    cluster_data_norm = df_preprocessed_temp[df_preprocessed_temp["Klaster"] == i]
-                    st.write("Rata-rata Nilai & Kehadiran (Dinormalisasi):")
-                    st.dataframe(cluster_data_norm[NUMERIC_COLS].mean().round(2).to_frame(name='Rata-rata'), use_container_width=True)
-
-                st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                st.write("Kecenderungan Ekstrakurikuler (Modus):")
-                mode_ekskul_display = cluster_data[CATEGORICAL_COLS].mode().iloc[0].apply(lambda x: 'Ya' if x == '1' else 'Tidak')
-                st.dataframe(mode_ekskul_display.to_frame(name='Paling Umum'), use_container_width=True)
-                
-                st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
-                st.info(f"Ringkasan Karakteristik Klaster {i}:\n{st.session_state.cluster_characteristics_map.get(i, 'Deskripsi tidak tersedia.')}")
-            
-            with col2:
-                st.markdown("#### Grafik Profil Klaster")
-                st.write("📈 Visualisasi ini menunjukkan rata-rata (numerik) atau modus (kategorikal) dari fitur-fitur di klaster ini.")
-                
-                if df_preprocessed_temp is not None:
-                    values_for_plot_numeric = cluster_data_norm[NUMERIC_COLS].mean().tolist()
-                    values_for_plot_ekskul = [int(cluster_data_norm[col].mode().iloc[0]) for col in CATEGORICAL_COLS]
-                    values_for_plot = values_for_plot_numeric + values_for_plot_ekskul
-                    labels_for_plot = ["Nilai (Norm)", "Kehadiran (Norm)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
-                    
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    bars = sns.barplot(x=labels_for_plot, y=values_for_plot, palette="cubehelix", ax=ax)
-                    ax.set_ylim(min(values_for_plot) - 0.2 if values_for_plot else -1, max(values_for_plot) + 0.2 if values_for_plot else 1)
-                    
-                    for index, value in enumerate(values_for_plot):
-                        offset = 0.05 if value >= 0 else -0.1
-                        ax.text(bars.patches[index].get_x() + bars.patches[index].get_width() / 2, bars.patches[index].get_height() + offset, f"{value:.2f}", ha='center', fontsize=9, weight='bold')
-                    
-                    ax.set_title(f"Profil Klaster {i}", fontsize=16, weight='bold')
-                    ax.set_ylabel("Nilai (Dinormalisasi / Biner)")
-                    plt.xticks(rotation=0)
-                    plt.tight_layout()
-                    st.pyplot(fig)
+        show_cluster_profile_sections(published.cluster_profile)
         st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
         
     elif st.session_state.kepsek_current_menu == "Lihat Profil Siswa Individual":
@@ -1172,27 +1810,15 @@ def show_kepala_sekolah_page():
         st.info("Pilih nama siswa dari daftar di bawah untuk melihat detail profil mereka, termasuk klaster tempat mereka berada dan karakteristiknya.")
         st.markdown("---")
 
-        df_kepsek = st.session_state.df_clustered
-        default_index = 0
-        if "selected_student_name_kepsek" in st.session_state and st.session_state.selected_student_name_kepsek in df_kepsek["Nama"].unique():
-            try:
-                default_index = list(df_kepsek["Nama"].unique()).index(st.session_state.selected_student_name_kepsek)
-            except ValueError:
-                default_index = 0
-        nama_terpilih_kepsek = st.selectbox(
-            "Pilih Nama Siswa",
-            df_kepsek["Nama"].unique(),
-            index=default_index,
-            key="pilih_nama_siswa_kepsek",
-            help="Pilih siswa yang profilnya ingin Anda lihat."
-        )
-        st.session_state.selected_student_name_kepsek = nama_terpilih_kepsek
+        df_kepsek = published.df_clustered
+        posisi_siswa = select_student(published.student_index, "selected_student_name_kepsek", "pilih_nama_siswa_kepsek")
         
-        if nama_terpilih_kepsek:
-            siswa_data = df_kepsek[df_kepsek["Nama"] == nama_terpilih_kepsek].iloc[0]
+        if posisi_siswa is not None:
+            siswa_data = df_kepsek.iloc[posisi_siswa]
+            nama_terpilih_kepsek = siswa_data["Nama"]
             klaster_siswa_terpilih = siswa_data['Klaster']
             st.success(f"Siswa {nama_terpilih_kepsek} tergolong dalam Klaster {klaster_siswa_terpilih}.")
-            klaster_desc_for_new_student = st.session_state.cluster_characteristics_map.get(klaster_siswa_terpilih, "Deskripsi klaster tidak tersedia.")
+            klaster_desc_for_new_student = published.cluster_profile.descriptions.get(klaster_siswa_terpilih, "Deskripsi klaster tidak tersedia.")
             st.markdown(f"""
             <div style='background-color:#f0f4f7; padding:15px; border-radius:10px; border-left: 5px solid {PRIMARY_COLOR};'>
             <b>Karakteristik Klaster Ini:</b><br>
@@ -1208,7 +1834,7 @@ def show_kepala_sekolah_page():
                 st.markdown(f"Jenis Kelamin: {siswa_data.get('JK', '-')}")
                 st.markdown(f"Kelas: {siswa_data.get('Kelas', '-')}")
                 st.markdown(f"Rata-rata Nilai Akademik: {siswa_data.get('Rata Rata Nilai Akademik', '-'):.2f}")
-                st.markdown(f"Persentase Kehadiran: {siswa_data.get('Kehadiran', '-')}")
+                st.markdown(f"Persentase Kehadiran: {siswa_data.get('Kehadiran', '-'):.2%}")
                 st.markdown("#### Ekstrakurikuler yang Diikuti")
                 ekskul_diikuti_str = []
                 for col in CATEGORICAL_COLS:
@@ -1225,48 +1851,27 @@ def show_kepala_sekolah_page():
                 labels_siswa_plot = ["Rata-rata\nNilai Akademik", "Kehadiran (%)"] + [col.replace("Ekstrakurikuler ", "Ekskul\n") for col in CATEGORICAL_COLS]
                 values_siswa_plot_numeric = [
                     siswa_data.get("Rata Rata Nilai Akademik", 0),
-                    float(str(siswa_data.get("Kehadiran", "0%")).replace('%',''))
+                    siswa_data.get("Kehadiran", 0) * 100
                 ]
                 values_siswa_plot_ekskul = [
                     siswa_data.get(col, 0) * 100 for col in CATEGORICAL_COLS
                 ]
                 values_siswa_plot = values_siswa_plot_numeric + values_siswa_plot_ekskul
-                fig, ax = plt.subplots(figsize=(10, 6))
-                bars = sns.barplot(x=labels_siswa_plot, y=values_siswa_plot, palette="magma", ax=ax)
-                max_plot_val = max(values_siswa_plot) if values_siswa_plot else 100
-                ax.set_ylim(0, max(100, max_plot_val * 1.1))
-                for bar, val in zip(bars.patches, values_siswa_plot):
-                    ax.text(bar.get_x() + bar.get_width() / 2, val + (ax.get_ylim()[1] * 0.02), f"{val:.1f}", ha='center', fontsize=9, weight='bold')
-                ax.set_title(f"Grafik Profil Siswa - {nama_terpilih_kepsek}", fontsize=16, weight='bold')
-                ax.set_ylabel("Nilai / Status (%)")
-                plt.xticks(rotation=0)
-                plt.tight_layout()
-                st.pyplot(fig)
+                st.image(percent_bar_chart_png(f"Grafik Profil Siswa - {nama_terpilih_kepsek}", labels_siswa_plot, values_siswa_plot), use_column_width=True)
             st.markdown("---")
             st.subheader(f"Siswa Lain di Klaster {klaster_siswa_terpilih}:")
-            siswa_lain_di_klaster = df_kepsek[
-                (df_kepsek['Klaster'] == klaster_siswa_terpilih) &
-                (df_kepsek['Nama'] != nama_terpilih_kepsek)
-            ]
-            if not siswa_lain_di_klaster.empty:
-                st.write("Berikut adalah daftar siswa lain yang juga tergolong dalam klaster ini:")
-                display_cols_for_others = ["No", "Nama", "JK", "Kelas", "Rata Rata Nilai Akademik", "Kehadiran"]
-                st.dataframe(siswa_lain_di_klaster[display_cols_for_others], use_container_width=True)
-            else:
-                st.info("Tidak ada siswa lain dalam klaster ini.")
+            show_cluster_members(df_kepsek, published.student_index, klaster_siswa_terpilih, posisi_siswa, "kepsek")
             st.markdown("---")
             st.subheader("Unduh Laporan Profil Siswa (PDF)")
-            if st.session_state.cluster_characteristics_map:
+            if published.cluster_profile is not None:
                 if st.button("Generate & Unduh Laporan PDF", key="unduh_pdf_kepsek", help="Klik untuk membuat laporan PDF profil siswa ini."):
                     with st.spinner("Menyiapkan laporan PDF..."):
                         siswa_data_for_pdf = siswa_data.drop(labels=["Klaster"]).to_dict()
-                        if isinstance(siswa_data_for_pdf.get('Kehadiran'), str):
-                            siswa_data_for_pdf['Kehadiran'] = float(siswa_data_for_pdf['Kehadiran'].replace('%', '')) / 100
                         pdf_data_bytes = generate_pdf_profil_siswa(
                             nama_terpilih_kepsek,
                             siswa_data_for_pdf,
                             siswa_data["Klaster"],
-                            st.session_state.cluster_characteristics_map
+                            published.cluster_profile
                         )
                     if pdf_data_bytes:
                         st.success("Laporan PDF berhasil disiapkan!")
@@ -1280,6 +1885,21 @@ def show_kepala_sekolah_page():
                         )
             else:
                 st.warning("Data klasterisasi tidak valid untuk membuat profil PDF.")
+            if published.cluster_profile is not None:
+                st.markdown("---")
+                show_bulk_pdf_export(df_kepsek, published.cluster_profile, "kepsek")
+
+
+def startup_report_text(report):
+    fase = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in report["phases_ms"].items())
+    pesan = f"Waktu muat layar ini: {report['total_ms']:.0f} ms ({fase})."
+    summary = first_paint_summary()
+    if summary is not None:
+        pesan += (
+            f" Median {summary['sessions']} sesi terakhir: {summary['median_ms']:.0f} ms, "
+            f"maksimum {summary['max_ms']:.0f} ms, cold start proses: {summary['cold_start_ms']:.0f} ms."
+        )
+    return pesan
 
 
 # --- LOGIKA UTAMA APLIKASI UNTUK PEMILIHAN PERAN ---
@@ -1309,6 +1929,16 @@ if st.session_state.role is None:
     </div>
     """, unsafe_allow_html=True)
     
+    tenant_ids = list_tenants()
+    if st.session_state.tenant_id not in tenant_ids:
+        tenant_ids.append(st.session_state.tenant_id)
+    if len(tenant_ids) > 1:
+        # on_change berjalan sebelum rerun sehingga header langsung memakai madrasah baru.
+        st.selectbox(
+            "Madrasah", tenant_ids, index=tenant_ids.index(st.session_state.tenant_id), key="tenant_picker",
+            on_change=lambda: st.session_state.update(tenant_id=st.session_state.tenant_picker),
+            help="Data, model, dan hasil klasterisasi disimpan terpisah untuk setiap madrasah."
+        )
     col_tu, col_kepsek = st.columns(2)
     with col_tu:
         if st.button("Masuk sebagai **Operator TU**", use_container_width=True, key="login_tu"):
@@ -1320,6 +1950,13 @@ if st.session_state.role is None:
             st.session_state.role = 'Kepala Sekolah'
             st.session_state.kepsek_current_menu = "Lihat Hasil Klasterisasi"
             st.rerun()
+
+    run_timer.mark("render")
+    if st.session_state.first_paint_report is None:
+        st.session_state.first_paint_report = record_first_paint(run_timer)
+        logger.info(startup_report_text(st.session_state.first_paint_report))
+    if st.query_params.get(DEBUG_QUERY_PARAM) == "1":
+        st.caption(startup_report_text(st.session_state.first_paint_report))
             
 elif st.session_state.role == 'Operator TU':
     show_operator_tu_page()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# --- PENULISAN FILE ATOMIK & KUNCI PENERBITAN ---
+# File hasil ditulis ke file sementara di direktori yang sama, di-fsync, lalu
+# diganti dengan os.replace: pembaca (sesi Kepala Sekolah) hanya pernah
+# melihat versi lama atau versi baru yang utuh, tidak pernah file setengah
+# tertulis. Penerbit yang berjalan bersamaan (beberapa sesi Operator TU, CLI)
+# diserialkan dengan kunci file; pembaca tidak perlu mengambil kunci.
+
+LOCK_RETRY_SECONDS = 0.1
+
+
+def fsync_directory(directory):
+    # Agar rename tercatat di disk; tidak didukung (dan tidak perlu) di Windows.
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, write_fn, mode="wb"):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(directory)
+    return path
+
+
+@contextmanager
+def file_lock(lock_path):
+    # Kunci eksklusif antarproses; dilepas otomatis bila proses pemegangnya mati.
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(LOCK_RETRY_SECONDS)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,388 @@
+import contextlib
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pipeline import (
+    KPROTO_N_INIT, cluster_dataset, cluster_dataset_minibatch, make_clustering_cache, preprocess_dataset, sweep_point,
+    warm_start_dataset,
+)
+
+
+# --- PEKERJAAN LATAR BELAKANG (PRAPROSES & KLASTERISASI) ---
+# Praproses dan klasterisasi dijalankan di proses pekerja sehingga rerun
+# Streamlit (pindah menu, widget lain) tidak menunggu model selesai dilatih.
+# Satu JobManager per proses server dipakai bersama semua sesi. Setiap
+# pekerjaan diberi kunci (jenis, sidik jari data, K, ...): pekerjaan dengan
+# kunci yang sama tidak dijalankan dua kali, sehingga pekerjaan spekulatif
+# setelah unggah dan klik tombol untuk data yang sama berbagi satu hasil.
+# Kemajuan K-Prototypes (percobaan inisialisasi dan iterasinya) dibaca dari
+# keluaran verbose kmodes di pekerja lalu dikirim ke proses utama lewat antrean.
+#
+# Pekerjaan spekulatif menunggu di antrean JobManager sendiri dan paling
+# banyak menempati max_workers - 1 pekerja, sehingga satu pekerja selalu
+# tersisa untuk pekerjaan yang diminta pengguna. Pekerjaan spekulatif yang
+# belum mulai dibatalkan bila pemiliknya mengunggah file lain. Hasil
+# pekerjaan yang sudah selesai disimpan sampai batas memori tertentu.
+#
+# Setiap proses pekerja memakai satu cache klasterisasi per direktori cache
+# selama hidupnya, sehingga tingkat memori LRU dapat memberi hit antar
+# pekerjaan. Statistik hit/miss dikirim lewat antrean yang sama setelah
+# setiap pekerjaan dan dijumlahkan oleh JobManager.clustering_cache_stats.
+
+DEFAULT_MAX_WORKERS = 2
+MAX_FINISHED_JOB_BYTES = 256 * 1024 * 1024
+
+_RUN_PATTERN = re.compile(r"Run: (\d+), iteration: (\d+)/(\d+)")
+_CACHE_STATS_MESSAGE = "__cache_stats__"
+
+# Diisi di setiap proses pekerja.
+_progress_queue = None
+_current_job_key = None
+_clustering_caches = {}
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def report_progress(**progress):
+    if _progress_queue is not None and _current_job_key is not None:
+        _progress_queue.put((_current_job_key, progress))
+
+
+def worker_clustering_cache(cache_dir):
+    cache = _clustering_caches.get(cache_dir)
+    if cache is None:
+        cache = _clustering_caches[cache_dir] = make_clustering_cache(cache_dir)
+    return cache
+
+
+def _report_cache_stats():
+    if _progress_queue is None:
+        return
+    for cache_dir, cache in _clustering_caches.items():
+        _progress_queue.put((_CACHE_STATS_MESSAGE, (os.getpid(), cache_dir, cache.stats())))
+
+
+class _KModesProgressWriter:
+    # Pengganti stdout selama fit: baris verbose kmodes diubah menjadi laporan
+    # kemajuan, keluaran lain dibuang.
+    def __init__(self, n_init):
+        self.n_init = n_init
+        self.run = 0
+        self._pending = ""
+
+    def write(self, text):
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._parse(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def _parse(self, line):
+        if line.startswith("Init: initializing centroids"):
+            self.run += 1
+            report_progress(stage="inisialisasi", run=self.run, n_init=self.n_init, iteration=0)
+            return
+        match = _RUN_PATTERN.match(line)
+        if match:
+            run, iteration, max_iter = map(int, match.groups())
+            self.run = run
+            report_progress(stage="iterasi", run=run, n_init=self.n_init, iteration=iteration, max_iter=max_iter)
+
+
+def preprocess_job(df_original):
+    report_progress(stage="praproses")
+    return preprocess_dataset(df_original)
+
+
+def clustering_job(df_preprocessed, n_clusters, cache_dir):
+    # n_jobs=1: percobaan inisialisasi berjalan berurutan di pekerja ini
+    # (benih dan hasil sama dengan n_jobs=-1) sehingga kemajuannya terbaca.
+    report_progress(stage="mulai", run=0, n_init=KPROTO_N_INIT, iteration=0)
+    with contextlib.redirect_stdout(_KModesProgressWriter(KPROTO_N_INIT)):
+        return cluster_dataset(df_preprocessed, n_clusters, cache=worker_clustering_cache(cache_dir), n_jobs=1, verbose=1)
+
+
+def minibatch_clustering_job(df_original, df_preprocessed, n_clusters, cache_dir):
+    report_progress(stage="mini-batch")
+    return cluster_dataset_minibatch(df_original, df_preprocessed, n_clusters, cache=worker_clustering_cache(cache_dir))
+
+
+def warm_start_clustering_job(df_original, df_preprocessed, scaler, registry_dir, previous_run_id):
+    # Mengembalikan (hasil, alasan) dari warm_start_dataset; cold start bila
+    # warm start tidak dapat dipakai diajukan oleh pemanggil sebagai pekerjaan
+    # tersendiri.
+    report_progress(stage="mulai", run=0, n_init=1, iteration=0)
+    with contextlib.redirect_stdout(_KModesProgressWriter(1)):
+        return warm_start_dataset(df_original, df_preprocessed, scaler, registry_dir, previous_run_id, verbose=1)
+
+
+def sweep_point_job(df_original, df_preprocessed, n_clusters, minibatch, cache_dir):
+    # Satu K pencarian K; K yang sudah ada di cache tidak dilatih ulang.
+    report_progress(stage="pencarian-k")
+    return sweep_point(df_original, df_preprocessed, n_clusters, cache=worker_clustering_cache(cache_dir), minibatch=minibatch)
+
+
+def _run_job(job_key, fn, args):
+    global _current_job_key
+    _current_job_key = job_key
+    try:
+        return fn(*args), None
+    except Exception as e:
+        # Dikirim sebagai teks agar selalu dapat di-pickle ke proses utama.
+        return None, str(e)
+    finally:
+        _current_job_key = None
+        _report_cache_stats()
+
+
+def estimate_nbytes(value):
+    # Perkiraan memori hasil pekerjaan: tabel dan array dihitung penuh,
+    # objek lain (model, scaler) hanya ukuran dangkalnya.
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+def describe_progress(progress):
+    # Mengembalikan (fraksi 0..1, teks) untuk ditampilkan di progress bar.
+    stage = progress.get("stage")
+    if stage is None:
+        return 0.0, "Menunggu proses pekerja yang kosong..."
+    if stage == "praproses":
+        return 0.0, "Praproses dan normalisasi sedang berjalan..."
+    if stage == "mini-batch":
+        return 0.0, "K-Prototypes mini-batch sedang berjalan..."
+    if stage == "pencarian-k":
+        return 0.0, "Melatih model dan menghitung silhouette..."
+    run, n_init = progress.get("run", 0), progress.get("n_init") or 1
+    fraction = min(max(run - 1, 0) / n_init, 1.0)
+    if stage == "inisialisasi":
+        return fraction, f"Percobaan {run}/{n_init}: inisialisasi centroid"
+    if stage == "iterasi":
+        return fraction, f"Percobaan {run}/{n_init}, iterasi {progress['iteration']}"
+    return fraction, "Menyiapkan K-Prototypes..."
+
+
+class BackgroundJob:
+    def __init__(self, key, label, fn, args):
+        self.key = key
+        self.label = label
+        # Future milik JobManager (bukan milik executor) sehingga pekerjaan
+        # yang masih mengantre dapat dibatalkan atau didahulukan.
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+        self.progress = {}
+        self.submitted_at = time.time()
+        self.speculative_owners = set()
+        self.requested = False
+        self.uses_speculative_slot = False
+        self.result_nbytes = 0
+
+    def done(self):
+        return self.future.done()
+
+    def outcome(self):
+        # (hasil, pesan galat); hanya dipanggil setelah done().
+        if self.future.cancelled():
+            return None, "Pekerjaan dibatalkan."
+        try:
+            return self.future.result()
+        except Exception as e:
+            # Misalnya proses pekerja berhenti mendadak (BrokenProcessPool).
+            return None, str(e) or type(e).__name__
+
+    def failed(self):
+        return self.done() and self.outcome()[1] is not None
+
+    def elapsed(self):
+        return time.time() - self.submitted_at
+
+    def add_done_callback(self, fn):
+        # Callback berjalan di thread milik executor; jangan memanggil st.* di sana.
+        self.future.add_done_callback(lambda _future: fn(self))
+
+
+class JobManager:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_finished_bytes=MAX_FINISHED_JOB_BYTES):
+        context = multiprocessing.get_context("spawn")
+        self._progress_queue = context.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=context,
+            initializer=_init_worker, initargs=(self._progress_queue,)
+        )
+        self._max_speculative_running = max(max_workers - 1, 1)
+        self._max_finished_bytes = max_finished_bytes
+        self._jobs = OrderedDict()
+        self._speculative_queue = deque()
+        self._speculative_running = 0
+        # (pid pekerja, direktori cache) -> (waktu laporan, statistik cache).
+        self._cache_stats = {}
+        # RLock: callback future dapat berjalan langsung di thread yang sedang
+        # memegang kunci (misalnya bila executor gagal saat submit).
+        self._lock = threading.RLock()
+
+    def submit(self, key, label, fn, *args, speculative_owner=None):
+        # Pekerjaan yang sedang berjalan atau sudah berhasil dengan kunci yang
+        # sama dipakai ulang; yang gagal atau dibatalkan dijalankan ulang.
+        # speculative_owner menandai pekerjaan spekulatif milik pemanggil
+        # tersebut; tanpa itu pekerjaan dianggap diminta pengguna.
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.failed():
+                job = BackgroundJob(key, label, fn, args)
+                self._jobs[key] = job
+                if speculative_owner is None:
+                    job.requested = True
+                    self._start(job)
+                else:
+                    job.speculative_owners.add(speculative_owner)
+                    self._speculative_queue.append(job)
+                    self._start_speculative()
+                self._evict_finished()
+            elif speculative_owner is None:
+                job.requested = True
+                if job in self._speculative_queue:
+                    # Diminta pengguna sebelum sempat mulai: langsung dijalankan.
+                    self._speculative_queue.remove(job)
+                    self._start(job)
+            else:
+                job.speculative_owners.add(speculative_owner)
+            return job
+
+    def cancel_speculative(self, owner):
+        # Dipanggil saat pemilik beralih ke data lain. Pekerjaan spekulatifnya
+        # yang belum mulai dibatalkan, kecuali masih diminta pengguna atau
+        # pemilik lain; yang sedang berjalan dibiarkan selesai.
+        with self._lock:
+            cancelled = []
+            for job in list(self._jobs.values()):
+                if owner not in job.speculative_owners:
+                    continue
+                job.speculative_owners.discard(owner)
+                if job.speculative_owners or job.requested or job not in self._speculative_queue:
+                    continue
+                self._speculative_queue.remove(job)
+                job.future.cancel()
+                del self._jobs[job.key]
+                cancelled.append(job.key)
+            return cancelled
+
+    def _start(self, job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        job.submitted_at = time.time()
+        try:
+            executor_future = self._executor.submit(_run_job, job.key, job.fn, job.args)
+        except Exception as e:
+            # Misalnya executor rusak (BrokenProcessPool) atau sudah ditutup.
+            self._finish(job, None, e)
+            return
+        executor_future.add_done_callback(lambda future: self._on_executor_done(job, future))
+
+    def _start_speculative(self):
+        while self._speculative_queue and self._speculative_running < self._max_speculative_running:
+            job = self._speculative_queue.popleft()
+            job.uses_speculative_slot = True
+            self._speculative_running += 1
+            self._start(job)
+
+    def _on_executor_done(self, job, executor_future):
+        if executor_future.cancelled():
+            self._finish(job, (None, "Pekerjaan dibatalkan."), None)
+            return
+        try:
+            self._finish(job, executor_future.result(), None)
+        except Exception as e:
+            self._finish(job, None, e)
+
+    def _finish(self, job, result, error):
+        job.fn = job.args = None
+        job.result_nbytes = estimate_nbytes(result)
+        with self._lock:
+            if job.uses_speculative_slot:
+                self._speculative_running -= 1
+                self._start_speculative()
+            self._evict_finished(exclude=job)
+        # Di luar kunci: callback pekerjaan (add_done_callback) dapat
+        # memanggil submit lagi.
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def get(self, key):
+        self._drain_progress()
+        with self._lock:
+            return self._jobs.get(key)
+
+    def active_jobs(self):
+        self._drain_progress()
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done()]
+
+    def _evict_finished(self, exclude=None):
+        # Hasil tertua dibuang lebih dulu sampai total perkiraan memori hasil
+        # yang disimpan kembali di bawah batas; hasil terbaru selalu disimpan.
+        finished = [job for job in self._jobs.values() if job.done() and job is not exclude]
+        total_bytes = sum(job.result_nbytes for job in finished) + (exclude.result_nbytes if exclude is not None else 0)
+        for job in finished:
+            if total_bytes <= self._max_finished_bytes:
+                break
+            del self._jobs[job.key]
+            total_bytes -= job.result_nbytes
+
+    def clustering_cache_stats(self, cache_dir):
+        # Hit/miss dijumlahkan dari semua pekerja; entri dan ukuran disk
+        # (dipakai bersama) diambil dari laporan terbaru. None bila belum ada.
+        self._drain_progress()
+        with self._lock:
+            reports = [report for (_, directory), report in self._cache_stats.items() if directory == cache_dir]
+        if not reports:
+            return None
+        stats = {name: sum(report[name] for _, report in reports) for name in ("memory_hits", "disk_hits", "misses")}
+        _, latest = max(reports, key=lambda item: item[0])
+        stats["disk_entries"], stats["disk_bytes"] = latest["disk_entries"], latest["disk_bytes"]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _drain_progress(self):
+        while True:
+            try:
+                key, progress = self._progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            if key == _CACHE_STATS_MESSAGE:
+                pid, cache_dir, stats = progress
+                with self._lock:
+                    self._cache_stats[(pid, cache_dir)] = (time.time(), stats)
+                continue
+            with self._lock:
+                job = self._jobs.get(key)
+                if job is not None:
+                    job.progress = progress
@@ -0,0 +1,142 @@
+import io
+import math
+import sys
+import threading
+from functools import lru_cache
+
+
+# --- GRAFIK (PNG TER-CACHE) ---
+# Backend dan gaya matplotlib diatur sekali saat modul diimpor. Setiap grafik
+# dirender ke bytes PNG lalu figurnya langsung ditutup; hasilnya disimpan di
+# cache LRU per proses dengan kunci judul, label, dan nilai yang diplot,
+# sehingga rerun Streamlit dengan data yang sama tidak merender ulang.
+# matplotlib dan seaborn baru diimpor saat grafik pertama dirender agar impor
+# modul ini tidak memperlambat layar yang tidak menampilkan grafik.
+
+CHART_FIGSIZE = (10, 6)
+CHART_DPI = 100
+CHART_CACHE_MAX_ENTRIES = 256
+SMALL_MULTIPLES_MAX_COLS = 3
+SMALL_MULTIPLES_PANEL_SIZE = (5, 3.6)
+
+# pyplot tidak thread-safe, sedangkan setiap sesi Streamlit berjalan di
+# thread tersendiri.
+_render_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _plotting():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use("default")
+    plt.rcParams["figure.dpi"] = CHART_DPI
+    plt.rcParams["savefig.dpi"] = CHART_DPI
+    return plt, sns
+
+
+def _figure_to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=CHART_CACHE_MAX_ENTRIES)
+def _render_bar_chart(kind, title, labels, values, palette, ylabel):
+    with _render_lock:
+        return _draw_bar_chart(kind, title, labels, values, palette, ylabel)
+
+
+def _draw_bar_chart(kind, title, labels, values, palette, ylabel):
+    plt, sns = _plotting()
+    fig, ax = plt.subplots(figsize=CHART_FIGSIZE)
+    try:
+        bars = sns.barplot(x=list(labels), y=list(values), hue=list(labels), palette=palette, legend=False, ax=ax)
+        if kind == "percent":
+            max_plot_val = max(values) if values else 100
+            ax.set_ylim(0, max(100, max_plot_val * 1.1))
+            for bar, val in zip(bars.patches, values):
+                ax.text(bar.get_x() + bar.get_width() / 2, val + (ax.get_ylim()[1] * 0.02), f"{val:.1f}", ha='center', fontsize=9, weight='bold')
+        else:
+            ax.set_ylim(min(values) - 0.2 if values else -1, max(values) + 0.2 if values else 1)
+            for bar, value in zip(bars.patches, values):
+                offset = 0.05 if value >= 0 else -0.1
+                ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + offset, f"{value:.2f}", ha='center', fontsize=9, weight='bold')
+        ax.set_title(title, fontsize=16, weight='bold')
+        ax.set_ylabel(ylabel)
+        ax.tick_params(axis="x", labelrotation=0)
+        fig.tight_layout()
+        return _figure_to_png(fig)
+    finally:
+        plt.close(fig)
+
+
+@lru_cache(maxsize=CHART_CACHE_MAX_ENTRIES)
+def _render_small_multiples(titles, labels, values_by_panel, palette, ylabel):
+    with _render_lock:
+        return _draw_small_multiples(titles, labels, values_by_panel, palette, ylabel)
+
+
+def _draw_small_multiples(titles, labels, values_by_panel, palette, ylabel):
+    # Satu figur berisi satu panel per klaster dengan sumbu-y yang sama agar
+    # antarklaster mudah dibandingkan; biaya render hampir tetap terhadap K.
+    plt, sns = _plotting()
+    n_panels = len(values_by_panel)
+    n_cols = min(SMALL_MULTIPLES_MAX_COLS, n_panels)
+    n_rows = math.ceil(n_panels / n_cols)
+    fig, axes = plt.subplots(
+        n_rows, n_cols, sharey=True, squeeze=False,
+        figsize=(SMALL_MULTIPLES_PANEL_SIZE[0] * n_cols, SMALL_MULTIPLES_PANEL_SIZE[1] * n_rows),
+    )
+    try:
+        colors = sns.color_palette(palette, len(labels))
+        all_values = [value for values in values_by_panel for value in values]
+        axes[0][0].set_ylim(min(all_values) - 0.2 if all_values else -1, max(all_values) + 0.2 if all_values else 1)
+        positions = range(len(labels))
+        for panel, ax in enumerate(axes.flat):
+            if panel >= n_panels:
+                ax.set_visible(False)
+                continue
+            values = values_by_panel[panel]
+            ax.bar(positions, values, color=colors)
+            for position, value in zip(positions, values):
+                ax.text(position, value + (0.05 if value >= 0 else -0.15), f"{value:.2f}", ha='center', fontsize=8, weight='bold')
+            ax.axhline(0, color="black", linewidth=0.6)
+            ax.set_title(titles[panel], fontsize=12, weight='bold')
+            ax.set_xticks(list(positions))
+            ax.set_xticklabels(labels, fontsize=8)
+            if panel % n_cols == 0:
+                ax.set_ylabel(ylabel, fontsize=9)
+        fig.tight_layout()
+        return _figure_to_png(fig)
+    finally:
+        plt.close(fig)
+
+
+def profile_bar_chart_png(title, labels, values, palette="cubehelix", ylabel="Nilai (Dinormalisasi / Biner)"):
+    # Nilai dinormalisasi (bisa negatif) dan flag biner 0/1.
+    return _render_bar_chart("profile", title, tuple(labels), tuple(float(v) for v in values), palette, ylabel)
+
+
+def percent_bar_chart_png(title, labels, values, palette="magma", ylabel="Nilai / Status (%)"):
+    # Nilai asli berskala 0-100 (nilai akademik, persen kehadiran, flag x 100).
+    return _render_bar_chart("percent", title, tuple(labels), tuple(float(v) for v in values), palette, ylabel)
+
+
+def cluster_profiles_chart_png(titles, labels, values_by_cluster, palette="cubehelix", ylabel="Nilai (Dinormalisasi / Biner)"):
+    return _render_small_multiples(
+        tuple(titles), tuple(labels),
+        tuple(tuple(float(v) for v in values) for values in values_by_cluster),
+        palette, ylabel,
+    )
+
+
+def chart_metrics():
+    cache_infos = [_render_bar_chart.cache_info(), _render_small_multiples.cache_info()]
+    return {
+        "live_figures": len(sys.modules["matplotlib.pyplot"].get_fignums()) if "matplotlib.pyplot" in sys.modules else 0,
+        "cache_hits": sum(info.hits for info in cache_infos),
+        "cache_misses": sum(info.misses for info in cache_infos),
+        "cached_charts": sum(info.currsize for info in cache_infos),
+    }
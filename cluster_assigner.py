@@ -0,0 +1,88 @@
+import numpy as np
+
+from compact_features import MAX_PACKED_FLAGS, mismatch_counts, pack_flags
+
+
+# --- PENENTUAN KLASTER TERVEKTORISASI ---
+# Menghitung biaya K-Prototypes (jarak Euclidean kuadrat numerik + gamma x jumlah
+# ketidakcocokan kategorikal) untuk semua baris dan semua klaster sekaligus.
+# Urutan operasi sama dengan kmodes.KPrototypes.predict sehingga label identik.
+
+UNKNOWN_CATEGORY_CODE = np.iinfo(np.uint8).max
+DEFAULT_CHUNK_ROWS = 65536
+
+
+class ClusterAssigner:
+    def __init__(self, centroids_numeric, centroids_categorical, gamma, chunk_rows=DEFAULT_CHUNK_ROWS):
+        centroids_categorical = np.asarray(centroids_categorical).astype(str)
+        self.centroids_numeric = np.ascontiguousarray(centroids_numeric, dtype=np.float64)
+        self.gamma = float(gamma)
+        self.chunk_rows = chunk_rows
+        self.n_clusters = self.centroids_numeric.shape[0]
+        # Kategori hanya perlu dikodekan relatif terhadap nilai yang muncul di
+        # centroid; nilai lain selalu tidak cocok dengan semua centroid.
+        self.category_values = [np.unique(centroids_categorical[:, j]) for j in range(centroids_categorical.shape[1])]
+        if any(len(values) >= UNKNOWN_CATEGORY_CODE for values in self.category_values):
+            raise ValueError("Terlalu banyak kategori unik untuk dikodekan sebagai uint8.")
+        self.centroids_codes = self.encode_categorical(centroids_categorical)
+        # Bila semua kategori centroid biner ('0'/'1'), ketidakcocokan dapat
+        # dihitung dengan XOR/popcount atas bitmask (lihat compact_features).
+        self.centroids_flags = None
+        if set(np.unique(centroids_categorical)) <= {"0", "1"} and centroids_categorical.shape[1] <= MAX_PACKED_FLAGS:
+            self.centroids_flags = pack_flags(centroids_categorical == "1")
+
+    @classmethod
+    def from_kprototypes(cls, kproto, n_numeric, **kwargs):
+        centroids = kproto.cluster_centroids_
+        return cls(centroids[:, :n_numeric].astype(np.float64), centroids[:, n_numeric:], kproto.gamma, **kwargs)
+
+    def encode_categorical(self, X_categorical):
+        X_categorical = np.asarray(X_categorical)
+        if X_categorical.ndim == 1:
+            X_categorical = X_categorical.reshape(1, -1)
+        X_categorical = X_categorical.astype(str)
+        codes = np.full(X_categorical.shape, UNKNOWN_CATEGORY_CODE, dtype=np.uint8)
+        for j, values in enumerate(self.category_values):
+            column = X_categorical[:, j]
+            for code, value in enumerate(values):
+                codes[column == value, j] = code
+        return codes
+
+    def costs(self, X_numeric, X_codes):
+        diff = X_numeric[:, np.newaxis, :] - self.centroids_numeric[np.newaxis, :, :]
+        num_costs = np.sum(diff ** 2, axis=2)
+        cat_costs = np.sum(X_codes[:, np.newaxis, :] != self.centroids_codes[np.newaxis, :, :], axis=2)
+        return num_costs + self.gamma * cat_costs
+
+    def predict(self, X_numeric, X_categorical):
+        X_numeric = np.asarray(X_numeric, dtype=np.float64)
+        if X_numeric.ndim == 1:
+            X_numeric = X_numeric.reshape(1, -1)
+        if np.isnan(X_numeric).any():
+            raise ValueError("Missing values detected in numerical columns.")
+        X_codes = self.encode_categorical(X_categorical)
+        labels = np.empty(X_numeric.shape[0], dtype=np.uint16)
+        for start in range(0, X_numeric.shape[0], self.chunk_rows):
+            stop = start + self.chunk_rows
+            labels[start:stop] = np.argmin(self.costs(X_numeric[start:stop], X_codes[start:stop]), axis=1)
+        return labels
+
+    def predict_packed(self, X_numeric, flags):
+        if self.centroids_flags is None:
+            raise ValueError("Centroid memiliki kategori non-biner sehingga tidak dapat dibandingkan sebagai bitmask.")
+        X_numeric = np.asarray(X_numeric, dtype=np.float64)
+        if X_numeric.ndim == 1:
+            X_numeric = X_numeric.reshape(1, -1)
+        if np.isnan(X_numeric).any():
+            raise ValueError("Missing values detected in numerical columns.")
+        flags = np.atleast_1d(np.asarray(flags, dtype=np.uint8))
+        labels = np.empty(X_numeric.shape[0], dtype=np.uint16)
+        for start in range(0, X_numeric.shape[0], self.chunk_rows):
+            stop = start + self.chunk_rows
+            diff = X_numeric[start:stop, np.newaxis, :] - self.centroids_numeric[np.newaxis, :, :]
+            num_costs = np.sum(diff ** 2, axis=2)
+            labels[start:stop] = np.argmin(num_costs + self.gamma * mismatch_counts(flags[start:stop], self.centroids_flags), axis=1)
+        return labels
+
+    def predict_frame(self, df_preprocessed, numeric_cols, categorical_cols):
+        return self.predict(df_preprocessed[numeric_cols].to_numpy(dtype=np.float64), df_preprocessed[categorical_cols].to_numpy())
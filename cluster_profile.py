@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from compact_features import normalize_flag_columns
+
+
+# --- PROFIL KLASTER ---
+# Ringkasan per klaster dihitung sekali per hasil klasterisasi dengan satu
+# groupby: jumlah siswa, rata-rata numerik (dinormalisasi dan asli), tingkat
+# partisipasi tiap ekstrakurikuler, modus flag, dan teks deskripsi. Halaman
+# profil, grafik, dan PDF membaca dari struktur ini tanpa menghitung ulang.
+
+ClusterProfile = namedtuple("ClusterProfile", [
+    "n_clusters", "counts", "scaled_means", "raw_means",
+    "flag_rates", "flag_modes", "descriptions",
+])
+
+
+def build_cluster_profile(df_scaled, df_raw, labels, n_clusters, numeric_cols, categorical_cols):
+    # df_scaled berisi fitur numerik hasil normalisasi, df_raw berisi data asli
+    # (sumber flag ekstrakurikuler); keduanya sejajar baris demi baris dengan labels.
+    frame = pd.concat({
+        "scaled": pd.DataFrame(df_scaled[numeric_cols].to_numpy(dtype=np.float64), columns=numeric_cols),
+        "raw": pd.DataFrame(df_raw[numeric_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64), columns=numeric_cols),
+        "flag": pd.DataFrame(normalize_flag_columns(df_raw, categorical_cols), columns=categorical_cols),
+    }, axis=1)
+    grouped = frame.groupby(np.asarray(labels, dtype=np.int64))
+    clusters = pd.RangeIndex(n_clusters, name="Klaster")
+    means = grouped.mean().reindex(clusters)
+    counts = grouped.size().reindex(clusters, fill_value=0)
+    scaled_means = means["scaled"]
+    flag_rates = means["flag"]
+    # Sama dengan DataFrame.mode().iloc[0]: bila seri (50%), nilai 0 dipilih.
+    flag_modes = (flag_rates > 0.5).astype(np.uint8)
+    descriptions = {
+        i: describe_cluster(scaled_means.loc[i], flag_modes.loc[i], categorical_cols)
+        for i in range(n_clusters)
+    }
+    return ClusterProfile(
+        n_clusters=n_clusters,
+        counts=counts,
+        scaled_means=scaled_means,
+        raw_means=means["raw"],
+        flag_rates=flag_rates,
+        flag_modes=flag_modes,
+        descriptions=descriptions,
+    )
+
+
+def describe_cluster(avg_scaled_values, mode_values, categorical_cols):
+    desc = ""
+    if avg_scaled_values["Rata Rata Nilai Akademik"] > 0.75:
+        desc += "Siswa di klaster ini memiliki nilai akademik cenderung sangat tinggi. "
+    elif avg_scaled_values["Rata Rata Nilai Akademik"] > 0.25:
+        desc += "Siswa di klaster ini memiliki nilai akademik cenderung di atas rata-rata. "
+    elif avg_scaled_values["Rata Rata Nilai Akademik"] < -0.75:
+        desc += "Siswa di klaster ini memiliki nilai akademik cenderung sangat rendah. "
+    elif avg_scaled_values["Rata Rata Nilai Akademik"] < -0.25:
+        desc += "Siswa di klaster ini memiliki nilai akademik cenderung di bawah rata-rata. "
+    else:
+        desc += "Siswa di klaster ini memiliki nilai akademik cenderung rata-rata. "
+    if avg_scaled_values["Kehadiran"] > 0.75:
+        desc += "Tingkat kehadiran cenderung sangat tinggi. "
+    elif avg_scaled_values["Kehadiran"] > 0.25:
+        desc += "Tingkat kehadiran cenderung di atas rata-rata. "
+    elif avg_scaled_values["Kehadiran"] < -0.75:
+        desc += "Tingkat kehadiran cenderung sangat rendah. "
+    elif avg_scaled_values["Kehadiran"] < -0.25:
+        desc += "Tingkat kehadiran cenderung di bawah rata-rata. "
+    else:
+        desc += "Tingkat kehadiran cenderung rata-rata. "
+    ekskul_aktif_modes = [col_name for col_name in categorical_cols if mode_values[col_name] == 1]
+    if ekskul_aktif_modes:
+        desc += f"Siswa di klaster ini aktif dalam ekstrakurikuler: {', '.join([c.replace('Ekstrakurikuler ', '') for c in ekskul_aktif_modes])}."
+    else:
+        desc += "Siswa di klaster ini kurang aktif dalam kegiatan ekstrakurikuler."
+    return desc
+
+
+def scale_with_bundle(df_raw, numeric_cols, scaler_mean, scaler_scale):
+    # Setara dengan preprocess_data: nilai kosong diisi rata-rata kolom
+    # (= mean scaler) lalu dinormalisasi dengan parameter yang diterbitkan.
+    numeric = df_raw[numeric_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    numeric = np.where(np.isnan(numeric), scaler_mean, numeric)
+    return pd.DataFrame((numeric - scaler_mean) / scaler_scale, columns=numeric_cols, index=df_raw.index)
+
+
+def cluster_report_description(cluster_profile, cluster_id):
+    desc = cluster_profile.descriptions.get(cluster_id, "Deskripsi klaster tidak tersedia.")
+    if 0 <= cluster_id < cluster_profile.n_clusters:
+        desc += f" Jumlah siswa di klaster ini: {cluster_profile.counts[cluster_id]}."
+    return desc
+
+
+def cluster_summary_table(cluster_profile):
+    # Satu tabel untuk semua klaster (baris = klaster) sebagai pengganti
+    # tabel statistik terpisah per klaster.
+    table = pd.DataFrame({"Jumlah Siswa": cluster_profile.counts})
+    for col in cluster_profile.scaled_means.columns:
+        table[f"{col} (Norm)"] = cluster_profile.scaled_means[col].round(2)
+        table[f"{col} (Asli)"] = cluster_profile.raw_means[col].round(2)
+    for col in cluster_profile.flag_rates.columns:
+        table[f"{col.replace('Ekstrakurikuler ', 'Ekskul ')} (% Ikut)"] = (cluster_profile.flag_rates[col] * 100).round(0)
+    return table
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from cluster_assigner import ClusterAssigner
+from compact_features import MAX_PACKED_FLAGS, mismatch_counts, pack_flags
+
+
+# --- INTI K-PROTOTYPES (TANPA STREAMLIT) ---
+# Fungsi di modul ini dapat dipanggil dari proses pekerja (process pool)
+# sehingga tidak boleh bergantung pada st.session_state atau elemen UI.
+
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+
+def fit_kprototypes(X, categorical_indices, n_clusters, init, n_init, random_state, n_jobs=-1, verbose=0):
+    from kmodes.kprototypes import KPrototypes
+    kproto = KPrototypes(n_clusters=n_clusters, init=init, n_init=n_init, verbose=verbose, random_state=random_state, n_jobs=n_jobs)
+    kproto.fit(X, categorical=categorical_indices)
+    return kproto
+
+
+def fit_predict_kprototypes(X, categorical_indices, n_clusters, init, n_init, random_state, n_jobs=-1, verbose=0):
+    # Setara dengan KPrototypes.fit_predict, tetapi label data latih dihitung
+    # ulang dengan ClusterAssigner (hasil identik, tanpa loop per baris).
+    kproto = fit_kprototypes(X, categorical_indices, n_clusters, init, n_init, random_state, n_jobs=n_jobs, verbose=verbose)
+    X_numeric, X_categorical = split_numeric_categorical(X, categorical_indices)
+    labels = ClusterAssigner.from_kprototypes(kproto, X_numeric.shape[1]).predict(X_numeric, X_categorical)
+    return labels, kproto
+
+
+def fit_predict_kprototypes_warm(X, categorical_indices, init_numeric, init_categorical, random_state, n_jobs=1, verbose=0):
+    # Warm start: satu inisialisasi dari centroid run sebelumnya. kmodes
+    # mengharapkan centroid kategorikal dalam bentuk kode, yaitu urutan nilai
+    # pada np.unique per kolom (sama dengan encode_features saat fit).
+    X_numeric, X_categorical = split_numeric_categorical(X, categorical_indices)
+    init_categorical = np.asarray(init_categorical).astype(str)
+    init_codes = np.empty(init_categorical.shape, dtype=np.uint16)
+    for j in range(X_categorical.shape[1]):
+        column_values = np.unique(X_categorical[:, j])
+        codes = np.searchsorted(column_values, init_categorical[:, j])
+        if (codes >= len(column_values)).any() or (column_values[np.minimum(codes, len(column_values) - 1)] != init_categorical[:, j]).any():
+            raise ValueError("Nilai kategorikal centroid sebelumnya tidak ditemukan pada data baru.")
+        init_codes[:, j] = codes
+    init = [np.asarray(init_numeric, dtype=np.float64), init_codes]
+    kproto = fit_kprototypes(X, categorical_indices, len(init_codes), init, 1, random_state, n_jobs=n_jobs, verbose=verbose)
+    labels = ClusterAssigner.from_kprototypes(kproto, X_numeric.shape[1]).predict(X_numeric, X_categorical)
+    return labels, kproto
+
+
+def row_fingerprints(df, key_col, cols):
+    hashes = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    return pd.Series(hashes, index=df[key_col].to_numpy(), name="row_hash")
+
+
+def diff_row_fingerprints(previous, current):
+    common = current.index.intersection(previous.index)
+    changed_mask = previous.reindex(common).to_numpy() != current.reindex(common).to_numpy()
+    return {
+        "inserted": current.index.difference(previous.index).tolist(),
+        "deleted": previous.index.difference(current.index).tolist(),
+        "changed": common[changed_mask].tolist(),
+        "unchanged": int((~changed_mask).sum()),
+    }
+
+
+def split_numeric_categorical(X, categorical_indices):
+    numeric_indices = [i for i in range(X.shape[1]) if i not in categorical_indices]
+    X_numeric = np.asarray(X[:, numeric_indices], dtype=np.float64)
+    X_categorical = np.asarray(X[:, categorical_indices]).astype(str)
+    return X_numeric, X_categorical
+
+
+def silhouette_sample(n_rows, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=0):
+    # Posisi baris sampel silhouette, atau None bila seluruh baris dipakai.
+    # Pemanggil dengan data besar dapat mengambil sampel ini lebih dulu agar
+    # hanya baris sampel yang dikonversi.
+    if n_rows <= sample_size:
+        return None
+    return np.random.default_rng(random_state).choice(n_rows, size=sample_size, replace=False)
+
+
+def mixed_silhouette_score(X_numeric, X_categorical, labels, gamma, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=0):
+    # Silhouette dengan ukuran ketidakmiripan K-Prototypes:
+    # jarak Euclidean kuadrat numerik + gamma x jumlah ketidakcocokan kategorikal.
+    from sklearn.metrics import silhouette_score
+    labels = np.asarray(labels)
+    sample = silhouette_sample(len(labels), sample_size, random_state)
+    if sample is not None:
+        X_numeric, X_categorical, labels = X_numeric[sample], X_categorical[sample], labels[sample]
+    if len(np.unique(labels)) < 2:
+        return float("nan")
+    diff = X_numeric[:, np.newaxis, :] - X_numeric[np.newaxis, :, :]
+    distances = np.sum(diff ** 2, axis=2)
+    if set(np.unique(X_categorical)) <= {"0", "1"} and X_categorical.shape[1] <= MAX_PACKED_FLAGS:
+        flags = pack_flags(X_categorical == "1")
+        distances += gamma * mismatch_counts(flags, flags)
+    else:
+        distances += gamma * np.sum(X_categorical[:, np.newaxis, :] != X_categorical[np.newaxis, :, :], axis=2)
+    return float(silhouette_score(distances, labels, metric="precomputed"))
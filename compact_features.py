@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# --- REPRESENTASI FITUR RINGKAS ---
+# Hasil praproses (DataFrame) menyimpan fitur numerik sebagai float32 dan
+# flag ekstrakurikuler sebagai kolom uint8 0/1. Bitmask uint8 per siswa
+# (bit j = kolom kategorikal ke-j) tidak disimpan: CompactFeatures dibuat
+# sementara oleh compact_from_frame setiap kali dibutuhkan lalu dibuang,
+# yaitu untuk membangun input kmodes (to_kmodes_array) dan untuk menghitung
+# ketidakcocokan kategorikal = popcount(mask_a XOR mask_b) pada prediksi
+# (ClusterAssigner.predict_packed) dan silhouette.
+
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+MAX_PACKED_FLAGS = 8
+
+CompactFeatures = namedtuple("CompactFeatures", ["numeric", "flags", "n_flags"])
+
+
+def normalize_flag_columns(df, categorical_cols):
+    # Nilai kosong dianggap 0, nilai bukan nol dianggap 1.
+    values = df[categorical_cols].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy()
+    return (values != 0).astype(np.uint8)
+
+
+def pack_flags(flag_matrix):
+    flag_matrix = np.asarray(flag_matrix, dtype=np.uint8)
+    if flag_matrix.ndim == 1:
+        flag_matrix = flag_matrix.reshape(1, -1)
+    if flag_matrix.shape[1] > MAX_PACKED_FLAGS:
+        raise ValueError(f"Maksimal {MAX_PACKED_FLAGS} flag dapat dikemas dalam satu bitmask uint8.")
+    weights = (1 << np.arange(flag_matrix.shape[1])).astype(np.uint8)
+    return (flag_matrix * weights).sum(axis=1, dtype=np.uint8)
+
+
+def unpack_flags(flags, n_flags):
+    return ((np.asarray(flags, dtype=np.uint8)[:, np.newaxis] >> np.arange(n_flags, dtype=np.uint8)) & 1).astype(np.uint8)
+
+
+def mismatch_counts(flags_a, flags_b):
+    # Matriks (len(flags_a), len(flags_b)) berisi jumlah flag yang berbeda.
+    return POPCOUNT_TABLE[np.bitwise_xor(np.asarray(flags_a, dtype=np.uint8)[:, np.newaxis],
+                                         np.asarray(flags_b, dtype=np.uint8)[np.newaxis, :])]
+
+
+def compact_from_frame(df, numeric_cols, categorical_cols):
+    return CompactFeatures(
+        numeric=df[numeric_cols].to_numpy(dtype=np.float32),
+        flags=pack_flags(normalize_flag_columns(df, categorical_cols)),
+        n_flags=len(categorical_cols),
+    )
+
+
+def to_kmodes_array(compact):
+    # Kategori dikirim sebagai string '0'/'1' agar pengodean kmodes tetap sama
+    # dengan model-model yang sudah tersimpan.
+    n_numeric = compact.numeric.shape[1]
+    X = np.empty((compact.numeric.shape[0], n_numeric + compact.n_flags), dtype=object)
+    X[:, :n_numeric] = compact.numeric.astype(np.float64)
+    X[:, n_numeric:] = np.where(unpack_flags(compact.flags, compact.n_flags) == 1, "1", "0")
+    return X
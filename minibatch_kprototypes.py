@@ -0,0 +1,140 @@
+import numpy as np
+
+from cluster_assigner import ClusterAssigner
+from compact_features import normalize_flag_columns
+
+
+# --- K-PROTOTYPES MINI-BATCH / STREAMING ---
+# Untuk data berskala besar (gabungan beberapa madrasah). Data dibaca per
+# potongan (chunk) dari generator sehingga memori dibatasi oleh ukuran chunk:
+#   1. StandardScaler.partial_fit mengakumulasi mean/varians secara online.
+#   2. MiniBatchKPrototypes.partial_fit memperbarui centroid numerik (rata-rata
+#      berjalan) dan hitungan modus kategorikal per klaster secara bertahap.
+#   3. Satu lintasan terakhir memberi label pada setiap baris.
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_N_EPOCHS = 3
+
+
+class MiniBatchKPrototypes:
+    def __init__(self, n_clusters, gamma=None, random_state=None):
+        self.n_clusters = n_clusters
+        self.gamma = gamma
+        self.random_state = random_state
+        self._rng = np.random.default_rng(random_state)
+        self.centroids_numeric_ = None
+        self.counts_ = None
+        self.categories_ = None
+        self.category_counts_ = None
+        self.n_steps_ = 0
+        self.n_iter_ = 0
+        self.cost_ = None
+
+    def _init_centroids(self, X_numeric, X_categorical):
+        if self.gamma is None:
+            self.gamma = 0.5 * np.mean(X_numeric.std(axis=0))
+        unique_rows = np.unique(np.hstack([X_numeric.astype(str), X_categorical]), axis=0, return_index=True)[1]
+        if len(unique_rows) < self.n_clusters:
+            raise ValueError(
+                f"Chunk pertama hanya memiliki {len(unique_rows)} baris unik, "
+                f"kurang dari jumlah klaster ({self.n_clusters})."
+            )
+        seeds = self._rng.choice(unique_rows, size=self.n_clusters, replace=False)
+        self.centroids_numeric_ = X_numeric[seeds].astype(np.float64)
+        self.counts_ = np.zeros(self.n_clusters, dtype=np.int64)
+        self.categories_ = [np.unique(X_categorical[:, j]) for j in range(X_categorical.shape[1])]
+        self.category_counts_ = [np.zeros((self.n_clusters, len(values)), dtype=np.int64) for values in self.categories_]
+        self._centroid_categories = X_categorical[seeds].astype(object)
+
+    def _register_categories(self, X_categorical):
+        for j in range(X_categorical.shape[1]):
+            new_values = np.setdiff1d(np.unique(X_categorical[:, j]), self.categories_[j])
+            if len(new_values):
+                merged = np.union1d(self.categories_[j], new_values)
+                counts = np.zeros((self.n_clusters, len(merged)), dtype=np.int64)
+                counts[:, np.searchsorted(merged, self.categories_[j])] = self.category_counts_[j]
+                self.categories_[j] = merged
+                self.category_counts_[j] = counts
+
+    def _assigner(self):
+        return ClusterAssigner(self.centroids_numeric_, self._centroid_categories, self.gamma)
+
+    def partial_fit(self, X_numeric, X_categorical):
+        X_numeric = np.asarray(X_numeric, dtype=np.float64)
+        X_categorical = np.asarray(X_categorical).astype(str)
+        if self.centroids_numeric_ is None:
+            self._init_centroids(X_numeric, X_categorical)
+        self._register_categories(X_categorical)
+        labels = self._assigner().predict(X_numeric, X_categorical).astype(np.intp)
+
+        chunk_counts = np.bincount(labels, minlength=self.n_clusters)
+        chunk_sums = np.zeros_like(self.centroids_numeric_)
+        np.add.at(chunk_sums, labels, X_numeric)
+        self.counts_ += chunk_counts
+        updated = chunk_counts > 0
+        # Rata-rata berjalan: centroid += (jumlah_chunk - n_chunk * centroid) / n_total
+        self.centroids_numeric_[updated] += (
+            chunk_sums[updated] - chunk_counts[updated, np.newaxis] * self.centroids_numeric_[updated]
+        ) / self.counts_[updated, np.newaxis]
+
+        for j, values in enumerate(self.categories_):
+            codes = np.searchsorted(values, X_categorical[:, j])
+            np.add.at(self.category_counts_[j], (labels, codes), 1)
+            modes = values[np.argmax(self.category_counts_[j], axis=1)]
+            self._centroid_categories[updated, j] = modes[updated]
+        self.n_steps_ += 1
+        return self
+
+    def predict(self, X_numeric, X_categorical):
+        return self._assigner().predict(X_numeric, X_categorical)
+
+    @property
+    def cluster_centroids_(self):
+        if self.centroids_numeric_ is None:
+            raise AttributeError("Model mini-batch belum dilatih.")
+        return np.hstack([self.centroids_numeric_.astype(object), self._centroid_categories.astype(object)])
+
+
+def iter_dataframe_chunks(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def prepare_chunk(df_chunk, scaler, numeric_cols, categorical_cols):
+    # Nilai numerik kosong diisi rata-rata global dari scaler online, sama
+    # seperti preprocess_data mengisi dengan rata-rata kolom.
+    numeric = df_chunk[numeric_cols].astype(np.float64)
+    numeric = numeric.fillna(dict(zip(numeric_cols, scaler.mean_)))
+    X_numeric = scaler.transform(numeric)
+    X_categorical = normalize_flag_columns(df_chunk, categorical_cols).astype(str)
+    return X_numeric, X_categorical
+
+
+def fit_minibatch_kprototypes(chunk_factory, numeric_cols, categorical_cols, n_clusters,
+                              n_epochs=DEFAULT_N_EPOCHS, random_state=None, scaler=None):
+    # chunk_factory() harus mengembalikan generator baru berisi potongan data
+    # mentah (belum dinormalisasi) setiap kali dipanggil.
+    from sklearn.preprocessing import StandardScaler
+    if scaler is None:
+        scaler = StandardScaler()
+        for df_chunk in chunk_factory():
+            scaler.partial_fit(df_chunk[numeric_cols].astype(np.float64))
+
+    model = MiniBatchKPrototypes(n_clusters, random_state=random_state)
+    for _ in range(n_epochs):
+        for df_chunk in chunk_factory():
+            model.partial_fit(*prepare_chunk(df_chunk, scaler, numeric_cols, categorical_cols))
+        model.n_iter_ += 1
+
+    labels = []
+    cost = 0.0
+    for df_chunk in chunk_factory():
+        X_numeric, X_categorical = prepare_chunk(df_chunk, scaler, numeric_cols, categorical_cols)
+        assigner = model._assigner()
+        X_codes = assigner.encode_categorical(X_categorical)
+        chunk_costs = assigner.costs(X_numeric, X_codes)
+        chunk_labels = np.argmin(chunk_costs, axis=1)
+        cost += float(chunk_costs[np.arange(len(chunk_labels)), chunk_labels].sum())
+        labels.append(chunk_labels.astype(np.uint16))
+    model.cost_ = cost
+    return np.concatenate(labels) if labels else np.empty(0, dtype=np.uint16), model, scaler
@@ -0,0 +1,199 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from atomic_files import write_atomic
+
+
+# --- REGISTRI MODEL K-PROTOTYPES ---
+# Setiap run disimpan pada <registry_dir>/<run_id>/ berisi model.pkl (model,
+# scaler, indeks kategorikal), meta.json (K, hash data, waktu, deskripsi) dan
+# opsional rows.parquet (No, hash baris, Klaster) untuk deteksi perubahan data.
+# File LATEST berisi run_id terakhir yang disimpan.
+#
+# Model yang identik (data, K, dan centroid sama, misalnya hasil dari cache)
+# tidak disimpan ulang. prune_models menyimpan beberapa run terbaru per K
+# ditambah run yang dilindungi (misalnya yang dirujuk bundel hasil terbit).
+# Daftar meta di-cache per direktori dan dibaca ulang hanya bila direktori
+# registri atau file LATEST berubah.
+
+MODEL_FILE = "model.pkl"
+META_FILE = "meta.json"
+ROWS_FILE = "rows.parquet"
+LATEST_FILE = "LATEST"
+KEEP_RUNS_PER_K = 5
+
+ModelEntry = namedtuple("ModelEntry", [
+    "run_id", "kproto", "scaler", "categorical_indices", "n_clusters",
+    "data_hash", "created_at", "cluster_desc_map",
+])
+
+
+_listing_cache = {}
+_listing_lock = threading.Lock()
+
+
+def _write_atomic(path, data, mode="wb"):
+    write_atomic(path, lambda f: f.write(data), mode=mode)
+
+
+def model_fingerprint(kproto):
+    hasher = hashlib.sha256()
+    hasher.update(repr(kproto.cluster_centroids_.tolist()).encode("utf-8"))
+    hasher.update(repr(float(kproto.gamma)).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _find_duplicate(registry_dir, n_clusters, data_hash, model_hash, has_row_index):
+    for meta in list_models(registry_dir):
+        if (meta["n_clusters"] == n_clusters and meta["data_hash"] == data_hash
+                and meta.get("model_hash") == model_hash and (meta.get("has_row_index") or not has_row_index)):
+            return meta["run_id"]
+    return None
+
+
+def save_model(registry_dir, kproto, scaler, categorical_indices, n_clusters, data_hash, cluster_desc_map=None, row_index=None):
+    model_hash = model_fingerprint(kproto)
+    duplicate_run_id = _find_duplicate(registry_dir, int(n_clusters), data_hash, model_hash, row_index is not None)
+    if duplicate_run_id is not None:
+        _write_atomic(os.path.join(registry_dir, LATEST_FILE), duplicate_run_id, mode="w")
+        return duplicate_run_id
+    created_at = time.time()
+    # Sufiks acak: run yang disimpan pada detik yang sama tidak saling menimpa.
+    run_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created_at))}-k{n_clusters}-{data_hash[:8]}-{uuid.uuid4().hex[:6]}"
+    run_dir = os.path.join(registry_dir, run_id)
+    os.makedirs(run_dir)
+    payload = {
+        "kproto": kproto,
+        "scaler": scaler,
+        "categorical_indices": list(categorical_indices),
+    }
+    meta = {
+        "run_id": run_id,
+        "n_clusters": int(n_clusters),
+        "data_hash": data_hash,
+        "model_hash": model_hash,
+        "created_at": created_at,
+        "cluster_descriptions": {str(k): v for k, v in (cluster_desc_map or {}).items()},
+        "has_row_index": row_index is not None,
+    }
+    if row_index is not None:
+        buffer = io.BytesIO()
+        row_index.to_parquet(buffer, index=False)
+        _write_atomic(os.path.join(run_dir, ROWS_FILE), buffer.getvalue())
+    _write_atomic(os.path.join(run_dir, MODEL_FILE), pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    _write_atomic(os.path.join(run_dir, META_FILE), json.dumps(meta, ensure_ascii=False, indent=2), mode="w")
+    _write_atomic(os.path.join(registry_dir, LATEST_FILE), run_id, mode="w")
+    return run_id
+
+
+def _registry_stamp(registry_dir):
+    # Membuat atau menghapus run mengubah mtime direktori registri; LATEST
+    # ditulis paling akhir oleh save_model, setelah meta.json selesai ditulis.
+    stamp = []
+    for path in (registry_dir, os.path.join(registry_dir, LATEST_FILE)):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def list_models(registry_dir):
+    if not os.path.isdir(registry_dir):
+        return []
+    cache_key = os.path.abspath(registry_dir)
+    stamp = _registry_stamp(registry_dir)
+    with _listing_lock:
+        cached = _listing_cache.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return list(cached[1])
+    metas = _scan_models(registry_dir)
+    with _listing_lock:
+        _listing_cache[cache_key] = (stamp, metas)
+    return list(metas)
+
+
+def _scan_models(registry_dir):
+    metas = []
+    for run_id in os.listdir(registry_dir):
+        meta_path = os.path.join(registry_dir, run_id, META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                metas.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(metas, key=lambda m: m["created_at"], reverse=True)
+
+
+def prune_models(registry_dir, keep_per_k=KEEP_RUNS_PER_K, protected_run_ids=()):
+    # Menyimpan keep_per_k run terbaru untuk setiap K, run di LATEST, dan
+    # run yang dilindungi; mengembalikan run_id yang dihapus.
+    protected = {run_id for run_id in protected_run_ids if run_id}
+    latest = latest_run_id(registry_dir)
+    if latest is not None:
+        protected.add(latest)
+    kept_per_k = {}
+    removed = []
+    for meta in list_models(registry_dir):
+        n_kept = kept_per_k.get(meta["n_clusters"], 0)
+        if n_kept < keep_per_k:
+            kept_per_k[meta["n_clusters"]] = n_kept + 1
+            continue
+        if meta["run_id"] in protected:
+            continue
+        shutil.rmtree(os.path.join(registry_dir, meta["run_id"]), ignore_errors=True)
+        removed.append(meta["run_id"])
+    return removed
+
+
+def latest_run_id(registry_dir):
+    try:
+        with open(os.path.join(registry_dir, LATEST_FILE), encoding="utf-8") as f:
+            run_id = f.read().strip()
+    except OSError:
+        run_id = ""
+    if run_id and os.path.exists(os.path.join(registry_dir, run_id, META_FILE)):
+        return run_id
+    metas = list_models(registry_dir)
+    return metas[0]["run_id"] if metas else None
+
+
+def load_model(registry_dir, run_id):
+    run_dir = os.path.join(registry_dir, run_id)
+    with open(os.path.join(run_dir, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(os.path.join(run_dir, MODEL_FILE), "rb") as f:
+        payload = pickle.load(f)
+    return ModelEntry(
+        run_id=run_id,
+        kproto=payload["kproto"],
+        scaler=payload["scaler"],
+        categorical_indices=payload["categorical_indices"],
+        n_clusters=meta["n_clusters"],
+        data_hash=meta["data_hash"],
+        created_at=meta["created_at"],
+        cluster_desc_map={int(k): v for k, v in meta["cluster_descriptions"].items()},
+    )
+
+
+def load_row_index(registry_dir, run_id):
+    import pandas as pd
+    path = os.path.join(registry_dir, run_id, ROWS_FILE)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def load_latest_model(registry_dir):
+    run_id = latest_run_id(registry_dir)
+    if run_id is None:
+        return None
+    return load_model(registry_dir, run_id)
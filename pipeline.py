@@ -0,0 +1,285 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import write_atomic
+from cluster_profile import build_cluster_profile
+from clustering import (
+    diff_row_fingerprints, fit_predict_kprototypes, fit_predict_kprototypes_warm, mixed_silhouette_score, row_fingerprints,
+    silhouette_sample, split_numeric_categorical,
+)
+from compact_features import compact_from_frame, normalize_flag_columns, to_kmodes_array
+from minibatch_kprototypes import fit_minibatch_kprototypes, iter_dataframe_chunks
+from model_registry import load_model, load_row_index, prune_models, save_model
+from result_bundle import read_bundle_manifest, save_result_bundle
+from result_cache import ResultCache, dataframe_fingerprint, library_versions, make_cache_key
+
+
+# --- PIPELINE KLASTERISASI (TANPA STREAMLIT) ---
+# Langkah inti unggah -> praproses -> klasterisasi -> terbitkan yang dipakai
+# bersama oleh app.py dan CLI (pipeline_cli.py). Fungsi di sini tidak memanggil
+# st.*: kondisi yang perlu diberitahukan ke pengguna dikembalikan sebagai
+# daftar pesan, dan kegagalan dilempar sebagai exception untuk ditampilkan
+# oleh pemanggil.
+
+ID_COLS = ["No", "Nama", "JK", "Kelas"]
+NUMERIC_COLS = ["Rata Rata Nilai Akademik", "Kehadiran"]
+CATEGORICAL_COLS = ["Ekstrakurikuler Komputer", "Ekstrakurikuler Pertanian",
+                    "Ekstrakurikuler Menjahit", "Ekstrakurikuler Pramuka"]
+ALL_FEATURES_FOR_CLUSTERING = NUMERIC_COLS + CATEGORICAL_COLS
+
+KPROTO_INIT = 'Huang'
+KPROTO_N_INIT = 10
+KPROTO_RANDOM_STATE = 42
+MINIBATCH_MIN_ROWS = 50000
+MINIBATCH_CHUNK_SIZE = 10000
+MINIBATCH_N_EPOCHS = 3
+WARM_START_MAX_CHANGED_FRACTION = 0.5
+
+KEPSEK_RESULT_BUNDLE_DIR = "hasil_klasterisasi"
+KEPSEK_RESULT_FILE = "Data MA-ALHIKMAH.xlsx"
+MODEL_REGISTRY_DIR = "model_registry"
+
+CACHE_DIR = ".cache"
+CLUSTERING_CACHE_MAX_ENTRIES = 32
+CLUSTERING_CACHE_MAX_DISK_MB = 512
+
+
+class MissingColumnsError(ValueError):
+    def __init__(self, missing_cols):
+        self.missing_cols = missing_cols
+        super().__init__(f"Kolom-kolom berikut tidak ditemukan dalam data Anda: {', '.join(missing_cols)}.")
+
+
+def make_clustering_cache(cache_dir=CACHE_DIR):
+    return ResultCache(
+        os.path.join(cache_dir, "klasterisasi"),
+        max_entries=CLUSTERING_CACHE_MAX_ENTRIES,
+        max_disk_bytes=CLUSTERING_CACHE_MAX_DISK_MB * 1024 * 1024,
+    )
+
+
+def preprocess_dataset(df):
+    # Mengembalikan (fitur siap klasterisasi, scaler, pesan peringatan).
+    df_processed = df.copy()
+    df_processed.columns = [str(col).strip() for col in df_processed.columns]
+    missing_cols = [col for col in NUMERIC_COLS + CATEGORICAL_COLS if col not in df_processed.columns]
+    if missing_cols:
+        raise MissingColumnsError(missing_cols)
+    notes = []
+    df_clean_for_clustering = df_processed.drop(columns=ID_COLS, errors="ignore")
+    # Flag ekstrakurikuler disimpan sebagai uint8 0/1; bentuk string '0'/'1'
+    # untuk kmodes hanya dibuat saat pemanggilan (lihat to_kmodes_array).
+    df_clean_for_clustering[CATEGORICAL_COLS] = normalize_flag_columns(df_clean_for_clustering, CATEGORICAL_COLS)
+    for col in NUMERIC_COLS:
+        if df_clean_for_clustering[col].isnull().any():
+            mean_val = df_clean_for_clustering[col].mean()
+            df_clean_for_clustering[col] = df_clean_for_clustering[col].fillna(mean_val)
+            notes.append(f"Nilai kosong pada kolom '{col}' diisi dengan rata-rata: {mean_val:.2f}.")
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    df_clean_for_clustering[NUMERIC_COLS] = scaler.fit_transform(df_clean_for_clustering[NUMERIC_COLS]).astype(np.float32)
+    return df_clean_for_clustering, scaler, notes
+
+
+def kmodes_input(X_data):
+    # Bentuk ringkas hanya perantara sementara; yang disimpan tetap DataFrame.
+    return to_kmodes_array(compact_from_frame(X_data, NUMERIC_COLS, CATEGORICAL_COLS))
+
+
+def clustering_cache_key(X_data, n_clusters):
+    return make_cache_key(
+        "kprototypes", dataframe_fingerprint(X_data), n_clusters,
+        KPROTO_INIT, KPROTO_N_INIT, KPROTO_RANDOM_STATE, library_versions()
+    )
+
+
+def cluster_dataset(df_preprocessed, n_clusters, cache=None, n_jobs=-1, verbose=0):
+    # Mengembalikan (fitur + kolom Klaster, model, indeks kolom kategorikal).
+    df_for_clustering = df_preprocessed.copy()
+    X_data = df_for_clustering[ALL_FEATURES_FOR_CLUSTERING]
+    categorical_feature_indices = [X_data.columns.get_loc(c) for c in CATEGORICAL_COLS]
+    cache_key = clustering_cache_key(X_data, n_clusters) if cache is not None else None
+    cached_result = cache.get(cache_key) if cache is not None else None
+    if cached_result is not None:
+        clusters, kproto = cached_result
+    else:
+        clusters, kproto = fit_predict_kprototypes(
+            kmodes_input(X_data), categorical_feature_indices, n_clusters, KPROTO_INIT, KPROTO_N_INIT, KPROTO_RANDOM_STATE,
+            n_jobs=n_jobs, verbose=verbose
+        )
+        if cache is not None:
+            cache.put(cache_key, (clusters, kproto))
+    df_for_clustering["Klaster"] = clusters
+    return df_for_clustering, kproto, categorical_feature_indices
+
+
+def cluster_dataset_minibatch(df_original, df_preprocessed, n_clusters, cache=None):
+    # Mengembalikan (fitur + kolom Klaster, model, indeks kolom kategorikal,
+    # scaler online); scaler ini menggantikan scaler hasil praproses.
+    df_raw = df_original.rename(columns=lambda col: str(col).strip())[ALL_FEATURES_FOR_CLUSTERING]
+    categorical_feature_indices = [ALL_FEATURES_FOR_CLUSTERING.index(c) for c in CATEGORICAL_COLS]
+    cache_key = make_cache_key(
+        "minibatch-kprototypes", dataframe_fingerprint(df_raw), n_clusters,
+        MINIBATCH_CHUNK_SIZE, MINIBATCH_N_EPOCHS, KPROTO_RANDOM_STATE, library_versions()
+    ) if cache is not None else None
+    cached_result = cache.get(cache_key) if cache is not None else None
+    if cached_result is not None:
+        clusters, model, scaler = cached_result
+    else:
+        clusters, model, scaler = fit_minibatch_kprototypes(
+            lambda: iter_dataframe_chunks(df_raw, MINIBATCH_CHUNK_SIZE), NUMERIC_COLS, CATEGORICAL_COLS,
+            n_clusters, n_epochs=MINIBATCH_N_EPOCHS, random_state=KPROTO_RANDOM_STATE
+        )
+        if cache is not None:
+            cache.put(cache_key, (clusters, model, scaler))
+    df_for_clustering = df_preprocessed.copy()
+    df_for_clustering["Klaster"] = clusters
+    return df_for_clustering, model, categorical_feature_indices, scaler
+
+
+def sweep_point(df_original, df_preprocessed, n_clusters, cache=None, minibatch=False):
+    # Satu titik kurva elbow & silhouette pencarian K. Fit diambil dari cache
+    # klasterisasi bila ada (misalnya hasil fit spekulatif) dan disimpan ke
+    # sana bila belum, sehingga memilih K ini nanti tidak melatih ulang.
+    # Data besar memakai mini-batch seperti klasterisasi utama. Baris sampel
+    # silhouette dipilih lebih dulu (sampel yang sama dengan
+    # mixed_silhouette_score) sehingga hanya sampel yang dikonversi ke
+    # format kmodes, bukan seluruh data.
+    if minibatch:
+        df_clustered, kproto, categorical_feature_indices, _ = cluster_dataset_minibatch(
+            df_original, df_preprocessed, n_clusters, cache=cache
+        )
+    else:
+        df_clustered, kproto, categorical_feature_indices = cluster_dataset(df_preprocessed, n_clusters, cache=cache, n_jobs=1)
+    sample = silhouette_sample(len(df_clustered))
+    df_sample = df_clustered if sample is None else df_clustered.iloc[sample]
+    X_numeric, X_categorical = split_numeric_categorical(
+        kmodes_input(df_sample[ALL_FEATURES_FOR_CLUSTERING]), categorical_feature_indices
+    )
+    labels = df_sample["Klaster"].to_numpy()
+    return {
+        "n_clusters": n_clusters,
+        "cost": float(kproto.cost_),
+        "n_iter": int(kproto.n_iter_),
+        "silhouette": mixed_silhouette_score(X_numeric, X_categorical, labels, kproto.gamma),
+    }
+
+
+def build_row_fingerprints(df_original):
+    df_raw = df_original.rename(columns=lambda col: str(col).strip())
+    if "No" not in df_raw.columns or df_raw["No"].isnull().any() or df_raw["No"].duplicated().any():
+        return None
+    hash_cols = [col for col in ID_COLS + ALL_FEATURES_FOR_CLUSTERING if col in df_raw.columns]
+    return row_fingerprints(df_raw, "No", hash_cols)
+
+
+def build_row_index(df_original, clusters):
+    fingerprints = build_row_fingerprints(df_original)
+    if fingerprints is None:
+        return None
+    return pd.DataFrame({"No": fingerprints.index, "row_hash": fingerprints.to_numpy(), "Klaster": np.asarray(clusters)})
+
+
+def warm_start_dataset(df_original, df_preprocessed, scaler, registry_dir, previous_run_id, verbose=0):
+    # Mengembalikan (hasil, None), atau (None, alasan) jika warm start tidak
+    # dapat atau tidak layak dilakukan; pemanggil lalu memakai cold start dan
+    # menampilkan alasannya.
+    previous_rows = load_row_index(registry_dir, previous_run_id)
+    if previous_rows is None:
+        return None, f"run {previous_run_id} tidak menyimpan indeks baris"
+    current_fingerprints = build_row_fingerprints(df_original)
+    if current_fingerprints is None:
+        return None, "kolom 'No' tidak ada, kosong, atau tidak unik"
+    previous_fingerprints = pd.Series(previous_rows["row_hash"].to_numpy(), index=previous_rows["No"].to_numpy())
+    changes = diff_row_fingerprints(previous_fingerprints, current_fingerprints)
+    n_rows_changed = len(changes["inserted"]) + len(changes["changed"]) + len(changes["deleted"])
+    if n_rows_changed > WARM_START_MAX_CHANGED_FRACTION * len(current_fingerprints):
+        return None, f"{n_rows_changed} dari {len(current_fingerprints)} baris berubah, lebih dari {WARM_START_MAX_CHANGED_FRACTION:.0%}"
+
+    previous_entry = load_model(registry_dir, previous_run_id)
+    previous_centroids = previous_entry.kproto.cluster_centroids_
+    n_numeric = len(NUMERIC_COLS)
+    # Centroid numerik lama dikembalikan ke skala asli lalu dinormalisasi
+    # ulang dengan scaler data baru.
+    previous_numeric_raw = previous_entry.scaler.inverse_transform(previous_centroids[:, :n_numeric].astype(np.float64))
+    init_numeric = scaler.transform(pd.DataFrame(previous_numeric_raw, columns=NUMERIC_COLS))
+    df_for_clustering = df_preprocessed.copy()
+    X_data = df_for_clustering[ALL_FEATURES_FOR_CLUSTERING]
+    categorical_feature_indices = [X_data.columns.get_loc(c) for c in CATEGORICAL_COLS]
+    try:
+        clusters, kproto = fit_predict_kprototypes_warm(
+            kmodes_input(X_data), categorical_feature_indices, init_numeric,
+            previous_centroids[:, n_numeric:], KPROTO_RANDOM_STATE, verbose=verbose
+        )
+    except ValueError as e:
+        # Misalnya nilai kategorikal centroid lama tidak ada pada data baru.
+        return None, str(e).rstrip(".")
+    except Exception as e:
+        return None, f"pelatihan dari centroid sebelumnya gagal: {e}"
+    df_for_clustering["Klaster"] = clusters
+
+    previous_labels = pd.Series(previous_rows["Klaster"].to_numpy(), index=previous_rows["No"].to_numpy())
+    current_labels = pd.Series(np.asarray(clusters), index=current_fingerprints.index)
+    common = current_labels.index.intersection(previous_labels.index)
+    n_switched = int((current_labels.reindex(common).to_numpy() != previous_labels.reindex(common).to_numpy()).sum())
+    change_report = {
+        "previous_run_id": previous_run_id,
+        "inserted": len(changes["inserted"]),
+        "changed": len(changes["changed"]),
+        "deleted": len(changes["deleted"]),
+        "unchanged": changes["unchanged"],
+        "switched": n_switched,
+        "n_iter": int(kproto.n_iter_),
+    }
+    return (df_for_clustering, kproto, categorical_feature_indices, change_report), None
+
+
+def final_results(df_original, df_clustered):
+    # Data asli ditambah kolom Klaster: tabel yang diterbitkan dan ditampilkan.
+    df_final = df_original.copy()
+    df_final['Klaster'] = df_clustered['Klaster']
+    return df_final
+
+
+def profile_results(df_original, df_clustered, n_clusters):
+    return build_cluster_profile(
+        df_clustered, df_original, df_clustered['Klaster'], n_clusters, NUMERIC_COLS, CATEGORICAL_COLS
+    )
+
+
+def register_model(df_original, df_preprocessed, df_clustered, kproto, scaler, categorical_feature_indices, n_clusters,
+                   cluster_profile, registry_dir=MODEL_REGISTRY_DIR):
+    return save_model(
+        registry_dir, kproto, scaler, categorical_feature_indices, n_clusters,
+        dataframe_fingerprint(df_preprocessed[ALL_FEATURES_FOR_CLUSTERING]),
+        cluster_profile.descriptions,
+        row_index=build_row_index(df_original, df_clustered['Klaster'])
+    )
+
+
+def prune_registry(registry_dir=MODEL_REGISTRY_DIR, bundle_dir=KEPSEK_RESULT_BUNDLE_DIR, protected_run_ids=()):
+    # Run yang dirujuk bundel hasil terbit madrasah tidak pernah dihapus.
+    try:
+        published_run_id = read_bundle_manifest(bundle_dir).get("model_run_id")
+    except (OSError, ValueError):
+        published_run_id = None
+    return prune_models(registry_dir, protected_run_ids=[published_run_id, *protected_run_ids])
+
+
+def publish_bundle(df_final, scaler, kproto, cluster_profile, bundle_dir=KEPSEK_RESULT_BUNDLE_DIR, model_run_id=None):
+    return save_result_bundle(
+        bundle_dir, df_final, scaler, kproto,
+        cluster_profile.descriptions, NUMERIC_COLS, CATEGORICAL_COLS,
+        model_run_id=model_run_id
+    )
+
+
+def write_excel_copy(df_final, file_name=KEPSEK_RESULT_FILE):
+    # Salinan Excel opsional; Kehadiran ditulis sebagai teks persen seperti
+    # format file Excel lama yang dibaca halaman Kepala Sekolah. Ditulis secara
+    # atomik karena sesi Kepala Sekolah dapat sedang membaca file yang sama.
+    df_final_for_kepsek = df_final.copy()
+    df_final_for_kepsek['Kehadiran'] = df_final_for_kepsek['Kehadiran'].map("{:.2%}".format)
+    return write_atomic(file_name, lambda f: df_final_for_kepsek.to_excel(f, index=False))
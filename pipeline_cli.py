@@ -0,0 +1,94 @@
+import argparse
+import sys
+from collections import Counter
+
+from pipeline import MINIBATCH_MIN_ROWS, MODEL_REGISTRY_DIR
+from scheduler import DEFAULT_MAX_WORKERS, make_job, run_jobs
+from tenants import DEFAULT_TENANT_ID, normalize_tenant_id, tenant_paths
+
+
+# --- CLI KLASTERISASI TANPA PERAMBAN ---
+# Menjalankan pipeline yang sama dengan tombol di app.py (baca -> praproses ->
+# klasterisasi -> profil -> terbitkan) untuk satu atau banyak file, misalnya
+# dari cron untuk proses malam hari. Input dapat diberi awalan ID madrasah
+# ("<id>=<file>"); artefak setiap madrasah ditulis ke direktorinya sendiri
+# (lihat tenants.py) dan beberapa madrasah diproses paralel dengan --jobs.
+# Durasi tiap tahap dicetak ke stdout.
+#
+#   python pipeline_cli.py data_2024.xlsx data_2025.csv -k 3
+#   python pipeline_cli.py data.xlsx -k 4 --publish --excel
+#   python pipeline_cli.py ma-alhikmah=a.xlsx ma-nurul-huda=b.xlsx --publish --jobs 2
+
+DEFAULT_OUTPUT_DIR = "hasil_batch"
+
+
+def parse_input(spec, default_tenant):
+    tenant_id, sep, path = spec.partition("=")
+    if not sep:
+        return default_tenant, spec
+    return normalize_tenant_id(tenant_id), path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Klasterisasi K-Prototypes siswa tanpa antarmuka Streamlit.")
+    parser.add_argument("inputs", nargs="+", help="File dataset (.xlsx, .csv, atau .parquet), opsional dengan awalan '<id madrasah>='.")
+    parser.add_argument("-k", "--n-clusters", type=int, default=3, help="Jumlah klaster (default: 3).")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT_ID, help=f"ID madrasah untuk input tanpa awalan (default: {DEFAULT_TENANT_ID}).")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help=f"Direktori hasil, per madrasah dan per file (default: {DEFAULT_OUTPUT_DIR}).")
+    parser.add_argument("--publish", action="store_true",
+                        help="Terbitkan hasil ke bundel madrasah yang dibaca halaman Kepala Sekolah (satu file per madrasah).")
+    parser.add_argument("--excel", action="store_true", help="Tulis juga salinan Excel hasil klasterisasi.")
+    parser.add_argument("--minibatch", choices=["auto", "on", "off"], default="auto",
+                        help=f"Mode mini-batch; 'auto' aktif untuk data >= {MINIBATCH_MIN_ROWS:,} baris.")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help=f"Jumlah file yang diproses paralel di proses terpisah (default: 1; disarankan {DEFAULT_MAX_WORKERS} atau lebih untuk banyak madrasah).")
+    parser.add_argument("--no-register", action="store_true", help=f"Jangan simpan model ke '{MODEL_REGISTRY_DIR}' madrasah.")
+    parser.add_argument("--no-cache", action="store_true", help="Jangan pakai cache hasil klasterisasi madrasah.")
+    args = parser.parse_args(argv)
+    try:
+        default_tenant = normalize_tenant_id(args.tenant)
+        args.inputs = [parse_input(spec, default_tenant) for spec in args.inputs]
+    except ValueError as e:
+        parser.error(str(e))
+    if args.publish:
+        duplicated = [tenant_id for tenant_id, count in Counter(t for t, _ in args.inputs).items() if count > 1]
+        if duplicated:
+            parser.error(f"--publish hanya dapat dipakai dengan satu file per madrasah: {', '.join(duplicated)}.")
+    return args
+
+
+def format_timings(summary):
+    phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in summary["timings"])
+    return f"{phases}; total {summary['total_seconds']:.2f}s"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = [
+        make_job(
+            tenant_id, input_path, args.n_clusters,
+            output_dir=None if args.publish else args.output_dir,
+            excel=args.excel, minibatch=args.minibatch,
+            register=not args.no_register, use_cache=not args.no_cache,
+        )
+        for tenant_id, input_path in args.inputs
+    ]
+    n_failed = 0
+    for job, summary, error in run_jobs(jobs, max_workers=args.jobs):
+        print(f"[{job.tenant_id}] {job.input_path}")
+        if error is not None:
+            n_failed += 1
+            print(f"  GAGAL: {error}", file=sys.stderr)
+            continue
+        for note in summary["notes"]:
+            print(f"  peringatan: {note}")
+        mode = " (mini-batch)" if summary["minibatch"] else ""
+        print(f"  {summary['rows']:,} baris, {args.n_clusters} klaster{mode}; jumlah per klaster: {summary['counts']}")
+        print(f"  hasil: {summary['bundle_dir']} (generasi {summary['generation']})" + (f", model: {summary['model_run_id']} ({tenant_paths(job.tenant_id).registry_dir})" if summary["model_run_id"] else ""))
+        print(f"  waktu: {format_timings(summary)}")
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
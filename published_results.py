@@ -0,0 +1,122 @@
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from cluster_profile import build_cluster_profile, scale_with_bundle
+from pipeline import CATEGORICAL_COLS, NUMERIC_COLS, MissingColumnsError, preprocess_dataset
+from result_bundle import BUNDLE_MANIFEST_FILE, bundle_exists, bundle_generation, load_result_bundle
+from results_grid import ResultsGrid
+from student_index import StudentIndex
+from table_reader import excel_engine
+
+
+# --- HASIL TERBIT UNTUK DASBOR KEPALA SEKOLAH ---
+# Hasil yang diterbitkan Operator TU dimuat sekali per versi menjadi satu
+# objek PublishedResult yang dipakai bersama oleh semua sesi (lihat
+# get_published_result di app.py); sesi hanya menyimpan pilihan UI. Karena
+# dipakai bersama, array numpy di balik tabel, profil, dan indeksnya dibuat
+# tidak dapat ditulis (flags.writeable = False): penulisan di tempat
+# melempar ValueError alih-alih diam-diam mengubah data sesi lain. Salin
+# dulu (df.copy()) bila perlu memodifikasi.
+
+PublishedResult = namedtuple("PublishedResult", [
+    "df_clustered", "n_clusters", "cluster_profile", "student_index", "results_grid",
+])
+
+
+def _read_only_array(values):
+    array = np.array(values, copy=True)
+    array.flags.writeable = False
+    return array
+
+
+def _read_only_frame(data):
+    # Satu array per kolom (tanpa konsolidasi blok pandas) sehingga setiap
+    # kolom memakai array read-only tersebut secara langsung. Kolom bertipe
+    # ekstensi pandas hanya disalin.
+    def column(values):
+        if isinstance(values.dtype, np.dtype):
+            return _read_only_array(values.to_numpy())
+        return values.array.copy()
+    if isinstance(data, pd.Series):
+        return pd.Series(column(data), index=data.index, name=data.name, copy=False)
+    return pd.DataFrame({col: column(data[col]) for col in data.columns}, index=data.index, copy=False)
+
+
+def _read_only_profile(cluster_profile):
+    if cluster_profile is None:
+        return None
+    return cluster_profile._replace(
+        counts=_read_only_frame(cluster_profile.counts),
+        scaled_means=_read_only_frame(cluster_profile.scaled_means),
+        raw_means=_read_only_frame(cluster_profile.raw_means),
+        flag_rates=_read_only_frame(cluster_profile.flag_rates),
+        flag_modes=_read_only_frame(cluster_profile.flag_modes),
+        descriptions=MappingProxyType(dict(cluster_profile.descriptions)),
+    )
+
+
+def find_result_file(paths):
+    if bundle_exists(paths.bundle_dir):
+        return os.path.join(paths.bundle_dir, BUNDLE_MANIFEST_FILE)
+    if os.path.exists(paths.excel_file):
+        return paths.excel_file
+    return None
+
+
+def result_version(file_path):
+    # Bundel: nomor generasi di manifest, murah dibaca dan naik di setiap
+    # penerbitan. Salinan Excel: waktu modifikasi dan ukuran file.
+    if os.path.basename(file_path) == BUNDLE_MANIFEST_FILE:
+        return ("generasi", bundle_generation(os.path.dirname(file_path)))
+    file_stat = os.stat(file_path)
+    return (file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def _load_bundle(file_path):
+    bundle = load_result_bundle(os.path.dirname(file_path))
+    df_clustered = bundle.df_clustered
+    n_clusters = bundle.manifest['n_clusters']
+    df_scaled = scale_with_bundle(df_clustered, NUMERIC_COLS, bundle.scaler_mean, bundle.scaler_scale)
+    cluster_profile = build_cluster_profile(
+        df_scaled, df_clustered, df_clustered['Klaster'], n_clusters, NUMERIC_COLS, CATEGORICAL_COLS
+    )
+    # Deskripsi yang diterbitkan Operator TU tetap menjadi acuan.
+    cluster_profile = cluster_profile._replace(descriptions={**cluster_profile.descriptions, **bundle.cluster_desc_map})
+    return df_clustered, n_clusters, cluster_profile
+
+
+def _load_excel(file_path):
+    df_clustered = pd.read_excel(file_path, engine=excel_engine())
+    kehadiran_numeric = df_clustered['Kehadiran']
+    if kehadiran_numeric.dtype == 'object':
+        kehadiran_numeric = kehadiran_numeric.str.rstrip('%').astype('float') / 100
+    df_clustered['Kehadiran'] = kehadiran_numeric
+    n_clusters = len(df_clustered['Klaster'].unique())
+    df_original = df_clustered.drop(columns=['Klaster'], errors='ignore')
+    try:
+        df_preprocessed, _, _ = preprocess_dataset(df_original)
+    except MissingColumnsError:
+        return df_clustered, n_clusters, None
+    cluster_profile = build_cluster_profile(
+        df_preprocessed, df_original, df_clustered['Klaster'], n_clusters, NUMERIC_COLS, CATEGORICAL_COLS
+    )
+    return df_clustered, n_clusters, cluster_profile
+
+
+def load_published_result(file_path):
+    if os.path.basename(file_path) == BUNDLE_MANIFEST_FILE:
+        df_clustered, n_clusters, cluster_profile = _load_bundle(file_path)
+    else:
+        df_clustered, n_clusters, cluster_profile = _load_excel(file_path)
+    df_clustered = _read_only_frame(df_clustered)
+    return PublishedResult(
+        df_clustered=df_clustered,
+        n_clusters=n_clusters,
+        cluster_profile=_read_only_profile(cluster_profile),
+        student_index=StudentIndex.from_frame(df_clustered).make_read_only(),
+        results_grid=ResultsGrid(df_clustered).make_read_only(),
+    )
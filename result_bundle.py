@@ -0,0 +1,173 @@
+import json
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import file_lock, fsync_directory, write_atomic
+
+
+# --- BUNDEL HASIL KLASTERISASI (SERAH TERIMA TU -> KEPALA SEKOLAH) ---
+# Setiap penerbitan menulis satu generasi baru yang tidak pernah diubah lagi:
+#   gen-000007/siswa.parquet : tabel siswa bertipe (Kehadiran numerik) beserta kolom Klaster
+#   gen-000007/model.npz     : label, mean/scale scaler, centroid numerik & kategorikal, gamma
+#   manifest.json            : versi format, nomor generasi, direktori datanya,
+#                              metadata, dan peta deskripsi klaster
+# manifest.json diganti secara atomik paling akhir, sehingga pembaca selalu
+# mendapat satu generasi yang lengkap dan cukup membaca file kecil ini untuk
+# mengetahui apakah ada generasi yang lebih baru. Penerbit diserialkan dengan
+# kunci file; beberapa generasi lama disimpan agar pembaca yang sedang membaca
+# generasi sebelumnya tidak kehilangan filenya.
+# Bundel format 1 (file langsung di direktori bundel, tanpa generasi) tetap dapat dibaca.
+
+BUNDLE_FORMAT_VERSION = 2
+SUPPORTED_BUNDLE_FORMAT_VERSIONS = (1, 2)
+BUNDLE_TABLE_FILE = "siswa.parquet"
+BUNDLE_ARRAYS_FILE = "model.npz"
+BUNDLE_MANIFEST_FILE = "manifest.json"
+BUNDLE_LOCK_FILE = ".publish.lock"
+BUNDLE_GENERATION_PREFIX = "gen-"
+BUNDLE_KEEP_GENERATIONS = 3
+BUNDLE_LOAD_ATTEMPTS = 3
+
+_GENERATION_DIR_PATTERN = re.compile(rf"^{BUNDLE_GENERATION_PREFIX}(\d+)$")
+
+ResultBundle = namedtuple("ResultBundle", [
+    "df_clustered", "labels", "scaler_mean", "scaler_scale",
+    "centroids_numeric", "centroids_categorical", "gamma",
+    "cluster_desc_map", "manifest",
+])
+
+
+def read_bundle_manifest(directory):
+    with open(os.path.join(directory, BUNDLE_MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def bundle_generation(directory):
+    # Pemeriksaan murah untuk pembaca: 0 bila belum ada bundel (atau bundel format 1).
+    try:
+        return int(read_bundle_manifest(directory).get("generation", 0))
+    except (OSError, ValueError):
+        return 0
+
+
+def _existing_generations(directory):
+    generations = []
+    for name in os.listdir(directory):
+        match = _GENERATION_DIR_PATTERN.match(name)
+        if match and os.path.isdir(os.path.join(directory, name)):
+            generations.append(int(match.group(1)))
+    return sorted(generations)
+
+
+def _prune_generations(directory, current_generation):
+    for generation in _existing_generations(directory):
+        if generation <= current_generation - BUNDLE_KEEP_GENERATIONS:
+            shutil.rmtree(os.path.join(directory, f"{BUNDLE_GENERATION_PREFIX}{generation:06d}"), ignore_errors=True)
+    # Sisa bundel format 1 tidak dirujuk lagi setelah generasi pertama terbit.
+    for name in (BUNDLE_TABLE_FILE, BUNDLE_ARRAYS_FILE):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_result_bundle(directory, df_final, scaler, kproto, cluster_desc_map, numeric_cols, categorical_cols, model_run_id=None):
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(os.path.join(directory, BUNDLE_LOCK_FILE)):
+        return _save_generation(
+            directory, df_final, scaler, kproto, cluster_desc_map, numeric_cols, categorical_cols, model_run_id
+        )
+
+
+def _save_generation(directory, df_final, scaler, kproto, cluster_desc_map, numeric_cols, categorical_cols, model_run_id):
+    # Dipanggil dengan kunci penerbitan dipegang. Nomor generasi juga melewati
+    # direktori yang tersisa dari penerbitan yang gagal di tengah jalan.
+    generation = max([bundle_generation(directory)] + _existing_generations(directory)) + 1
+    data_dir = f"{BUNDLE_GENERATION_PREFIX}{generation:06d}"
+    generation_dir = os.path.join(directory, data_dir)
+    os.makedirs(generation_dir)
+    n_numeric = len(numeric_cols)
+    centroids = kproto.cluster_centroids_
+    centroids_numeric = centroids[:, :n_numeric].astype(np.float64)
+    centroids_categorical = centroids[:, n_numeric:].astype(str)
+
+    df_table = df_final.reset_index(drop=True)
+    write_atomic(
+        os.path.join(generation_dir, BUNDLE_TABLE_FILE),
+        lambda f: df_table.to_parquet(f, index=False),
+    )
+    write_atomic(
+        os.path.join(generation_dir, BUNDLE_ARRAYS_FILE),
+        lambda f: np.savez(
+            f,
+            labels=df_table["Klaster"].to_numpy(dtype=np.int32),
+            scaler_mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+            centroids_numeric=centroids_numeric,
+            centroids_categorical=centroids_categorical,
+            gamma=np.float64(kproto.gamma),
+        ),
+    )
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "generation": generation,
+        "data_dir": data_dir,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_rows": int(len(df_table)),
+        "n_clusters": int(kproto.n_clusters),
+        "numeric_cols": list(numeric_cols),
+        "categorical_cols": list(categorical_cols),
+        "cluster_descriptions": {str(k): v for k, v in cluster_desc_map.items()},
+        "model_run_id": model_run_id,
+    }
+    fsync_directory(generation_dir)
+    write_atomic(
+        os.path.join(directory, BUNDLE_MANIFEST_FILE),
+        lambda f: json.dump(manifest, f, ensure_ascii=False, indent=2),
+        mode="w",
+    )
+    _prune_generations(directory, generation)
+    return manifest
+
+
+def bundle_exists(directory):
+    return os.path.exists(os.path.join(directory, BUNDLE_MANIFEST_FILE))
+
+
+def load_result_bundle(directory):
+    # Generasi yang dirujuk manifest dapat terhapus bila beberapa penerbitan
+    # terjadi selama pembacaan; manifest lalu dibaca ulang.
+    for attempt in range(BUNDLE_LOAD_ATTEMPTS):
+        manifest = read_bundle_manifest(directory)
+        try:
+            return _load_generation(directory, manifest)
+        except FileNotFoundError:
+            if attempt == BUNDLE_LOAD_ATTEMPTS - 1:
+                raise
+
+
+def _load_generation(directory, manifest):
+    if manifest.get("format_version") not in SUPPORTED_BUNDLE_FORMAT_VERSIONS:
+        raise ValueError(
+            f"Versi format bundel {manifest.get('format_version')} tidak didukung "
+            f"(diharapkan {BUNDLE_FORMAT_VERSION})."
+        )
+    data_dir = os.path.join(directory, manifest.get("data_dir", ""))
+    df_clustered = pd.read_parquet(os.path.join(data_dir, BUNDLE_TABLE_FILE))
+    with np.load(os.path.join(data_dir, BUNDLE_ARRAYS_FILE), allow_pickle=False) as arrays:
+        return ResultBundle(
+            df_clustered=df_clustered,
+            labels=arrays["labels"],
+            scaler_mean=arrays["scaler_mean"],
+            scaler_scale=arrays["scaler_scale"],
+            centroids_numeric=arrays["centroids_numeric"],
+            centroids_categorical=arrays["centroids_categorical"],
+            gamma=float(arrays["gamma"]),
+            cluster_desc_map={int(k): v for k, v in manifest["cluster_descriptions"].items()},
+            manifest=manifest,
+        )
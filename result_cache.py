@@ -0,0 +1,198 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from atomic_files import write_atomic
+
+
+# --- SIDIK DATA (FINGERPRINT) ---
+
+def dataframe_fingerprint(df):
+    hasher = hashlib.sha256()
+    hasher.update(repr(list(df.columns)).encode("utf-8"))
+    hasher.update(repr([str(dtype) for dtype in df.dtypes]).encode("utf-8"))
+    hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def library_versions():
+    import kmodes
+    import sklearn
+    return {
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+        "kmodes": kmodes.__version__,
+    }
+
+
+def make_cache_key(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+# --- CACHE DUA TINGKAT (MEMORI LRU + DISK) ---
+
+DISK_EVICTION_LOW_WATERMARK = 0.9
+
+class ResultCache:
+    file_suffix = ".pkl"
+
+    def __init__(self, directory, max_entries=32, max_disk_bytes=512 * 1024 * 1024, max_memory_bytes=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path_for(self, key):
+        return os.path.join(self.directory, f"{key}{self.file_suffix}")
+
+    def _dump(self, value, f):
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, f):
+        return pickle.load(f)
+
+    def _sizeof(self, value):
+        # Ukuran hanya dihitung bila batas memori dalam byte dipakai.
+        return 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as f:
+                value = self._load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        sizes = []
+
+        def dump(f):
+            self._dump(value, f)
+            sizes.append(f.tell())
+
+        try:
+            write_atomic(self._path_for(key), dump)
+        except OSError:
+            return
+        written_bytes = sizes[0]
+        # Total byte di disk dilacak secara bertambah; direktori hanya dipindai
+        # ulang saat batas terlampaui sehingga put beruntun tetap murah.
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += written_bytes
+            needs_eviction = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if needs_eviction:
+            self._evict_disk()
+
+    def _remember(self, key, value):
+        if key in self._memory:
+            self._memory_bytes -= self._sizeof(self._memory[key])
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        self._memory_bytes += self._sizeof(value)
+        while len(self._memory) > self.max_entries or (
+            self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= self._sizeof(evicted)
+            self._stats["evictions"] += 1
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.file_suffix):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        # Bila batas terlampaui, hapus hingga di bawah ambang rendah agar
+        # pemindaian direktori tidak terjadi pada setiap put berikutnya.
+        limit = self.max_disk_bytes if total_bytes <= self.max_disk_bytes else self.max_disk_bytes * DISK_EVICTION_LOW_WATERMARK
+        while entries and total_bytes > limit:
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total_bytes -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+        with self._lock:
+            self._disk_bytes = total_bytes
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk_bytes = None
+        for _, _, name in self._disk_entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        disk_entries = self._disk_entries()
+        stats["disk_entries"] = len(disk_entries)
+        stats["disk_bytes"] = sum(size for _, size, _ in disk_entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+# --- CACHE BERALAMAT KONTEN UNTUK BYTES (MISALNYA PDF) ---
+# Nilai berupa bytes disimpan apa adanya (tanpa pickle); batas memori dan
+# disk dihitung dalam byte.
+
+class BytesCache(ResultCache):
+    file_suffix = ".bin"
+
+    def _dump(self, value, f):
+        f.write(value)
+
+    def _load(self, f):
+        return f.read()
+
+    def _sizeof(self, value):
+        return len(value)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+# --- TABEL HASIL BERHALAMAN (SISI SERVER) ---
+# Dibangun sekali per hasil klasterisasi. Kolom filter kategorikal (Kelas,
+# JK, Klaster) disimpan sebagai kode integer hasil factorize terurut sehingga
+# filter cukup berupa lookup tabel boolean per kode, dan kolom numerik sebagai
+# array float64. Pengurutan memakai peringkat (rank) per kolom yang dihitung
+# sekali saat pertama dibutuhkan. Hanya baris pada halaman yang diminta yang
+# diambil dari DataFrame untuk dikirim ke browser.
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class ResultsGrid:
+    def __init__(self, df, category_cols=("Kelas", "JK", "Klaster"), numeric_cols=("Rata Rata Nilai Akademik", "Kehadiran")):
+        self.df = df
+        self.category_cols = [col for col in category_cols if col in df.columns]
+        self.numeric_cols = [col for col in numeric_cols if col in df.columns]
+        self.codes = {}
+        self.categories = {}
+        for col in self.category_cols:
+            # Nilai kosong mendapat kode -1 dan tidak termasuk kategori mana pun.
+            try:
+                codes, uniques = pd.factorize(df[col], sort=True)
+            except TypeError:
+                # Campuran tipe (mis. Kelas berisi angka dan teks) tidak dapat diurutkan.
+                codes, uniques = pd.factorize(df[col].astype(str), sort=True)
+            self.codes[col] = codes.astype(np.int32)
+            self.categories[col] = list(uniques)
+        self.numeric = {col: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64) for col in self.numeric_cols}
+        self._ranks = {}
+
+    def make_read_only(self):
+        # Untuk tabel yang dipakai bersama antarsesi (lihat published_results);
+        # peringkat yang dihitung kemudian juga selalu read-only.
+        for array in [*self.codes.values(), *self.numeric.values()]:
+            array.flags.writeable = False
+        self.categories = {col: tuple(values) for col, values in self.categories.items()}
+        return self
+
+    def __len__(self):
+        return len(self.df)
+
+    def numeric_bounds(self, col):
+        values = self.numeric[col]
+        if len(values) == 0 or np.isnan(values).all():
+            return 0.0, 0.0
+        return float(np.nanmin(values)), float(np.nanmax(values))
+
+    def filter_positions(self, selected=None, ranges=None):
+        # selected: {kolom: [kategori yang dipilih]}; daftar kosong/None = semua.
+        # ranges: {kolom: (min, max)} inklusif; baris bernilai kosong hanya
+        # disertakan bila rentang yang diminta mencakup seluruh data.
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, values in (selected or {}).items():
+            if not values or col not in self.codes:
+                continue
+            lookup = {category: code for code, category in enumerate(self.categories[col])}
+            allowed = np.zeros(len(self.categories[col]) + 1, dtype=bool)
+            for value in values:
+                if value in lookup:
+                    allowed[lookup[value]] = True
+            # Kode -1 (kosong) jatuh pada elemen terakhir yang selalu False.
+            mask &= allowed[self.codes[col]]
+        for col, (low, high) in (ranges or {}).items():
+            if col not in self.numeric:
+                continue
+            if (low, high) == self.numeric_bounds(col):
+                continue
+            values = self.numeric[col]
+            mask &= (values >= low) & (values <= high)
+        return np.flatnonzero(mask)
+
+    def _rank(self, col):
+        if col not in self._ranks:
+            if col in self.codes:
+                # Kode factorize terurut sudah merupakan peringkat; kosong di akhir.
+                codes = self.codes[col]
+                rank = np.where(codes < 0, len(self.categories[col]), codes)
+            else:
+                order = self.df[col].reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy()
+                rank = np.empty(len(order), dtype=np.int64)
+                rank[order] = np.arange(len(order))
+            rank.flags.writeable = False
+            self._ranks[col] = rank
+        return self._ranks[col]
+
+    def sort_positions(self, positions, col, descending=False):
+        if col is None or col not in self.df.columns:
+            return positions
+        ranks = self._rank(col)[positions]
+        order = np.argsort(-ranks if descending else ranks, kind="stable")
+        return positions[order]
+
+    def page(self, positions, page_number, page_size=DEFAULT_PAGE_SIZE, columns=None):
+        # page_number dimulai dari 1 dan dibatasi ke halaman terakhir.
+        n_pages = max(1, -(-len(positions) // page_size))
+        start = (min(max(int(page_number), 1), n_pages) - 1) * page_size
+        page_df = self.df.iloc[positions[start:start + page_size]]
+        if columns is not None:
+            page_df = page_df[[col for col in columns if col in page_df.columns]]
+        return page_df, start, n_pages
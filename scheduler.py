@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pipeline import (
+    ALL_FEATURES_FOR_CLUSTERING, ID_COLS, MINIBATCH_MIN_ROWS, cluster_dataset, cluster_dataset_minibatch,
+    final_results, make_clustering_cache, preprocess_dataset, profile_results, prune_registry, publish_bundle, register_model,
+    write_excel_copy,
+)
+from startup_timing import RunTimer
+from table_reader import read_table
+from tenants import tenant_paths
+
+
+# --- PENJADWAL KLASTERISASI BANYAK MADRASAH ---
+# Setiap pekerjaan (satu file dataset milik satu madrasah) dijalankan di proses
+# pekerja terpisah. Jumlah pekerjaan yang berjalan bersamaan dibatasi oleh
+# max_workers, dan pekerjaan baru baru dikirim saat ada yang selesai. Di dalam
+# pekerja, K-Prototypes memakai satu proses (n_jobs=1) agar total proses tidak
+# melebihi batas tersebut. Semua artefak ditulis ke direktori madrasahnya.
+
+DEFAULT_MAX_WORKERS = 2
+
+# output_dir None berarti hasil diterbitkan ke bundel madrasah (dibaca dasbor
+# Kepala Sekolah); selain itu ke <output_dir>/<tenant_id>/<nama file>/.
+PipelineJob = namedtuple("PipelineJob", [
+    "tenant_id", "input_path", "n_clusters", "output_dir", "excel", "minibatch", "register", "use_cache", "n_jobs",
+])
+
+
+def make_job(tenant_id, input_path, n_clusters, output_dir=None, excel=False, minibatch="auto", register=True, use_cache=True, n_jobs=-1):
+    return PipelineJob(tenant_id, input_path, n_clusters, output_dir, excel, minibatch, register, use_cache, n_jobs)
+
+
+def run_pipeline_job(job):
+    # Mengembalikan ringkasan berisi durasi per tahap. Exception diteruskan.
+    paths = tenant_paths(job.tenant_id)
+    timer = RunTimer()
+    with open(job.input_path, "rb") as f:
+        data = f.read()
+    df_original = read_table(data, os.path.basename(job.input_path), columns=ID_COLS + ALL_FEATURES_FOR_CLUSTERING)
+    timer.mark("baca")
+
+    df_preprocessed, scaler, notes = preprocess_dataset(df_original)
+    timer.mark("praproses")
+
+    cache = make_clustering_cache(paths.cache_dir) if job.use_cache else None
+    use_minibatch = job.minibatch == "on" or (job.minibatch == "auto" and len(df_original) >= MINIBATCH_MIN_ROWS)
+    if use_minibatch:
+        df_clustered, kproto, categorical_indices, scaler = cluster_dataset_minibatch(
+            df_original, df_preprocessed, job.n_clusters, cache=cache
+        )
+    else:
+        df_clustered, kproto, categorical_indices = cluster_dataset(df_preprocessed, job.n_clusters, cache=cache, n_jobs=job.n_jobs)
+    timer.mark("klasterisasi")
+
+    df_final = final_results(df_original, df_clustered)
+    cluster_profile = profile_results(df_original, df_clustered, job.n_clusters)
+    timer.mark("profil")
+
+    model_run_id = None
+    if job.register:
+        model_run_id = register_model(
+            df_original, df_preprocessed, df_clustered, kproto, scaler, categorical_indices, job.n_clusters,
+            cluster_profile, registry_dir=paths.registry_dir
+        )
+    stem = os.path.splitext(os.path.basename(job.input_path))[0]
+    if job.output_dir is None:
+        bundle_dir, excel_file = paths.bundle_dir, paths.excel_file
+    else:
+        bundle_dir = os.path.join(job.output_dir, paths.tenant_id, stem)
+        excel_file = os.path.join(bundle_dir, f"{stem}_klaster.xlsx")
+    manifest = publish_bundle(df_final, scaler, kproto, cluster_profile, bundle_dir=bundle_dir, model_run_id=model_run_id)
+    if job.excel:
+        write_excel_copy(df_final, excel_file)
+    if job.register:
+        prune_registry(paths.registry_dir, paths.bundle_dir, protected_run_ids=[model_run_id])
+    timer.mark("terbitkan")
+
+    return {
+        "rows": len(df_final),
+        "counts": cluster_profile.counts.tolist(),
+        "bundle_dir": bundle_dir,
+        "generation": manifest["generation"],
+        "model_run_id": model_run_id,
+        "minibatch": use_minibatch,
+        "notes": notes,
+        "timings": timer.phases,
+        "total_seconds": timer.total(),
+    }
+
+
+def _run_job_safely(job):
+    try:
+        return job, run_pipeline_job(job), None
+    except Exception as e:
+        # Dikirim sebagai teks agar selalu dapat di-pickle ke proses utama.
+        return job, None, str(e)
+
+
+def run_jobs(jobs, max_workers=DEFAULT_MAX_WORKERS):
+    # Menghasilkan (job, ringkasan, pesan_galat) sesuai urutan selesai.
+    jobs = iter(jobs)
+    if max_workers <= 1:
+        for job in jobs:
+            yield _run_job_safely(job)
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        pending = set()
+        while True:
+            for job in jobs:
+                pending.add(executor.submit(_run_job_safely, job._replace(n_jobs=1)))
+                if len(pending) >= max_workers:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import deque
+
+
+# --- PENGUKURAN WAKTU MUAT (COLD START) ---
+# Setiap eksekusi skrip mencatat durasi per fase (impor, CSS, inisialisasi
+# state, render). Eksekusi pertama tiap sesi yang berakhir di layar pemilihan
+# peran dicatat sebagai "first paint". Modul ini hanya diimpor sekali per
+# proses sehingga riwayatnya bertahan lintas rerun dan lintas sesi; entri
+# pertama adalah cold start proses (impor pustaka belum ter-cache).
+
+FIRST_PAINT_HISTORY_SIZE = 100
+
+_history = deque(maxlen=FIRST_PAINT_HISTORY_SIZE)
+_cold_start = None
+_lock = threading.Lock()
+
+
+class RunTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        return {"total_ms": self.total() * 1000, "phases_ms": {phase: seconds * 1000 for phase, seconds in self.phases}}
+
+
+def record_first_paint(timer):
+    global _cold_start
+    report = timer.report()
+    with _lock:
+        if _cold_start is None:
+            _cold_start = report
+        _history.append(report["total_ms"])
+    return report
+
+
+def first_paint_summary():
+    with _lock:
+        history = sorted(_history)
+        cold_start = _cold_start
+    if not history:
+        return None
+    return {
+        "sessions": len(history),
+        "median_ms": history[len(history) // 2],
+        "max_ms": history[-1],
+        "cold_start_ms": cold_start["total_ms"],
+        "cold_start_phases_ms": cold_start["phases_ms"],
+    }
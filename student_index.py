@@ -0,0 +1,98 @@
+import bisect
+
+import numpy as np
+
+
+# --- INDEKS PENCARIAN SISWA ---
+# Dibangun sekali per hasil klasterisasi. Memetakan label pilihan, Nama, dan
+# No ke posisi baris (untuk df.iloc) sehingga pencarian tidak perlu memindai
+# seluruh tabel pada setiap rerun. Nama ganda diberi label "Nama (No x)".
+# Pencarian awalan memakai bisect pada daftar label yang sudah diurutkan.
+# Bila kolom Klaster tersedia, posisi baris anggota tiap klaster juga disimpan
+# (terurut) sehingga daftar anggota klaster tidak perlu memfilter tabel.
+
+DEFAULT_SEARCH_LIMIT = 100
+
+
+class StudentIndex:
+    def __init__(self, names, numbers=None, clusters=None):
+        names = ["" if name is None else str(name) for name in names]
+        numbers = list(numbers) if numbers is not None else [None] * len(names)
+        self.positions_by_name = {}
+        for position, name in enumerate(names):
+            self.positions_by_name.setdefault(name, []).append(position)
+        self.position_by_no = {}
+        for position, number in enumerate(numbers):
+            if number is not None and number == number:
+                self.position_by_no.setdefault(number, position)
+
+        self.labels = []
+        for position, name in enumerate(names):
+            if len(self.positions_by_name[name]) > 1:
+                suffix = f"No {numbers[position]}" if numbers[position] is not None else f"baris {position + 1}"
+                self.labels.append(f"{name} ({suffix})")
+            else:
+                self.labels.append(name)
+        self.position_by_label = {}
+        for position, label in enumerate(self.labels):
+            if label in self.position_by_label:
+                # Nama dan No sama-sama ganda: bedakan dengan nomor baris.
+                label = f"{label} - baris {position + 1}"
+                self.labels[position] = label
+            self.position_by_label[label] = position
+        # Kunci pencarian tidak peka huruf besar/kecil, diurutkan untuk bisect.
+        self._search_keys = sorted((label.casefold(), label) for label in self.position_by_label)
+        self._sorted_folded = [key for key, _ in self._search_keys]
+
+        self.positions_by_cluster = {}
+        if clusters is not None:
+            clusters = np.asarray(clusters)
+            order = np.argsort(clusters, kind="stable")
+            cluster_ids, starts = np.unique(clusters[order], return_index=True)
+            for cluster_id, members in zip(cluster_ids.tolist(), np.split(order, starts[1:])):
+                self.positions_by_cluster[cluster_id] = members
+
+    @classmethod
+    def from_frame(cls, df, name_col="Nama", no_col="No", cluster_col="Klaster"):
+        names = df[name_col].tolist() if name_col in df.columns else [str(i + 1) for i in range(len(df))]
+        numbers = df[no_col].tolist() if no_col in df.columns else None
+        clusters = df[cluster_col].to_numpy() if cluster_col in df.columns else None
+        return cls(names, numbers, clusters)
+
+    def make_read_only(self):
+        # Untuk indeks yang dipakai bersama antarsesi (lihat published_results).
+        self.labels = tuple(self.labels)
+        for members in self.positions_by_cluster.values():
+            members.flags.writeable = False
+        return self
+
+    def __len__(self):
+        return len(self.labels)
+
+    def position_for_label(self, label):
+        return self.position_by_label.get(label)
+
+    def position_for_no(self, number):
+        return self.position_by_no.get(number)
+
+    def positions_for_name(self, name):
+        return self.positions_by_name.get(name, [])
+
+    def positions_for_cluster(self, cluster_id, exclude=None):
+        # Posisi baris anggota klaster (naik); exclude untuk mengecualikan
+        # siswa yang sedang dilihat.
+        members = self.positions_by_cluster.get(cluster_id, np.empty(0, dtype=np.intp))
+        if exclude is not None:
+            members = members[members != exclude]
+        return members
+
+    def search_prefix(self, prefix, limit=DEFAULT_SEARCH_LIMIT):
+        # Label yang diawali prefix, berurutan alfabetis, paling banyak limit.
+        prefix = (prefix or "").strip().casefold()
+        start = bisect.bisect_left(self._sorted_folded, prefix)
+        matches = []
+        for folded, label in self._search_keys[start:start + limit]:
+            if not folded.startswith(prefix):
+                break
+            matches.append(label)
+        return matches
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pipeline import CATEGORICAL_COLS
+from result_cache import make_cache_key
+
+
+# --- LAPORAN PDF PROFIL SISWA ---
+# Tata letak PDF tidak bergantung pada Streamlit sehingga dapat dirender di
+# proses pekerja. Ekspor massal mengirim satu pekerjaan per siswa ke process
+# pool dengan jumlah pekerjaan tertunda yang dibatasi, lalu menulis setiap PDF
+# yang selesai langsung ke arsip ZIP; memori tidak tumbuh dengan jumlah siswa.
+# Bila cache diberikan, PDF disimpan dengan kunci hash dari data siswa,
+# klaster, teks deskripsi, dan versi templat sehingga tidak dirender ulang.
+
+# Naikkan setiap kali tata letak render_student_pdf berubah.
+REPORT_TEMPLATE_VERSION = 1
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_PENDING_PER_WORKER = 2
+
+KETERANGAN_UMUM = (
+    "Laporan ini menyajikan profil detail siswa berdasarkan hasil pengelompokan "
+    "menggunakan Algoritma K-Prototype. Klasterisasi dilakukan berdasarkan "
+    "nilai akademik, kehadiran, dan partisipasi ekstrakurikuler siswa. "
+    "Informasi klaster ini dapat digunakan untuk memahami kebutuhan siswa dan "
+    "merancang strategi pembinaan yang sesuai."
+)
+
+
+def render_student_pdf(nama, data_siswa_dict, klaster, klaster_desc):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.set_text_color(44, 47, 127)
+    pdf.cell(0, 10, "PROFIL SISWA - HASIL KLASTERISASI", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.multi_cell(0, 5, KETERANGAN_UMUM, align='J')
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 8, f"Nama Siswa: {nama}", ln=True)
+    pdf.cell(0, 8, f"Klaster Hasil: {klaster}", ln=True)
+    pdf.ln(3)
+    pdf.set_font("Arial", "I", 10)
+    pdf.set_text_color(80, 80, 80)
+    pdf.multi_cell(0, 5, f"Karakteristik Klaster {klaster}: {klaster_desc}", align='J')
+    pdf.ln(5)
+    pdf.set_font("Arial", "", 10)
+    pdf.set_text_color(0, 0, 0)
+    ekskul_diikuti = []
+    for col in CATEGORICAL_COLS:
+        val = data_siswa_dict.get(col)
+        if val is not None and (val == 1 or str(val).strip() == '1'):
+            ekskul_diikuti.append(col.replace("Ekstrakurikuler ", ""))
+
+    display_data = {
+        "Nomor Induk": data_siswa_dict.get("No", "-"),
+        "Jenis Kelamin": data_siswa_dict.get("JK", "-"),
+        "Kelas": data_siswa_dict.get("Kelas", "-"),
+        "Rata-rata Nilai Akademik": f"{data_siswa_dict.get('Rata Rata Nilai Akademik', '-'):.2f}",
+        "Persentase Kehadiran": f"{data_siswa_dict.get('Kehadiran', '-'):.2%}",
+        "Ekstrakurikuler yang Diikuti": ", ".join(ekskul_diikuti) if ekskul_diikuti else "Tidak mengikuti ekstrakurikuler",
+    }
+    for key, val in display_data.items():
+        pdf.cell(0, 7, f"{key}: {val}", ln=True)
+    # fpdf2 mengembalikan bytearray; font inti hanya mendukung latin-1 sehingga
+    # karakter di luar itu memunculkan galat saat render.
+    return bytes(pdf.output())
+
+
+def report_file_name(nama, data_siswa_dict):
+    safe_name = re.sub(r"[^0-9A-Za-z_-]+", "_", str(nama)).strip("_") or "siswa"
+    nomor = data_siswa_dict.get("No")
+    return f"Profil_{nomor}_{safe_name}.pdf" if nomor is not None else f"Profil_{safe_name}.pdf"
+
+
+def report_cache_key(nama, data_siswa_dict, klaster, klaster_desc):
+    # Skalar NumPy dinormalisasi ke tipe Python agar kunci sama, baik dari
+    # Series.to_dict() (satu siswa) maupun DataFrame.to_dict("records").
+    record = sorted((str(k), v.item() if hasattr(v, "item") else v) for k, v in data_siswa_dict.items())
+    return make_cache_key("student-pdf", REPORT_TEMPLATE_VERSION, str(nama), record, int(klaster), klaster_desc)
+
+
+def _render_job(job):
+    nama, data_siswa_dict, klaster, klaster_desc = job
+    try:
+        return report_file_name(nama, data_siswa_dict), render_student_pdf(nama, data_siswa_dict, klaster, klaster_desc), None
+    except Exception as e:
+        # Pesan galat dikirim sebagai teks: tidak semua exception fpdf dapat
+        # di-pickle kembali ke proses utama.
+        return report_file_name(nama, data_siswa_dict), None, str(e)
+
+
+def _render_batch(jobs):
+    return [_render_job(job) for job in jobs]
+
+
+def iter_student_pdfs(jobs, max_workers=None, batch_size=DEFAULT_BATCH_SIZE, max_pending=None, cache=None):
+    # Menghasilkan (nama_file, pdf_bytes, pesan_galat) sesuai urutan selesai.
+    # jobs boleh berupa generator; pekerjaan dikirim per batch agar biaya IPC
+    # kecil dan hanya max_pending batch yang ditahan di memori. PDF yang ada
+    # di cache langsung dihasilkan tanpa dikirim ke pekerja.
+    max_workers = max_workers or os.cpu_count() or 1
+    jobs = iter(jobs)
+    if max_workers == 1:
+        for job in jobs:
+            key = report_cache_key(*job) if cache is not None else None
+            pdf_bytes = cache.get(key) if cache is not None else None
+            if pdf_bytes is not None:
+                yield report_file_name(job[0], job[1]), pdf_bytes, None
+                continue
+            result = _render_job(job)
+            if cache is not None and result[1] is not None:
+                cache.put(key, result[1])
+            yield result
+        return
+    max_pending = max_pending or max_workers * DEFAULT_PENDING_PER_WORKER
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        pending = {}
+        while True:
+            while len(pending) < max_pending:
+                batch, keys = [], []
+                for job in jobs:
+                    key = report_cache_key(*job) if cache is not None else None
+                    pdf_bytes = cache.get(key) if cache is not None else None
+                    if pdf_bytes is not None:
+                        yield report_file_name(job[0], job[1]), pdf_bytes, None
+                        continue
+                    batch.append(job)
+                    keys.append(key)
+                    if len(batch) == batch_size:
+                        break
+                if not batch:
+                    break
+                pending[executor.submit(_render_batch, batch)] = keys
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                keys = pending.pop(future)
+                for key, result in zip(keys, future.result()):
+                    if cache is not None and result[1] is not None:
+                        cache.put(key, result[1])
+                    yield result
+
+
+def write_reports_zip(fileobj, jobs, n_jobs, max_workers=None, on_progress=None, cache=None):
+    # Menulis PDF ke ZIP begitu selesai dirender. Nama file ganda diberi
+    # akhiran agar tidak saling menimpa di dalam arsip.
+    n_written = 0
+    errors = []
+    used_names = set()
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for n_done, (file_name, pdf_bytes, error) in enumerate(iter_student_pdfs(jobs, max_workers=max_workers, cache=cache), start=1):
+            if error is not None:
+                errors.append((file_name, error))
+            else:
+                base_name, suffix = file_name, 1
+                while file_name in used_names:
+                    suffix += 1
+                    file_name = f"{base_name[:-4]}_{suffix}.pdf"
+                used_names.add(file_name)
+                archive.writestr(file_name, pdf_bytes)
+                n_written += 1
+            if on_progress is not None:
+                on_progress(n_done, n_jobs)
+    return n_written, errors
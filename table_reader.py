@@ -0,0 +1,124 @@
+import io
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+
+# --- PEMBACA TABEL UNGGAHAN ---
+# Satu pintu untuk semua format unggahan: pembaca dipilih berdasarkan ekstensi
+# file. Excel dibaca dengan engine tercepat yang terpasang (calamine, berbasis
+# Rust, jauh lebih cepat daripada openpyxl untuk workbook besar). Bila daftar
+# kolom diberikan, hanya kolom tersebut yang diparse (nama kolom dibandingkan
+# setelah spasi di tepi dibuang) dengan dtype eksplisit untuk kolom teks dan
+# kolom nilai.
+
+EXCEL_ENGINES = ("calamine", "openpyxl")
+# Kolom identitas selalu dibaca sebagai teks agar tipe tidak berubah-ubah
+# antarfile (misalnya Kelas berisi angka pada satu file dan teks pada file lain).
+TEXT_COLUMNS = ("Nama", "JK", "Kelas")
+# Kolom nilai disimpan sebagai float32; presisinya jauh melebihi nilai rapor
+# dan persentase kehadiran.
+NUMERIC_COLUMNS = ("Rata Rata Nilai Akademik", "Kehadiran")
+NUMERIC_DTYPE = "float32"
+# Angka bulat yang tersimpan sebagai float ('10.0', hasil ekspor CSV dari
+# kolom berisi sel kosong) disamakan dengan bentuk dari Excel ('10').
+INTEGRAL_FLOAT_TEXT = r"^(-?\d+)\.0+$"
+
+
+def _engine_available(engine):
+    try:
+        if engine == "calamine":
+            import python_calamine  # noqa: F401
+        elif engine == "openpyxl":
+            import openpyxl  # noqa: F401
+        else:
+            return False
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def excel_engine():
+    for engine in EXCEL_ENGINES:
+        if _engine_available(engine):
+            return engine
+    return None
+
+
+def _column_selector(columns):
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda col: str(col).strip() in wanted
+
+
+def _text_dtypes(columns):
+    # Kunci dtype harus sama persis dengan nama kolom di file; kolom dengan
+    # spasi di tepi nama tidak diberi dtype eksplisit dan tetap terbaca.
+    return {col: str for col in TEXT_COLUMNS if columns is None or col in columns}
+
+
+def _numeric_dtypes(columns):
+    return {col: NUMERIC_DTYPE for col in NUMERIC_COLUMNS if columns is None or col in columns}
+
+
+def _read_excel(data, columns):
+    engine = excel_engine()
+    if engine is None:
+        raise ImportError("Tidak ada engine Excel yang terpasang (python-calamine atau openpyxl).")
+    return pd.read_excel(io.BytesIO(data), engine=engine, usecols=_column_selector(columns), dtype=_text_dtypes(columns))
+
+
+def _read_csv(data, columns):
+    # Kolom nilai langsung diparse sebagai float32. Bila ada isi yang bukan
+    # angka (misalnya kehadiran '95%' pada file prediksi), file dibaca ulang
+    # tanpa dtype nilai dan kolom itu dibiarkan untuk diurai pemanggil.
+    try:
+        return pd.read_csv(io.BytesIO(data), usecols=_column_selector(columns),
+                           dtype={**_text_dtypes(columns), **_numeric_dtypes(columns)})
+    except ValueError:
+        return pd.read_csv(io.BytesIO(data), usecols=_column_selector(columns), dtype=_text_dtypes(columns))
+
+
+def _read_parquet(data, columns):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    selected = None
+    if columns is not None:
+        selector = _column_selector(columns)
+        selected = [name for name in parquet_file.schema_arrow.names if selector(name)]
+    return parquet_file.read(columns=selected).to_pandas()
+
+
+READERS = {
+    ".xlsx": _read_excel,
+    ".csv": _read_csv,
+    ".parquet": _read_parquet,
+}
+SUPPORTED_EXTENSIONS = [ext.lstrip(".") for ext in READERS]
+
+
+def read_table(data, file_name, columns=None):
+    ext = os.path.splitext(file_name)[1].lower()
+    reader = READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Format file '{ext or file_name}' tidak didukung. Gunakan salah satu: {', '.join(SUPPORTED_EXTENSIONS)}.")
+    df = reader(data, columns)
+    df.columns = [str(col).strip() for col in df.columns]
+    return _apply_column_types(df, columns)
+
+
+def _apply_column_types(df, columns):
+    # Dijalankan untuk semua format setelah nama kolom dirapikan, sehingga
+    # Excel, CSV, dan Parquet menghasilkan teks dan dtype yang sama.
+    for col in _text_dtypes(columns):
+        if col in df.columns:
+            text = df[col].astype(object)
+            text = text.where(text.isna(), text.astype(str))
+            df[col] = text.str.replace(INTEGRAL_FLOAT_TEXT, r"\1", regex=True)
+    for col, dtype in _numeric_dtypes(columns).items():
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+from atomic_files import write_atomic
+from pipeline import CACHE_DIR, KEPSEK_RESULT_BUNDLE_DIR, KEPSEK_RESULT_FILE, MODEL_REGISTRY_DIR
+
+
+# --- TATA LETAK ARTEFAK PER MADRASAH (TENANT) ---
+# Setiap madrasah memiliki direktori sendiri untuk file masukan, registri
+# model, bundel hasil, salinan Excel, dan cache, sehingga satu deployment dapat
+# melayani beberapa madrasah tanpa saling menimpa. Madrasah bawaan memakai
+# tata letak lama di direktori kerja (hasil_klasterisasi/, model_registry/,
+# .cache/) agar deployment yang sudah ada tetap berjalan tanpa migrasi.
+#
+#   madrasah/<id>/masukan/            file dataset yang diunggah (per hash isi)
+#   madrasah/<id>/model_registry/
+#   madrasah/<id>/hasil_klasterisasi/
+#   madrasah/<id>/Data <ID>.xlsx
+#   madrasah/<id>/.cache/
+#   madrasah/<id>/nama.txt            opsional: nama madrasah untuk header aplikasi
+
+DEFAULT_TENANT_ID = "ma-alhikmah"
+DEFAULT_TENANT_NAME = "MADRASAH ALIYAH AL-HIKMAH"
+TENANT_NAME_FILE = "nama.txt"
+TENANTS_ROOT = "madrasah"
+INPUTS_DIR_NAME = "masukan"
+
+_TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+TenantPaths = namedtuple("TenantPaths", [
+    "tenant_id", "root", "inputs_dir", "registry_dir", "bundle_dir", "excel_file", "cache_dir",
+])
+
+
+def normalize_tenant_id(tenant_id):
+    # ID dipakai sebagai nama direktori: hanya huruf kecil, angka, '-' dan '_'.
+    normalized = str(tenant_id or "").strip().lower().replace(" ", "-")
+    if not _TENANT_ID_PATTERN.match(normalized):
+        raise ValueError(f"ID madrasah '{tenant_id}' tidak valid. Gunakan huruf, angka, '-' atau '_' (maksimal 64 karakter).")
+    return normalized
+
+
+def tenant_paths(tenant_id=DEFAULT_TENANT_ID):
+    tenant_id = normalize_tenant_id(tenant_id)
+    if tenant_id == DEFAULT_TENANT_ID:
+        root = "."
+        return TenantPaths(
+            tenant_id=tenant_id,
+            root=root,
+            inputs_dir=os.path.join(TENANTS_ROOT, tenant_id, INPUTS_DIR_NAME),
+            registry_dir=MODEL_REGISTRY_DIR,
+            bundle_dir=KEPSEK_RESULT_BUNDLE_DIR,
+            excel_file=KEPSEK_RESULT_FILE,
+            cache_dir=CACHE_DIR,
+        )
+    root = os.path.join(TENANTS_ROOT, tenant_id)
+    return TenantPaths(
+        tenant_id=tenant_id,
+        root=root,
+        inputs_dir=os.path.join(root, INPUTS_DIR_NAME),
+        registry_dir=os.path.join(root, MODEL_REGISTRY_DIR),
+        bundle_dir=os.path.join(root, KEPSEK_RESULT_BUNDLE_DIR),
+        excel_file=os.path.join(root, f"Data {tenant_id.upper()}.xlsx"),
+        cache_dir=os.path.join(root, CACHE_DIR),
+    )
+
+
+def tenant_display_name(tenant_id):
+    # Nama dari madrasah/<id>/nama.txt bila ada; selain itu dibentuk dari ID.
+    tenant_id = normalize_tenant_id(tenant_id)
+    try:
+        with open(os.path.join(TENANTS_ROOT, tenant_id, TENANT_NAME_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+        if name:
+            return name
+    except OSError:
+        pass
+    if tenant_id == DEFAULT_TENANT_ID:
+        return DEFAULT_TENANT_NAME
+    return tenant_id.replace("-", " ").replace("_", " ").upper()
+
+
+def list_tenants():
+    tenant_ids = {DEFAULT_TENANT_ID}
+    if os.path.isdir(TENANTS_ROOT):
+        for name in os.listdir(TENANTS_ROOT):
+            if os.path.isdir(os.path.join(TENANTS_ROOT, name)) and _TENANT_ID_PATTERN.match(name):
+                tenant_ids.add(name)
+    return sorted(tenant_ids)
+
+
+def save_input(paths, data, file_name):
+    # Nama file berdasarkan hash isi: unggahan ulang file yang sama tidak
+    # menambah salinan baru. Ditulis secara atomik (lihat atomic_files.py).
+    os.makedirs(paths.inputs_dir, exist_ok=True)
+    ext = os.path.splitext(file_name)[1].lower()
+    target = os.path.join(paths.inputs_dir, f"{hashlib.sha256(data).hexdigest()[:16]}{ext}")
+    if not os.path.exists(target):
+        write_atomic(target, lambda f: f.write(data))
+    return target
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from cluster_assigner import ClusterAssigner
+from compact_features import mismatch_counts, pack_flags, unpack_flags
+
+
+# --- UJI KESETARAAN CLUSTERASSIGNER DENGAN KMODES ---
+# ClusterAssigner (jalur kategori umum dan jalur bitmask XOR/popcount) harus
+# memberi label yang sama persis dengan kmodes.KPrototypes.predict, termasuk
+# untuk kategori atau kombinasi flag yang tidak muncul saat pelatihan.
+
+kprototypes = pytest.importorskip("kmodes.kprototypes")
+
+N_NUMERIC = 2
+
+
+def fit_model(X, n_clusters, random_state=0):
+    categorical = list(range(N_NUMERIC, X.shape[1]))
+    kproto = kprototypes.KPrototypes(n_clusters=n_clusters, init="Huang", n_init=3, random_state=random_state)
+    kproto.fit(X, categorical=categorical)
+    return kproto, categorical
+
+
+def mixed_data(rng, n_rows, categories):
+    X = np.empty((n_rows, N_NUMERIC + 3), dtype=object)
+    X[:, :N_NUMERIC] = rng.normal(size=(n_rows, N_NUMERIC))
+    X[:, N_NUMERIC:] = rng.choice(categories, size=(n_rows, 3))
+    return X
+
+
+def flag_data(rng, n_rows, flag_matrix):
+    X = np.empty((n_rows, N_NUMERIC + flag_matrix.shape[1]), dtype=object)
+    X[:, :N_NUMERIC] = rng.normal(size=(n_rows, N_NUMERIC))
+    X[:, N_NUMERIC:] = np.where(flag_matrix == 1, "1", "0")
+    return X
+
+
+@pytest.mark.parametrize("n_clusters", [2, 3, 5])
+def test_predict_matches_kprototypes_with_unseen_categories(n_clusters):
+    rng = np.random.default_rng(n_clusters)
+    kproto, categorical = fit_model(mixed_data(rng, 300, ["a", "b", "c"]), n_clusters)
+    # 'x' dan 'y' tidak pernah muncul di data latih.
+    X_new = mixed_data(rng, 500, ["a", "b", "c", "x", "y"])
+    assigner = ClusterAssigner.from_kprototypes(kproto, N_NUMERIC)
+
+    expected = kproto.predict(X_new, categorical=categorical)
+    labels = assigner.predict(X_new[:, :N_NUMERIC].astype(np.float64), X_new[:, N_NUMERIC:])
+    np.testing.assert_array_equal(labels, expected)
+
+
+def test_predict_is_independent_of_chunk_size():
+    rng = np.random.default_rng(7)
+    kproto, _ = fit_model(mixed_data(rng, 200, ["a", "b", "c"]), 4)
+    X_new = mixed_data(rng, 301, ["a", "b", "c", "x"])
+    X_numeric, X_categorical = X_new[:, :N_NUMERIC].astype(np.float64), X_new[:, N_NUMERIC:]
+
+    full = ClusterAssigner.from_kprototypes(kproto, N_NUMERIC).predict(X_numeric, X_categorical)
+    chunked = ClusterAssigner.from_kprototypes(kproto, N_NUMERIC, chunk_rows=32).predict(X_numeric, X_categorical)
+    np.testing.assert_array_equal(chunked, full)
+
+
+@pytest.mark.parametrize("n_clusters", [2, 3, 4])
+def test_predict_packed_matches_kprototypes_with_unseen_flag_combinations(n_clusters):
+    rng = np.random.default_rng(10 + n_clusters)
+    # Data latih tidak pernah mengikuti ekstrakurikuler ketiga dan keempat
+    # sekaligus; data baru memuat semua 16 kombinasi flag.
+    train_flags = rng.integers(0, 2, size=(300, 4))
+    train_flags[:, 3] &= 1 - train_flags[:, 2]
+    kproto, categorical = fit_model(flag_data(rng, 300, train_flags), n_clusters)
+    new_flags = np.tile(unpack_flags(np.arange(16, dtype=np.uint8), 4), (25, 1))
+    X_new = flag_data(rng, len(new_flags), new_flags)
+    assigner = ClusterAssigner.from_kprototypes(kproto, N_NUMERIC)
+
+    expected = kproto.predict(X_new, categorical=categorical)
+    packed = assigner.predict_packed(X_new[:, :N_NUMERIC].astype(np.float64), pack_flags(new_flags))
+    np.testing.assert_array_equal(packed, expected)
+    np.testing.assert_array_equal(assigner.predict(X_new[:, :N_NUMERIC].astype(np.float64), X_new[:, N_NUMERIC:]), expected)
+
+
+def test_predict_packed_rejects_non_binary_centroids():
+    rng = np.random.default_rng(3)
+    kproto, _ = fit_model(mixed_data(rng, 100, ["a", "b", "c"]), 2)
+    assigner = ClusterAssigner.from_kprototypes(kproto, N_NUMERIC)
+    with pytest.raises(ValueError):
+        assigner.predict_packed(np.zeros((1, N_NUMERIC)), pack_flags(np.zeros((1, 3))))
+
+
+def test_mismatch_counts_matches_elementwise_comparison():
+    rng = np.random.default_rng(0)
+    flags_a = rng.integers(0, 2, size=(50, 4)).astype(np.uint8)
+    flags_b = rng.integers(0, 2, size=(7, 4)).astype(np.uint8)
+
+    expected = np.sum(flags_a[:, np.newaxis, :] != flags_b[np.newaxis, :, :], axis=2)
+    np.testing.assert_array_equal(mismatch_counts(pack_flags(flags_a), pack_flags(flags_b)), expected)
+    np.testing.assert_array_equal(unpack_flags(pack_flags(flags_a), 4), flags_a)